@@ -7,12 +7,19 @@ This should (theoretically) work in any program with PySide2, though it was desi
 # TODO - Add a window for writing up the markups in a more GUI centric way instead of script editor markup
 
 import os
+import sys
 import json
 import webbrowser
+from functools import partial
 
-from PySide2 import QtWidgets, QtCore
+from PySide2 import QtWidgets, QtCore, QtGui
 import shiboken2
 
+import na_scratch_paper_execution as execution
+import na_scratch_paper_images as images
+import na_scratch_paper_modules as modules
+import na_scratch_paper_pipelines as pipelines
+import na_scratch_paper_stats as stats
 import na_scratch_paper_child_widgets as child_widgets
 import na_scratch_paper_tab_widgets as tab_widgets
 # reload(tab_widgets)
@@ -24,6 +31,7 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
 
         self.prefs = {}
         self.skip_save = False
+        self.pipeline_runners = []
 
         self.load_prefs()
         self.create_base()
@@ -42,14 +50,44 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
         file_menu = menu_bar.addMenu('File')
         file_menu.addAction('Edit Script List', self.edit_script_list)
         file_menu.addAction('Refresh Tabs', self.populate_tabs)
+        file_menu.addAction('Precompile Scripts', self.precompile_scripts)
+        file_menu.addAction('Export Button Stats...', self.export_button_stats)
+        action = file_menu.addAction('Command Palette', self.show_command_palette)
+        action.setShortcut(QtGui.QKeySequence('Ctrl+P'))
+        file_menu.addSeparator()
+        options_menu = file_menu.addMenu('Options')
+        self.add_option(options_menu, 'Lazy Tab Loading', 'lazy_tabs', False,
+                        'Only imports and builds a tab the first time it is activated (takes effect on refresh)')
+        self.add_option(options_menu, 'Static Tab Building', 'static_tabs', False,
+                        'Builds tabs from the scripts\' source without running them. Scripts are only imported once a '
+                        'button is clicked (takes effect on refresh)')
+        self.add_option(options_menu, 'Background Script Loading', 'async_loading', True,
+                        'Reads, compiles and imports dependencies of scripts on worker threads while the tabs show a '
+                        'placeholder')
+        options_menu.addAction('Virtual List Threshold...', self.set_virtual_threshold)
+        options_menu.addAction('Process Pool Size...', self.set_process_pool_size)
+        options_menu.addAction('Result Cache Size...', self.set_result_cache_size)
+        options_menu.addSeparator()
+        action = self.add_option(options_menu, 'Watch Scripts', 'watch_scripts', False,
+                                 'Rebuilds a tab whenever its script is saved')
+        action.toggled.connect(self.update_watcher)
+        action = self.add_option(options_menu, 'Watch Local Imports', 'watch_imports', False,
+                                 'Also rebuilds tabs when modules their scripts import from the same folder are saved')
+        action.toggled.connect(self.update_watcher)
         file_menu.addSeparator()
         file_menu.addAction('Save Preferences', self.save_prefs)
         file_menu.addAction('Reset Preferences', self.reset_prefs)
 
+        self.pipeline_menu = menu_bar.addMenu('Pipelines')
+        self.pipeline_menu.aboutToShow.connect(self.populate_pipeline_menu)
+
         help_menu = menu_bar.addMenu('Help')
         help_menu.addAction('Script Markup Quick-Reference', lambda: child_widgets.AdvQuickRef(self).show())
         help_menu.addAction('Scratch Paper Documentation',
                             lambda: webbrowser.open('https://github.com/noahalzayer/na_scratch_paper/wiki'))
+        help_menu.addSeparator()
+        help_menu.addAction('Print Module Stats', self.print_module_stats)
+        help_menu.addAction('Print Image Cache Stats', self.print_image_stats)
 
         # Body
         self.setCentralWidget(QtWidgets.QWidget())
@@ -73,15 +111,52 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
         self.refresh_btn.setFont(font)
         self.refresh_btn.clicked.connect(self.populate_tabs)
 
+        # Filtering waits for a pause in typing instead of running on every keystroke
+        self.filter_timer = QtCore.QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(150)
+        self.filter_timer.timeout.connect(lambda: self.filter(self.search_le.text()))
+
         self.search_le = QtWidgets.QLineEdit(self.centralWidget())
-        self.search_le.textChanged.connect(self.filter)
+        self.search_le.textChanged.connect(lambda text: self.filter_timer.start())
         body_lwt.addWidget(self.search_le)
         self.search_le.setPlaceholderText('Search')
         self.search_le.setAlignment(QtCore.Qt.AlignCenter)
 
         self.tab_widget = QtWidgets.QTabWidget(self.centralWidget())
+        self.tab_widget.currentChanged.connect(self.build_tab)
         body_lwt.addWidget(self.tab_widget)
 
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.file_changed)
+        self.watched = {}
+
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setFormat('Loading Scripts %v/%m')
+        self.progress_bar.setVisible(False)
+        self.statusBar().addPermanentWidget(self.progress_bar)
+
+
+    def add_option(self, menu, label, key, default, tip=''):
+        """
+        Adds a checkable action to the menu that toggles a boolean preference
+        Args:
+            menu (QtWidgets.QMenu): The menu to add the action to
+            label (str): The label for the action
+            key (str): The preferences key the action toggles
+            default (bool): The value used if the key isn't in the preferences yet
+            tip (str): Optional tooltip/status tip for the action
+        Returns:
+            action (QtWidgets.QAction): The newly created action
+        """
+        action = menu.addAction(label)
+        action.setCheckable(True)
+        action.setChecked(self.prefs.get(key, default))
+        action.setStatusTip(tip)
+        action.setToolTip(tip)
+        action.toggled.connect(lambda val: self.prefs.__setitem__(key, val))
+        return action
+
 
     def populate_tabs(self, initial=False):
         """
@@ -92,19 +167,207 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
                 self.tab_widget.widget(i).save_vals()
 
         ind = self.tab_widget.currentIndex()
+        old_tabs = [self.tab_widget.widget(i) for i in range(self.tab_widget.count())]
         self.tab_widget.clear()
 
+        # Removing tabs doesn't delete them, so make sure the old ones (and the modules they reference) go away
+        for tab in old_tabs:
+            tab.release()
+            tab.deleteLater()
+        modules.MODULE_MANAGER.prune([data['script'] for data in self.prefs.get('tab_data', []) if 'script' in data])
+
+        # In lazy mode, only the first "eager_tabs" tabs (and whichever tab gets activated) are imported and built
+        lazy = self.prefs.get('lazy_tabs', False)
+        eager = self.prefs.get('eager_tabs', 1)
+
         if self.prefs.get('tab_data'):
-            for data in self.prefs['tab_data']:
-                tab_widgets.ScriptWidget(self.tab_widget, data=data)
+            for i, data in enumerate(self.prefs['tab_data']):
+                tab = tab_widgets.ScriptWidget(self.tab_widget, data=data, prefs=self.prefs, lazy=lazy and i >= eager)
+                tab.loading_changed.connect(self.update_progress)
+                tab.profile_saved.connect(self.show_profile)
+
+            # Lazy tabs don't get loaded on a worker thread, but their images can still be decoded ahead of time
+            if lazy:
+                images.IMAGE_CACHE.prefetch(scripts=[data['script'] for data in self.prefs['tab_data'][eager:]
+                                                     if 'script' in data])
         else:
-            tab_widgets.ScriptWidget(self.tab_widget, data={})
+            tab_widgets.ScriptWidget(self.tab_widget, data={}, prefs=self.prefs)
+        self.update_progress()
+        self.update_watcher()
 
         self.tab_widget.setCurrentIndex(ind)
         if self.search_le.text():
             self.filter(self.search_le.text())
 
 
+    def precompile_scripts(self):
+        """
+        Compiles all the scripts in the list in to the bytecode cache using worker processes, reporting syntax errors
+        """
+        paths = [data['script'] for data in self.prefs.get('tab_data', []) if 'script' in data]
+
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            errors = modules.precompile(paths)
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        for path in sorted(errors):
+            sys.stderr.write('# Failed to compile {}\n# {}\n'.format(path, errors[path]))
+        sys.stdout.write('Precompiled {} of {} script(s)\n'.format(len(paths) - len(errors), len(paths)))
+
+
+    def export_button_stats(self):
+        """
+        Writes the run timings of every button in the tabs' scripts to a json or csv file
+        """
+        path, selected = QtWidgets.QFileDialog.getSaveFileName(self, 'Export Button Stats',
+                                                               os.path.expanduser('~/button_stats.json'),
+                                                               'JSON (*.json);;CSV (*.csv)')
+        if not path:
+            return
+
+        if not os.path.splitext(path)[1]:
+            path += '.csv' if 'csv' in selected.lower() else '.json'
+
+        for data in self.prefs.get('tab_data', []):
+            if 'script' in data:
+                stats.STATS.buttons(data['script'])
+        stats.STATS.export(path)
+        sys.stdout.write('Exported button stats to {}\n'.format(path))
+
+
+    def populate_pipeline_menu(self):
+        """
+        Fills the pipelines menu with the saved pipelines
+        """
+        self.pipeline_menu.clear()
+        for data in self.prefs.get('pipelines', []):
+            self.pipeline_menu.addAction(data.get('name', 'Pipeline'), partial(self.run_pipeline, data))
+        if self.prefs.get('pipelines'):
+            self.pipeline_menu.addSeparator()
+        self.pipeline_menu.addAction('Edit Pipelines...', self.edit_pipelines)
+
+
+    def edit_pipelines(self):
+        """
+        Opens the PipelineEditor
+        """
+        dialog = child_widgets.PipelineEditor(self, self.prefs.get('pipelines', []))
+        if dialog.exec_():
+            self.prefs['pipelines'] = dialog.data
+
+
+    def run_pipeline(self, data):
+        """
+        Runs a saved pipeline on a worker thread, printing a report with each step's timing once it's done
+        Args:
+            data (dict): The saved pipeline
+        """
+        try:
+            run = pipelines.PipelineRun(pipelines.Pipeline.from_dict(data))
+            run.prepare()
+        except:
+            sys.stderr.write(execution.stack_trace())
+            return
+
+        sys.stdout.write('# Running pipeline "{}"\n'.format(run.pipeline.name))
+        runner = tab_widgets.JobRunner(execution.Job(run.run))
+        runner.signals.finished.connect(partial(self.pipeline_finished, run, runner))
+        self.pipeline_runners.append(runner)
+        tab_widgets.EXEC_POOL.start(runner)
+
+
+    def pipeline_finished(self, run, runner):
+        """
+        Reports on a pipeline run once it's done
+        Args:
+            run (pipelines.PipelineRun): The run
+            runner (tab_widgets.JobRunner): The runner it ran in
+        """
+        self.pipeline_runners.remove(runner)
+        if runner.job.error:
+            sys.stderr.write(runner.job.error)
+        elif run.failed is None:
+            sys.stdout.write(run.report())
+        else:
+            sys.stderr.write(run.report())
+
+
+    def show_profile(self, path):
+        """
+        Shows the results of a profiled button run
+        Args:
+            path (str): Path to the saved profile
+        """
+        child_widgets.ProfileWindow(self, path).show()
+
+
+    def update_watcher(self, *args):
+        """
+        Points the file watcher at the scripts (and optionally the local modules they import) of all the tabs
+        """
+        self.watched = {}
+        if self.prefs.get('watch_scripts', False):
+            for i in range(self.tab_widget.count()):
+                tab = self.tab_widget.widget(i)
+                for path in tab.watched_files(self.prefs.get('watch_imports', False)):
+                    self.watched.setdefault(modules.normalize(path), []).append(tab)
+
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        for path in self.watched:
+            if os.path.exists(path):
+                self.watcher.addPath(path)
+
+
+    def file_changed(self, path):
+        """
+        Rebuilds only the tabs affected by the changed file (each tab debounces its own rebuild)
+        Args:
+            path (str): The path of the file that changed
+        """
+        path = modules.normalize(path)
+        # Plenty of editors save by replacing the file, which drops it from the watcher
+        if path not in [modules.normalize(watched) for watched in self.watcher.files()] and os.path.exists(path):
+            self.watcher.addPath(path)
+
+        tabs = self.watched.get(path, [])
+        if any(modules.normalize(tab.data['script']) != path for tab in tabs):
+            # A local import changed. It has to be dropped from sys.modules (and the scripts importing it have to be
+            # re-executed) or the tabs would just keep using the old version
+            modules.unload_file(path)
+
+        for tab in tabs:
+            if modules.normalize(tab.data['script']) != path:
+                modules.MODULE_MANAGER.invalidate(tab.data['script'])
+            tab.schedule_refresh()
+
+
+    def update_progress(self):
+        """
+        Shows how many of the tabs being built are done loading in the status bar (hidden when all are done)
+        """
+        tabs = [self.tab_widget.widget(i) for i in range(self.tab_widget.count())]
+        tabs = [tab for tab in tabs if tab.built]
+        loading = len([tab for tab in tabs if tab.loading])
+
+        self.progress_bar.setVisible(bool(loading))
+        self.progress_bar.setMaximum(len(tabs))
+        self.progress_bar.setValue(len(tabs) - loading)
+
+
+    def build_tab(self, index):
+        """
+        Builds the tab at the given index if it was created lazily and hasn't been built yet
+        Args:
+            index (int): Index of the activated tab
+        """
+        widget = self.tab_widget.widget(index)
+        if widget:
+            widget.build()
+
+
     def edit_script_list(self):
         """
         Opens the EditScriptListDialog
@@ -126,7 +389,94 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
         """
         keys = [key.strip().lower() for key in text.split(',')]
         for i in range(self.tab_widget.count()):
-            self.tab_widget.widget(i).filter(keys)
+            matches = self.tab_widget.widget(i).filter(keys)
+
+            # Grey out tabs without any matches (an invalid color resets the tab to the default text color)
+            color = QtGui.QColor(QtCore.Qt.gray) if text.strip() and not matches else QtGui.QColor()
+            self.tab_widget.tabBar().setTabTextColor(i, color)
+
+
+    def set_virtual_threshold(self):
+        """
+        Asks for the number of buttons above which simple tabs are shown as a list view instead of real buttons
+        """
+        value, ok = QtWidgets.QInputDialog.getInt(self, 'Virtual List Threshold',
+                                                  'Show simple tabs with more buttons than this as a list:',
+                                                  self.prefs.get('virtual_threshold', 300), 0, 1000000)
+        if ok:
+            self.prefs['virtual_threshold'] = value
+            self.populate_tabs()
+
+
+    def set_process_pool_size(self):
+        """
+        Asks for the number of worker processes to run "process" buttons in (0 uses one less than the number of CPUs)
+        """
+        value, ok = QtWidgets.QInputDialog.getInt(self, 'Process Pool Size',
+                                                  'Worker processes for "process" buttons (0 for automatic):',
+                                                  self.prefs.get('process_pool_size', 0), 0, 256)
+        if ok:
+            self.prefs['process_pool_size'] = value
+            execution.PROCESS_POOL.resize(value or None)
+            # Resizing terminates the workers, so any process jobs that were still running are finished as failed
+            for i in range(self.tab_widget.count()):
+                self.tab_widget.widget(i).check_jobs()
+
+
+    def set_result_cache_size(self):
+        """
+        Asks for the number of results each tab keeps for its "cache" buttons
+        """
+        value, ok = QtWidgets.QInputDialog.getInt(self, 'Result Cache Size',
+                                                  'Results to keep per tab for "cache" buttons:',
+                                                  self.prefs.get('result_cache_size', 128), 0, 100000)
+        if ok:
+            self.prefs['result_cache_size'] = value
+            for i in range(self.tab_widget.count()):
+                self.tab_widget.widget(i).result_cache.resize(value)
+
+
+    def show_command_palette(self):
+        """
+        Opens the command palette for every button in every tab and runs whatever gets chosen
+        """
+        QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            commands = []
+            for i in range(self.tab_widget.count()):
+                tab = self.tab_widget.widget(i)
+                commands.extend((tab, command) for command in tab.commands())
+        finally:
+            QtWidgets.QApplication.restoreOverrideCursor()
+
+        dialog = child_widgets.CommandPalette(self, commands, self.prefs.get('recent_commands', []))
+        dialog.exec_()
+
+        if dialog.chosen:
+            tab, command = dialog.chosen
+            recent = [key for key in self.prefs.get('recent_commands', []) if key != command['id']]
+            self.prefs['recent_commands'] = ([command['id']] + recent)[:20]
+            tab.run_command(command)
+
+
+    def print_module_stats(self):
+        """
+        Prints how many script module versions are live vs evicted (and if any evicted ones are still hanging around)
+        """
+        stats = modules.MODULE_MANAGER.stats()
+        sys.stdout.write('Scratch Paper Modules - Live: {live}, Evicted: {evicted}, Evicted But Still Referenced: '
+                         '{lingering}, Cache Hits: {hits}, Cache Misses: {misses}\n'.format(**stats))
+
+
+    def print_image_stats(self):
+        """
+        Prints how full the shared icon/image cache is and how often it's been hit
+        """
+        stats = images.IMAGE_CACHE.stats()
+        stats['size'] /= 1024.0 * 1024.0
+        stats['budget'] /= 1024.0 * 1024.0
+        sys.stdout.write('Scratch Paper Images - Entries: {entries}, Size: {size:.1f}/{budget:.1f} MB, Cache Hits: '
+                         '{hits}, Cache Misses: {misses}\n'.format(**stats))
 
 
     def apply_prefs(self):
@@ -135,6 +485,7 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
         """
         geometry = self.prefs.get('geometry', [100, 100, 800, 1000])
         self.setGeometry(QtCore.QRect(geometry[0], geometry[1], geometry[2], geometry[3]))
+        execution.PROCESS_POOL.resize(self.prefs.get('process_pool_size') or None)
 
         self.populate_tabs(initial=True)
         self.tab_widget.setCurrentIndex(self.prefs.get('tab_index', 0))
@@ -209,6 +560,9 @@ class ScratchPaperWidget(QtWidgets.QMainWindow):
         """
         if not self.skip_save:
             self.save_prefs()
+        stats.STATS.save()
+        tab_widgets.WIDGET_POOL.clear()
+        execution.PROCESS_POOL.close()
 
 
 def run_maya():
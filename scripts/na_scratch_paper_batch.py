@@ -0,0 +1,261 @@
+"""
+Module for running a button over every row of a JSONL or CSV file
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import os
+import sys
+import csv
+import json
+import time
+from multiprocessing.pool import ThreadPool
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+import na_scratch_paper_execution as execution
+
+
+# Default number of worker threads
+WORKERS = 4
+
+
+class BatchRun(object):
+    """
+    A run of a button over rows of inputs. Rows are read as they're needed rather than all up front, and only a few per
+    worker are in flight at once, so the input file can be as large as it needs to be. Every row gets a line in the
+    output JSONL with its result or stack trace, so a row that fails doesn't stop the rest.
+    """
+    def __init__(self, button, rows, output, workers=WORKERS, process=None, columns=None, progress=None):
+        """
+        Initial call method
+        Args:
+            button (headless.Button): The button to run
+            rows (iterable): (values, error) tuples from read_rows
+            output (str): Path to the JSONL file to write the results to
+            workers (int): Number of worker threads, or the number of processes in execution.PROCESS_POOL when
+                           running in processes (it decides how many rows are in flight at once)
+            process (tuple): (script path, function name) to run the rows in execution.PROCESS_POOL instead of threads
+            columns (dict): {(str) column: (int) index} Maps columns to indices in to the button's inputs. Columns that
+                            aren't mapped have to be named after an index or an input's label
+            progress (callable): Called with the number of rows done and the number that failed after each row
+        """
+        self.button = button
+        self.rows = rows
+        self.output = output
+        self.workers = max(workers, 1)
+        self.process = process
+        self.columns = columns or {}
+        self.progress = progress
+        self.done = 0
+        self.failed = 0
+        self.cancelled = False
+        self.wall = 0.0
+
+    def run(self):
+        """
+        Runs every row, waiting for them all to finish. Stops reading rows if the job running the batch is cancelled
+        (see execution.cancelled).
+        Returns:
+            ok (bool): True if every row succeeded
+        """
+        start = time.time()
+        finished = Queue()
+        pool = None if self.process else ThreadPool(self.workers)
+        limit = self.workers * 2
+        running = {}
+        try:
+            with open(self.output, 'w') as f:
+                for index, (values, error) in enumerate(self.rows):
+                    if execution.cancelled():
+                        self.cancelled = True
+                        break
+
+                    while len(running) >= limit:
+                        self.write(f, *self.wait(finished, running))
+
+                    running[index] = values, self.submit(index, values, error, pool, finished)
+
+                while running:
+                    self.write(f, *self.wait(finished, running))
+        finally:
+            if pool is not None:
+                pool.close()
+            self.wall = time.time() - start
+
+        return not self.failed and not self.cancelled
+
+    def submit(self, index, values, error, pool, finished):
+        """
+        Starts a row
+        Args:
+            index (int): The row's index
+            values (list or dict): The row's values
+            error (str): Why the row couldn't be read (None if it could)
+            pool (ThreadPool): Pool to run the row in (None when running in processes)
+            finished (Queue): Gets the row's index once it's done
+        Returns:
+            job (execution.Job): The row's job
+        """
+        inputs = values
+        if isinstance(values, dict) and self.columns:
+            inputs = dict((self.columns.get(key, key), value) for key, value in values.items())
+
+        job = execution.Job(self.button.function)
+        try:
+            if error:
+                raise ValueError(error)
+            job.args = self.button.args(inputs)
+            if self.process and not execution.picklable(job.args):
+                raise ValueError('The inputs can\'t be sent to another process')
+        except Exception:
+            job.error = execution.stack_trace()
+            job.finished = True
+            finished.put(index)
+            return job
+
+        def done(*unused):
+            finished.put(index)
+
+        if self.process:
+            job = execution.ProcessJob(self.process[0], self.process[1], job.args)
+            job.submit(execution.PROCESS_POOL, done)
+        else:
+            pool.apply_async(job.run, callback=done)
+        return job
+
+    def wait(self, finished, running):
+        """
+        Waits for the next row to finish. Rows whose worker process died never call back, so those are checked for
+        every so often and failed instead (see execution.ProcessJob.lost).
+        Args:
+            finished (Queue): The queue the rows put their indices on once they're done
+            running (dict): {(int) index: ((list or dict) values, (execution.Job) job)} The rows in flight (the row
+                            that finished is taken out)
+        Returns:
+            row (tuple): (index, values, job) for write
+        """
+        while True:
+            try:
+                index = finished.get(timeout=execution.POLL_INTERVAL)
+            except Empty:
+                index = next((index for index, (_, job) in running.items()
+                              if isinstance(job, execution.ProcessJob) and job.lost()), None)
+
+            if index is not None:
+                values, job = running.pop(index)
+                return index, values, job
+
+    def write(self, f, index, values, job):
+        """
+        Writes a finished row to the output
+        Args:
+            f (file): The output file
+            index (int): The row's index
+            values (list or dict): The row's values
+            job (execution.Job): The row's finished job
+        """
+        record = {'row': index, 'inputs': jsonable(values), 'result': jsonable(job.result), 'error': job.error,
+                  'wall': job.wall}
+        if getattr(job, 'output', ''):
+            record['output'] = job.output
+        f.write(json.dumps(record) + '\n')
+
+        self.done += 1
+        if job.error:
+            self.failed += 1
+        if self.progress:
+            self.progress(self.done, self.failed)
+
+    def report(self):
+        """
+        Gets a summary of the run
+        Returns:
+            txt (str): The summary
+        """
+        return '# {} row(s) of "{}" done in {:.2f}s, {} failed{}. Results are in {}\n'.format(
+            self.done, self.button.label, self.wall, self.failed, ' (cancelled)' if self.cancelled else '',
+            self.output)
+
+
+class Progress(object):
+    """
+    Progress callback for BatchRun that writes how many rows are done, at most once every "interval" seconds
+    """
+    def __init__(self, label, stream=None, interval=1.0):
+        """
+        Initial call method
+        Args:
+            label (str): What's being run (for the messages)
+            stream (file): Where to write the messages (anything with a write method). Defaults to sys.stdout
+            interval (float): Seconds between messages
+        """
+        self.label = label
+        self.stream = stream
+        self.interval = interval
+        self.last = time.time()
+
+    def __call__(self, done, failed):
+        now = time.time()
+        if now - self.last >= self.interval:
+            self.last = now
+            (self.stream or sys.stdout).write('# {}: {} row(s) done, {} failed\n'.format(self.label, done, failed))
+
+
+def read_rows(path):
+    """
+    Reads the rows of a JSONL or CSV file one at a time. JSONL lines can be lists of inputs in order or dictionaries
+    keyed on column, while CSV rows are always keyed on the header's columns.
+    Args:
+        path (str): Path to the file (anything not ending in .csv is read as JSONL)
+    Returns:
+        rows (generator): (values, error) tuples for each row. The error is None unless the row couldn't be read
+    """
+    if os.path.splitext(path)[1].lower() == '.csv':
+        with open(path, 'rb') if str is bytes else open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                yield row, None
+        return
+
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield line, 'Couldn\'t read the row: {}'.format(e)
+
+
+def parse_columns(items):
+    """
+    Parses column mappings from the command line
+    Args:
+        items (list): "<column>=<index>" strings
+    Returns:
+        columns (dict): {(str) column: (int) index}
+    """
+    columns = {}
+    for item in items:
+        column, _, index = item.rpartition('=')
+        if not column or not index.isdigit():
+            raise ValueError('Column mappings should look like <column>=<index>, not "{}"'.format(item))
+        columns[column] = int(index)
+    return columns
+
+
+def jsonable(value):
+    """
+    Gets a value that can be written to json
+    Args:
+        value: The value
+    Returns:
+        value: The value if it can be written as is, otherwise its repr
+    """
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return repr(value)
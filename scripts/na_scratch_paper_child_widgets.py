@@ -4,10 +4,14 @@ Module containing extra windows for na_scratch_paper
 """
 import os
 import sys
+import json
 from functools import partial
 
 from PySide2 import QtWidgets, QtCore, QtGui
 
+import na_scratch_paper_pipelines as pipelines
+import na_scratch_paper_profiling as profiling
+import na_scratch_paper_search as search
 import na_scratch_paper_tab_widgets as tab_widgets
 
 class AdvQuickRef(QtWidgets.QWidget):
@@ -1011,3 +1015,240 @@ class EditScriptListDialog(QtWidgets.QDialog):
 
         self.data = data
         self.accept()
+
+
+class CommandPalette(QtWidgets.QDialog):
+    """
+    Popup for fuzzy searching every button in every tab and running one from the keyboard
+    """
+    def __init__(self, parent, commands, recent=()):
+        """
+        Initial call method
+        Args:
+            parent (na_scratch_paper.ScratchPaperWidget): The parent widget
+            commands (list): (ScriptWidget, (dict) command) tuples for every command (see ScriptWidget.commands)
+            recent (list): Ids of recently run commands, most recent first
+        """
+        super(CommandPalette, self).__init__(parent)
+        self.setWindowTitle('Command Palette')
+        self.commands = commands
+        self.matcher = search.FuzzyMatcher(command['text'] for tab, command in commands)
+        self.chosen = None
+
+        # Recently run commands get ranked higher, the most recent highest
+        ids = dict((command['id'], i) for i, (tab, command) in enumerate(commands))
+        self.boosts = dict((ids[key], 20 * (len(recent) - i)) for i, key in enumerate(recent) if key in ids)
+
+        self.create_base()
+        self.update_results('')
+
+
+    def create_base(self):
+        """
+        Creates the Main UI elements.
+        """
+        main_lwt = QtWidgets.QVBoxLayout()
+        self.setLayout(main_lwt)
+
+        self.search_le = QtWidgets.QLineEdit()
+        self.search_le.setPlaceholderText('Run Command')
+        self.search_le.textChanged.connect(self.update_results)
+        self.search_le.installEventFilter(self)
+        main_lwt.addWidget(self.search_le)
+
+        self.results = QtWidgets.QListWidget()
+        self.results.itemActivated.connect(self.choose)
+        main_lwt.addWidget(self.results)
+        self.resize(500, 400)
+
+
+    def update_results(self, text):
+        """
+        Fills the list with the best matches for the query
+        Args:
+            text (str): The query
+        """
+        self.results.clear()
+        for score, i in self.matcher.match(text, boosts=self.boosts):
+            tab, command = self.commands[i]
+            location = ' > '.join(filter(None, [tab.data.get('name', 'Default'), command['detail']]))
+            item = QtWidgets.QListWidgetItem(u'{}    ({})'.format(command['label'], location))
+            item.setToolTip(command['toolTip'])
+            item.setData(QtCore.Qt.UserRole, i)
+            self.results.addItem(item)
+
+        self.results.setCurrentRow(0)
+
+
+    def eventFilter(self, obj, event):
+        """
+        Lets the arrow keys and enter in the search field drive the results list
+        """
+        if obj is self.search_le and event.type() == QtCore.QEvent.KeyPress:
+            if event.key() in (QtCore.Qt.Key_Up, QtCore.Qt.Key_Down, QtCore.Qt.Key_PageUp, QtCore.Qt.Key_PageDown):
+                QtWidgets.QApplication.sendEvent(self.results, event)
+                return True
+            if event.key() in (QtCore.Qt.Key_Return, QtCore.Qt.Key_Enter):
+                self.choose(self.results.currentItem())
+                return True
+
+        return super(CommandPalette, self).eventFilter(obj, event)
+
+
+    def choose(self, item):
+        """
+        Closes the palette with the item's command chosen
+        Args:
+            item (QtWidgets.QListWidgetItem): The chosen item
+        """
+        if item is None:
+            return
+
+        self.chosen = self.commands[item.data(QtCore.Qt.UserRole)]
+        self.accept()
+
+
+class ProfileWindow(QtWidgets.QWidget):
+    """
+    Window showing the top functions of a profiled button run
+    """
+    def __init__(self, parent, path):
+        """
+        Initial call method
+        Args:
+            parent (na_scratch_paper.ScratchPaperWidget): The parent widget
+            path (str): Path to the saved profile (see profiling.stats_rows)
+        """
+        super(ProfileWindow, self).__init__(parent)
+        self.setWindowFlags(QtCore.Qt.Window)
+        self.setWindowTitle('Profile - {}'.format(os.path.basename(path)))
+        self.setAttribute(QtCore.Qt.WA_DeleteOnClose)
+        self.path = path
+        self.rows = profiling.stats_rows(path)
+
+        self.create_base()
+        self.update_table()
+
+
+    def create_base(self):
+        """
+        Creates the Main UI elements.
+        """
+        main_lwt = QtWidgets.QVBoxLayout()
+        self.setLayout(main_lwt)
+
+        options_lwt = QtWidgets.QHBoxLayout()
+        main_lwt.addLayout(options_lwt)
+        path_le = QtWidgets.QLineEdit(self.path)
+        path_le.setReadOnly(True)
+        options_lwt.addWidget(path_le)
+
+        options_lwt.addWidget(QtWidgets.QLabel('Sort By'))
+        self.sort_cmb = QtWidgets.QComboBox()
+        for key, label in profiling.SORT_KEYS:
+            self.sort_cmb.addItem(label, key)
+        self.sort_cmb.currentIndexChanged.connect(self.update_table)
+        options_lwt.addWidget(self.sort_cmb)
+
+        options_lwt.addWidget(QtWidgets.QLabel('Top'))
+        self.limit_spn = QtWidgets.QSpinBox()
+        self.limit_spn.setRange(1, 10000)
+        self.limit_spn.setValue(50)
+        self.limit_spn.valueChanged.connect(self.update_table)
+        options_lwt.addWidget(self.limit_spn)
+
+        self.table = QtWidgets.QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(['Calls', 'Total Time', 'Cumulative Time', 'Callers', 'Function'])
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        main_lwt.addWidget(self.table)
+        self.resize(900, 500)
+
+
+    def update_table(self, *args):
+        """
+        Fills the table with the top rows for the current sort and limit
+        """
+        sort = self.sort_cmb.itemData(self.sort_cmb.currentIndex())
+        rows = profiling.top_rows(self.rows, sort, self.limit_spn.value())
+
+        # Sorting has to be off while filling the table or rows get moved out from under the items being set
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            values = [row['ncalls'], round(row['tottime'], 6), round(row['cumtime'], 6), len(row['callers']),
+                      row['function']]
+            for column, value in enumerate(values):
+                item = QtWidgets.QTableWidgetItem()
+                item.setData(QtCore.Qt.DisplayRole, value)
+                if column == 3:
+                    item.setToolTip('\n'.join(row['callers']))
+                self.table.setItem(i, column, item)
+
+        self.table.setSortingEnabled(True)
+        self.table.sortItems(['ncalls', 'tottime', 'cumtime', 'callers'].index(sort), QtCore.Qt.DescendingOrder)
+        self.table.resizeColumnsToContents()
+
+
+class PipelineEditor(QtWidgets.QDialog):
+    """
+    Dialog for editing the saved pipelines as json (see pipelines.Pipeline for the format)
+    """
+    def __init__(self, parent, data):
+        """
+        Initial call method
+        Args:
+            parent (na_scratch_paper.ScratchPaperWidget): The parent widget
+            data (list): Dictionaries for each saved pipeline
+        """
+        super(PipelineEditor, self).__init__(parent)
+        self.setWindowTitle('Edit Pipelines')
+        self.data = data
+
+        self.create_base()
+
+
+    def create_base(self):
+        """
+        Creates the Main UI elements.
+        """
+        main_lwt = QtWidgets.QVBoxLayout()
+        self.setLayout(main_lwt)
+
+        lbl = QtWidgets.QLabel('Steps run once the steps in their "depends" are done. Use {"result": "<step id>"} as an '
+                               'input to pass in what a step returned.\nCopy a button in as a step from its menu.')
+        main_lwt.addWidget(lbl)
+
+        self.text_edit = QtWidgets.QPlainTextEdit()
+        self.text_edit.setLineWrapMode(QtWidgets.QPlainTextEdit.NoWrap)
+        self.text_edit.setPlainText(json.dumps(self.data, sort_keys=True, indent=4, separators=(',', ': ')))
+        main_lwt.addWidget(self.text_edit)
+
+        bottom_btn_lwt = QtWidgets.QHBoxLayout()
+        main_lwt.addLayout(bottom_btn_lwt)
+        btn = QtWidgets.QPushButton('Save')
+        btn.clicked.connect(self.save)
+        bottom_btn_lwt.addWidget(btn)
+        btn = QtWidgets.QPushButton('Cancel')
+        btn.clicked.connect(self.reject)
+        bottom_btn_lwt.addWidget(btn)
+        self.resize(700, 600)
+
+
+    def save(self):
+        """
+        Checks the pipelines are valid, then if they are, keeps them and closes the window
+        """
+        try:
+            data = json.loads(self.text_edit.toPlainText())
+            if not isinstance(data, list):
+                raise ValueError('Pipelines should be a list of dictionaries')
+            for pipeline in data:
+                pipelines.Pipeline.from_dict(pipeline)
+        except ValueError as e:
+            QtWidgets.QMessageBox.warning(self, 'Invalid Pipelines', str(e))
+            return
+
+        self.data = data
+        self.accept()
@@ -0,0 +1,572 @@
+"""
+Module for running the functions behind the buttons in na_scratch_paper
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import os
+import sys
+import time
+import pickle
+import threading
+import traceback
+import multiprocessing
+from collections import OrderedDict
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+try:
+    from multiprocessing import SimpleQueue
+except ImportError:
+    from multiprocessing.queues import SimpleQueue
+
+import na_scratch_paper_modules as modules
+import na_scratch_paper_stats as stats
+
+
+# Lets a function running in a job find the job (see cancelled)
+LOCAL = threading.local()
+
+# Seconds between checks that the worker processes running jobs are still alive, while waiting on them
+POLL_INTERVAL = 0.5
+
+
+class Job(object):
+    """
+    A single run of a button's function, possibly on another thread. Cancelling a job that hasn't started stops it from
+    running at all, a running function has to check cancelled() itself to stop early.
+    """
+    def __init__(self, function, args=()):
+        """
+        Initial call method
+        Args:
+            function (callable): The function to run
+            args (list): Values to pass in to the function
+        """
+        self.function = function
+        self.args = list(args)
+        self.result = None
+        self.error = None
+        self.started = False
+        self.finished = False
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.read = 0.0
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        """
+        Asks the job to stop
+        """
+        self.cancel_event.set()
+
+    def run(self):
+        """
+        Runs the function (unless the job was cancelled first), keeping the result or a formatted stack trace and how
+        long it took
+        """
+        if self.cancelled:
+            self.finished = True
+            return
+
+        self.started = True
+        previous = getattr(LOCAL, 'job', None)
+        LOCAL.job = self
+        start, cpu = time.time(), stats.cpu_time()
+        try:
+            self.result = self.function(*self.args)
+        except:
+            self.error = stack_trace()
+        finally:
+            self.wall, self.cpu = time.time() - start, stats.cpu_since(cpu)
+            LOCAL.job = previous
+            self.finished = True
+
+
+class ProcessJob(Job):
+    """
+    A single run of a button's function in one of PROCESS_POOL's worker processes. The function is looked up by name in
+    the worker's copy of the script, and whatever it prints comes back with the result.
+    """
+    def __init__(self, path, name, args=()):
+        """
+        Initial call method
+        Args:
+            path (str): Path to the script
+            name (str): The name of the function in the script
+            args (list): Values to pass in to the function (they have to be picklable)
+        """
+        super(ProcessJob, self).__init__(None, args)
+        self.path = path
+        self.name = name
+        self.output = ''
+        self.pool = None
+        self.token = None
+
+    def submit(self, pool, callback=None):
+        """
+        Sends the job to a worker process
+        Args:
+            pool (ProcessPool): The pool to run the job in
+            callback (callable): Called with no arguments once the job's done (on one of the pool's threads)
+        """
+        self.started = True
+
+        def done(result):
+            if self.finished:
+                return
+            self.result = result.get('result')
+            self.output = result.get('output', '')
+            self.error = result.get('error')
+            self.wall = result.get('wall', 0.0)
+            self.cpu = result.get('cpu')
+            self.finished = True
+            if callback:
+                callback()
+
+        self.pool = pool
+        self.token = pool.apply_async(process_call, (self.path, self.name, self.args), done)
+
+    def cancel(self):
+        """
+        Stops the job by terminating the worker process running it (see ProcessPool.cancel). The job then shows up as
+        lost, but counts as cancelled rather than failed.
+        """
+        super(ProcessJob, self).cancel()
+        if self.token is not None and not self.finished:
+            self.pool.cancel(self.token)
+
+    def lost(self):
+        """
+        Checks if the worker process running the job died (it crashed, was killed, was terminated by cancel or the pool
+        was closed), in which case its callback never comes. A lost job is failed (unless it was cancelled) and counted
+        as finished.
+        Returns:
+            lost (bool): True if the job was lost (only the first time it's checked)
+        """
+        if self.finished or self.token is None or not self.pool.lost(self.token):
+            return False
+
+        if not self.cancelled:
+            self.error = ('# The worker process running {} in {} stopped before it finished (it crashed, was killed or '
+                          'the process pool was closed)\n'.format(self.name, self.path))
+        self.finished = True
+        return True
+
+
+class ProcessPool(object):
+    """
+    Pool of worker processes for running CPU-heavy button functions without the GIL getting in the way. The workers
+    are started on first use and kept warm, and each one only imports a script again if it changed.
+    """
+    def __init__(self, size=None):
+        """
+        Initial call method
+        Args:
+            size (int): Number of worker processes. Defaults to one less than the number of CPUs
+        """
+        self.size = size
+        self.pool = None
+        self.lock = threading.Lock()
+        # The workers put (token, pid) on this queue when they start a call, so lost can tell which ones died. It's
+        # a SimpleQueue so the put is done before a worker that crashes straight after can lose it
+        self.started = None
+        self.generation = 0
+        self.count = 0
+        self.running = {}
+        self.cancelled = set()
+
+    def resize(self, size):
+        """
+        Changes the number of worker processes (the workers are restarted the next time a job is submitted)
+        Args:
+            size (int): Number of worker processes (None for the default)
+        """
+        if size != self.size:
+            self.close()
+            self.size = size
+
+    def apply_async(self, function, args, callback):
+        """
+        Runs a function in a worker process, starting the workers if they aren't already running
+        Args:
+            function (callable): A module level function to run
+            args (tuple): Arguments for the function
+            callback (callable): Called with the function's return value (on one of the pool's threads)
+        Returns:
+            token (tuple): Identifies the call for lost
+        """
+        with self.lock:
+            if self.pool is None:
+                # In a host application like Maya, sys.executable is the application itself rather than Python
+                executable = modules.python_executable()
+                if executable != sys.executable:
+                    multiprocessing.set_executable(executable)
+                self.started = SimpleQueue()
+                self.pool = multiprocessing.Pool(self.size or max(multiprocessing.cpu_count() - 1, 1), init_worker,
+                                                 (self.started,))
+                self.generation += 1
+
+            self.count += 1
+            token = self.generation, self.count
+            self.running[token] = None
+
+            def done(result):
+                with self.lock:
+                    self.running.pop(token, None)
+                    self.cancelled.discard(token)
+                callback(result)
+
+            self.pool.apply_async(pool_call, (token, function, args), callback=done)
+            return token
+
+    def lost(self, token):
+        """
+        Checks if the worker process a call started in has died, or the pool it was sent to was closed
+        Args:
+            token (tuple): What apply_async gave for the call
+        Returns:
+            lost (bool): True if the call will never finish
+        """
+        with self.lock:
+            if self.pool is None or token[0] != self.generation:
+                return True
+            if token not in self.running:
+                return False
+
+            self.read_started()
+            pid = self.running[token]
+            if pid is None:
+                return False
+            # Pool replaces workers that exit, but doesn't give back the calls they were running
+            return pid not in set(worker.pid for worker in self.pool._pool if worker.exitcode is None)
+
+    def cancel(self, token):
+        """
+        Stops a call by terminating the worker process running it (the pool starts another one in its place). Calls
+        that haven't started yet get terminated once they do, the next time lost is checked.
+        Args:
+            token (tuple): What apply_async gave for the call
+        """
+        with self.lock:
+            if self.pool is not None and token in self.running:
+                self.cancelled.add(token)
+                self.read_started()
+
+    def read_started(self):
+        """
+        Keeps track of which worker process each running call started in, terminating the ones running cancelled
+        calls (only call this with the lock held)
+        """
+        while not self.started.empty():
+            started, pid = self.started.get()
+            if started in self.running:
+                self.running[started] = pid
+
+        for token in [token for token in self.cancelled if self.running.get(token) is not None]:
+            self.cancelled.discard(token)
+            for worker in self.pool._pool:
+                if worker.pid == self.running[token] and worker.exitcode is None:
+                    worker.terminate()
+
+    def close(self):
+        """
+        Stops the worker processes
+        """
+        with self.lock:
+            pool, self.pool = self.pool, None
+            self.started = None
+            self.running = {}
+            self.cancelled = set()
+        # Outside of the lock, as terminating waits on the thread that calls the callbacks
+        if pool is not None:
+            pool.terminate()
+
+
+class ResultCache(object):
+    """
+    LRU cache of what a tab's "cache" buttons returned, keyed on the button and the values read from its inputs. The
+    results belong to one version of the script, so the cache empties itself when it's bound to a different one.
+    """
+    def __init__(self, size=128):
+        """
+        Initial call method
+        Args:
+            size (int): The maximum number of results to keep
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        self.counts = {}
+        self.owner = None
+        self.lock = threading.Lock()
+
+    def bind(self, owner):
+        """
+        Ties the cache to a version of the script, clearing it if it's a different version than before
+        Args:
+            owner: Whatever identifies the version (like the script's modules.ScriptModule)
+        """
+        if owner is not self.owner:
+            self.clear()
+            self.owner = owner
+
+    def key(self, label, args):
+        """
+        Gets the cache key for a run of a button
+        Args:
+            label (str): The button's label
+            args (list): The values read from the input widgets
+        Returns:
+            key (tuple): The key (None if the values can't be used as one)
+        """
+        try:
+            key = label, freeze(args)
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def get(self, key, ttl=None):
+        """
+        Gets a cached result and marks it as the most recently used
+        Args:
+            key (tuple): The key from key
+            ttl (float): Seconds a result stays valid for (None for no limit)
+        Returns:
+            found, result (tuple): (bool) True if there's a valid result, (object) The result
+        """
+        with self.lock:
+            counts = self.counts.setdefault(key[0], [0, 0])
+            if key in self.entries:
+                result, stored = self.entries.pop(key)
+                if ttl is None or time.time() - stored < ttl:
+                    self.entries[key] = result, stored
+                    counts[0] += 1
+                    return True, result
+
+            counts[1] += 1
+            return False, None
+
+    def put(self, key, result):
+        """
+        Adds a result, dropping the least recently used ones if there are more than the cache's size
+        Args:
+            key (tuple): The key from key
+            result: What the button's function returned
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = result, time.time()
+            self.trim()
+
+    def resize(self, size):
+        """
+        Changes the maximum number of results to keep
+        Args:
+            size (int): The new size
+        """
+        with self.lock:
+            self.size = size
+            self.trim()
+
+    def trim(self):
+        """
+        Drops the least recently used results until the cache is within its size (the lock has to be held)
+        """
+        while len(self.entries) > max(self.size, 0):
+            self.entries.popitem(last=False)
+
+    def clear(self, label=None):
+        """
+        Empties the cache
+        Args:
+            label (str): Only drops the results for this button
+        """
+        with self.lock:
+            if label is None:
+                self.entries.clear()
+                self.counts.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == label]:
+                    del self.entries[key]
+                self.counts.pop(label, None)
+
+    def stats(self, label=None):
+        """
+        Gets how the cache is doing
+        Args:
+            label (str): Only counts the results for this button
+        Returns:
+            stats (dict): {(int) entries, (int) size, (int) hits, (int) misses, (int) lookups: Hits and misses,
+                           (float) rate: Hits out of every lookup}
+        """
+        with self.lock:
+            if label is None:
+                entries = len(self.entries)
+                hits = sum(counts[0] for counts in self.counts.values())
+                misses = sum(counts[1] for counts in self.counts.values())
+            else:
+                entries = len([key for key in self.entries if key[0] == label])
+                hits, misses = self.counts.get(label, (0, 0))
+            lookups = hits + misses
+            rate = float(hits) / lookups if lookups else 0.0
+            return {'entries': entries, 'size': self.size, 'hits': hits, 'misses': misses, 'lookups': lookups,
+                    'rate': rate}
+
+
+def picklable(value):
+    """
+    Checks whether a value can be sent to a worker process
+    Args:
+        value: The value
+    Returns:
+        picklable (bool): True if it can be pickled
+    """
+    try:
+        pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        return True
+    except Exception:
+        return False
+
+
+def freeze(value):
+    """
+    Converts the lists, dicts and sets the input widgets read in to hashable equivalents
+    Args:
+        value: The value
+    Returns:
+        value: The hashable value (anything else is left as is)
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
+
+
+def init_worker(started):
+    """
+    Sets up a new worker process in ProcessPool
+    Args:
+        started (SimpleQueue): Gets (token, pid) each time the worker starts a call
+    """
+    global WORKER_STARTED
+    WORKER_STARTED = started
+
+
+def pool_call(token, function, args):
+    """
+    Lets the pool know which worker process a call started in, then runs it (see ProcessPool.lost)
+    Args:
+        token (tuple): Identifies the call
+        function (callable): A module level function to run
+        args (tuple): Arguments for the function
+    Returns:
+        result: What the function returned
+    """
+    WORKER_STARTED.put((token, os.getpid()))
+    return function(*args)
+
+
+def process_call(path, name, args):
+    """
+    Runs a function from a script (what the worker processes run). The script's module is kept between calls and only
+    imported again if the script changed.
+    Args:
+        path (str): Path to the script
+        name (str): The name of the function in the script
+        args (list): Values to pass in to the function
+    Returns:
+        result (dict): {(object) result: The return value, (str) output: Anything printed, (str) error: Stack trace if
+                        the function raised, (float) wall: Seconds the function took, (float) cpu: CPU seconds the
+                        function used (None if the platform can't tell)}
+    """
+    output = StringIO()
+    stdout, stderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+    result = {}
+    try:
+        function = worker_module(path).__dict__.get(name)
+        if not callable(function):
+            raise RuntimeError('{} not found in functions/callables in the script'.format(name))
+
+        start, cpu = time.time(), stats.cpu_time()
+        try:
+            value = function(*args)
+        finally:
+            result['wall'], result['cpu'] = time.time() - start, stats.cpu_since(cpu)
+
+        if picklable(value):
+            result['result'] = value
+        else:
+            result['result'] = repr(value)
+    except:
+        result['error'] = stack_trace()
+    finally:
+        sys.stdout, sys.stderr = stdout, stderr
+
+    result['output'] = output.getvalue()
+    return result
+
+
+def worker_module(path):
+    """
+    Gets the worker process' copy of a script's module, importing it if it's new or changed
+    Args:
+        path (str): Path to the script
+    Returns:
+        module (module): The script's module
+    """
+    mtime = os.path.getmtime(path)
+    if path not in WORKER_MODULES or WORKER_MODULES[path][0] != mtime:
+        source = modules.ScriptSource(modules.normalize(path))
+        WORKER_MODULES[path] = mtime, modules.execute(modules.module_name(path), path, source.compile())
+    return WORKER_MODULES[path][1]
+
+
+def current_job():
+    """
+    Gets the job running on the current thread
+    Returns:
+        job (Job): The job (None if the caller isn't running in one)
+    """
+    return getattr(LOCAL, 'job', None)
+
+
+def cancelled():
+    """
+    For long running button functions to check if they've been cancelled (from the button's menu) and should stop
+    Returns:
+        cancelled (bool): True if the function's job was cancelled
+    """
+    job = current_job()
+    return job is not None and job.cancelled
+
+
+def stack_trace():
+    """
+    Formats the exception being handled the way the tabs print them
+    Returns:
+        txt (str): The formatted stack trace
+    """
+    typ, err, tb = sys.exc_info()
+    txt = '# {}\n# Traceback (most recent call last):\n'.format(err)
+    for fl, num, func, line in traceback.extract_tb(tb):
+        txt += '#    File "{}", line {}, in {}\n#      {}\n'.format(fl, num, func, line)
+    txt += '# {}\n'.format(err)
+    return txt
+
+
+# Scripts imported by this process when it's one of the pool's workers {(str) path: ((float) mtime, (module) module)}
+WORKER_MODULES = {}
+
+# Where this process puts the calls it starts when it's one of the pool's workers (see init_worker)
+WORKER_STARTED = None
+
+PROCESS_POOL = ProcessPool()
@@ -0,0 +1,146 @@
+"""
+Module for evaluating the text in the input fields marked up with "eval"
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import ast
+import threading
+from collections import OrderedDict
+
+
+# Literal values of these types can be handed out as is, anything else gets copied so edits don't leak in to the cache
+IMMUTABLE_TYPES = (int, float, complex, bool, str, bytes, type(None), type(u''), type(2 ** 64))
+
+
+class Expression(object):
+    """
+    The text of a field parsed once and kept ready to evaluate. Literals (numbers, strings, lists, tuples, dicts, etc.)
+    are evaluated up front, anything else is compiled to a code object.
+    """
+    def __init__(self, text, filename='<expression>'):
+        """
+        Initial call method
+        Args:
+            text (str): The text to evaluate
+            filename (str): Name for the code in stack traces
+        """
+        self.text = text
+        self.code = None
+        self.value = None
+        self.copy = False
+
+        tree = ast.parse(text.strip(), filename, 'eval')
+        try:
+            self.value = ast.literal_eval(tree)
+            self.literal = True
+            self.copy = not is_immutable(self.value)
+        except (ValueError, TypeError):
+            self.literal = False
+            self.code = compile(tree, filename, 'eval')
+
+    def evaluate(self, namespace=None):
+        """
+        Gets the value of the expression
+        Args:
+            namespace (dict): Globals to evaluate the expression with (not needed for literals)
+        Returns:
+            value (object): The value
+        """
+        if self.literal:
+            return copy_literal(self.value) if self.copy else self.value
+        return eval(self.code, namespace if namespace is not None else {})
+
+
+class ExpressionCache(object):
+    """
+    LRU cache of parsed expressions, keyed on their text, so evaluating text that's been seen before doesn't parse it
+    again
+    """
+    def __init__(self, size=1024):
+        """
+        Initial call method
+        Args:
+            size (int): The maximum number of expressions to keep
+        """
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, text):
+        """
+        Gets the parsed expression for some text, parsing it if it isn't cached
+        Args:
+            text (str): The text
+        Returns:
+            expression (Expression): The expression (raises SyntaxError if the text isn't valid Python)
+        """
+        with self.lock:
+            expression = self.entries.pop(text, None)
+            if expression is not None:
+                self.hits += 1
+                self.entries[text] = expression
+                return expression
+
+        # Text that doesn't parse is never cached, so it raises the same error every time
+        expression = Expression(text)
+        with self.lock:
+            self.misses += 1
+            self.entries[text] = expression
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return expression
+
+    def evaluate(self, text, namespace=None):
+        """
+        Evaluates some text
+        Args:
+            text (str): The text
+            namespace (dict): Globals to evaluate the text with
+        Returns:
+            value (object): The value
+        """
+        return self.get(text).evaluate(namespace)
+
+    def clear(self):
+        """
+        Empties the cache
+        """
+        with self.lock:
+            self.entries.clear()
+
+
+def is_immutable(value):
+    """
+    Checks whether a literal value can be handed out without copying it
+    Args:
+        value: The value
+    Returns:
+        immutable (bool): True if nothing in the value can be changed
+    """
+    if isinstance(value, (tuple, frozenset)):
+        return all(is_immutable(item) for item in value)
+    return isinstance(value, IMMUTABLE_TYPES)
+
+
+def copy_literal(value):
+    """
+    Copies a literal value (much quicker than copy.deepcopy for the handful of types a literal can be)
+    Args:
+        value: The value
+    Returns:
+        value: The copy (immutable values aren't copied)
+    """
+    if isinstance(value, list):
+        return [copy_literal(item) for item in value]
+    if isinstance(value, dict):
+        return dict((copy_literal(key), copy_literal(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return set(value)
+    if isinstance(value, tuple) and not is_immutable(value):
+        return tuple(copy_literal(item) for item in value)
+    return value
+
+
+EXPRESSIONS = ExpressionCache()
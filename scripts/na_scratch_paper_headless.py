@@ -0,0 +1,390 @@
+"""
+Module for running the buttons in na_scratch_paper scripts from the command line, without the UI
+
+    python -m na_scratch_paper_headless list <script>
+    python -m na_scratch_paper_headless run <script> <frame>/<button> [--input VALUE ...] [--json JSON]
+    python -m na_scratch_paper_headless batch <script> <frame>/<button> <rows.jsonl|rows.csv> [--output OUTPUT]
+
+Inputs are given in the order of the button's "inputs" and converted the same way the input widgets would read them.
+Anything not given uses the widget's default from the markup.
+
+Nothing in here relies on Qt, so it starts quickly on machines without a display (like render farm nodes and mayapy)
+"""
+import os
+import sys
+import json
+import argparse
+
+import na_scratch_paper_batch as batch
+import na_scratch_paper_execution as execution
+import na_scratch_paper_expressions as expressions
+import na_scratch_paper_modules as modules
+
+
+# Text accepted for check widgets
+TRUE_TEXT = ('1', 'true', 'yes', 'on', 'y')
+FALSE_TEXT = ('0', 'false', 'no', 'off', 'n', '')
+
+# Widget types that read text the way LineEdit does
+TEXT_TYPES = ('lineEdit', 'cmdLineEdit', 'browse', 'selection')
+
+# Widget types that only lay out the frame and can't be read
+LAYOUT_TYPES = ('stretch', 'spacer', 'separator')
+
+# Types of text values (json gives unicode in Python 2)
+STRING_TYPES = (str, type(u''))
+
+# Stands in for an input that wasn't given a value
+MISSING = object()
+
+
+class Button(object):
+    """
+    A button from a script's markup (or a function in a simple script) along with the markup of the input widgets it
+    reads, so it can be run without building them
+    """
+    def __init__(self, label, frame, function, data=None, widgets=(), namespace=None):
+        """
+        Initial call method
+        Args:
+            label (str): The button's label
+            frame (str): The label of the frame the button is in (empty for simple buttons)
+            function (callable): The button's function
+            data (dict): Dictionary of data from the markup for the button
+            widgets (list): Markup of the frame's input widgets
+            namespace (dict): Globals for evaluating "eval" fields (the script module's)
+        """
+        self.label = label
+        self.frame = frame
+        self.function = function
+        self.data = data or {}
+        self.inputs = [widgets[i] for i in self.data.get('inputs', [])]
+        self.namespace = namespace
+
+    @property
+    def path(self):
+        return '/'.join(filter(None, [self.frame, self.label]))
+
+    def input_label(self, index):
+        """
+        Gets a readable name for one of the button's inputs
+        Args:
+            index (int): Index in to the button's inputs
+        Returns:
+            label (str): The widget's label (or its type if it doesn't have one)
+        """
+        data = self.inputs[index]
+        return (data.get('label') or data.get('placeholderText') or data.get('type', '')).rstrip(': ')
+
+    def args(self, values=None):
+        """
+        Builds the arguments for the button's function
+        Args:
+            values (list or dict): Values in the order of the button's inputs, or a dictionary keyed on the index in to
+                                   the inputs or the input widget's label. Missing values use the widget's default.
+        Returns:
+            args (list): The arguments
+        """
+        if isinstance(values, dict):
+            keyed = dict((str(key), value) for key, value in values.items())
+            values = []
+            for i in range(len(self.inputs)):
+                for key in (str(i), self.input_label(i)):
+                    if key in keyed:
+                        values.append(keyed[key])
+                        break
+                else:
+                    values.append(MISSING)
+        values = list(values or [])
+        if len(values) > len(self.inputs):
+            raise ValueError('"{}" takes {} input(s), {} were given'.format(self.path, len(self.inputs), len(values)))
+
+        values += [MISSING] * (len(self.inputs) - len(values))
+        return [read_value(data, value, self.namespace) for data, value in zip(self.inputs, values)]
+
+    def run(self, values=None):
+        """
+        Runs the button's function
+        Args:
+            values (list or dict): Values for the inputs (see args)
+        Returns:
+            job (execution.Job): The finished job with the result or stack trace
+        """
+        job = execution.Job(self.function, [])
+        try:
+            job.args = self.args(values)
+        except Exception:
+            job.error = execution.stack_trace()
+            job.finished = True
+            return job
+
+        job.run()
+        return job
+
+
+def load_buttons(path):
+    """
+    Imports a script and gets its buttons, resolving functions the same way the tabs do
+    Args:
+        path (str): Path to the script
+    Returns:
+        buttons (list): The Buttons
+    """
+    entry = modules.MODULE_MANAGER.load(path)
+    namespace = entry.module.__dict__
+    if entry.instructions is None:
+        return [Button(entry.functions[name].__name__, '', entry.functions[name], namespace=namespace)
+                for name in modules.simple_names(entry.functions)]
+
+    if not entry.homogenized:
+        modules.homogenize_instructions(entry.instructions, entry.functions)
+        entry.homogenized = True
+
+    buttons = []
+    for group in entry.instructions['contents']:
+        frame = group.get('label', 'Default')
+        if 'simple' in group:
+            buttons.append(Button(group.get('label', group['simple'].__name__), '', group['simple'], group,
+                                  namespace=namespace))
+
+        for data in group.get('buttons', []):
+            buttons.append(Button(data.get('label', data['function'].__name__), frame, data['function'], data,
+                                  group.get('inputWidgets', []), namespace))
+    return buttons
+
+
+def find_button(buttons, name):
+    """
+    Finds a button by its "<frame>/<button>" path, or just its label if that's unique
+    Args:
+        buttons (list): Buttons from load_buttons
+        name (str): The path or label
+    Returns:
+        button (Button): The button
+    """
+    for button in buttons:
+        if button.path == name:
+            return button
+
+    found = [button for button in buttons if button.label == name]
+    if len(found) == 1:
+        return found[0]
+    elif found:
+        raise ValueError('More than one button is labeled "{}", use one of: {}'.format(
+            name, ', '.join('"{}"'.format(button.path) for button in found)))
+    raise ValueError('No button "{}" in the script'.format(name))
+
+
+def function_name(path, function):
+    """
+    Gets the name a button's function has in its script (for running it in another process)
+    Args:
+        path (str): Path to the script
+        function (callable): The function
+    Returns:
+        name (str): The name
+    """
+    for name, each in modules.MODULE_MANAGER.load(path).functions.items():
+        if each is function:
+            return name
+    raise ValueError('{} is not a module level function in {}'.format(function.__name__, path))
+
+
+def read_value(data, value, namespace=None):
+    """
+    Converts a value for an input widget the same way the widget would read it
+    Args:
+        data (dict): The widget's markup
+        value: The value (usually text from the command line, or anything from json). MISSING uses the default
+        namespace (dict): Globals for evaluating "eval" fields
+    Returns:
+        value: What the widget would have read
+    """
+    kind = data.get('type')
+    label = data.get('label', '')
+    if kind in LAYOUT_TYPES:
+        raise ValueError('The "{}" widget does not have read functionality'.format(kind))
+
+    elif kind in ('intSpinner', 'floatSpinner'):
+        value = data.get('value', 0) if value is MISSING else value
+        number = int(value) if kind == 'intSpinner' else round(float(value), 2)
+        return min(max(number, data.get('min', 0)), data.get('max', 99))
+
+    elif kind == 'check':
+        value = data.get('value', False) if value is MISSING else value
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text not in TRUE_TEXT + FALSE_TEXT:
+            raise ValueError('"{}" is not a valid value for the "{}" check box'.format(value, label))
+        return text in TRUE_TEXT
+
+    elif kind in ('selectionMulti', 'pyNodeMulti'):
+        value = '' if value is MISSING else value
+        if data.get('errorIfEmpty') and not value:
+            raise RuntimeError('Field is Empty')
+        names = value if isinstance(value, list) else [each.strip() for each in value.split(',')]
+        if kind == 'pyNodeMulti':
+            import pymel.core as pm
+            return [pm.PyNode(name) for name in names if name]
+        return names
+
+    elif kind == 'pyNode':
+        value = '' if value is MISSING else value
+        if data.get('errorIfEmpty') and not value:
+            raise RuntimeError('Field is Empty')
+        if not value:
+            return None
+        import pymel.core as pm
+        return pm.PyNode(value)
+
+    elif kind in TEXT_TYPES:
+        value = data.get('text', '') if value is MISSING else value
+        if data.get('errorIfEmpty') and value in ('', None):
+            raise ValueError('Text Field is Empty')
+        if not data.get('eval') or kind in ('browse', 'selection'):
+            return value if isinstance(value, STRING_TYPES) else str(value)
+        if not isinstance(value, STRING_TYPES):
+            # Already a value (from json) rather than text to evaluate
+            return value
+
+        try:
+            return expressions.EXPRESSIONS.evaluate(value, namespace) if value else ''
+        except:
+            info = sys.exc_info()
+            raise RuntimeError('Error Occured when reading the "{}" Text Field\nError: {}. {}'.format(
+                label, info[0], info[1]))
+
+    raise ValueError('The "{}" type does not have a class'.format(kind))
+
+
+def list_buttons(path):
+    """
+    Gets a description of every button in a script and the inputs they take
+    Args:
+        path (str): Path to the script
+    Returns:
+        txt (str): The description
+    """
+    txt = ''
+    for button in load_buttons(path):
+        txt += '{}\n'.format(button.path)
+        for i, data in enumerate(button.inputs):
+            default = data.get('value', data.get('text', ''))
+            txt += '    {}: {} ({}, default: {!r})\n'.format(i, button.input_label(i), data.get('type'), default)
+    return txt
+
+
+def format_result(result):
+    """
+    Formats what a function returned for printing
+    Args:
+        result: The return value
+    Returns:
+        txt (str): The value as json if possible, otherwise its repr
+    """
+    try:
+        return json.dumps(result)
+    except (TypeError, ValueError):
+        return repr(result)
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line
+    Args:
+        argv (list): The arguments (defaults to sys.argv)
+    Returns:
+        args (argparse.Namespace): The parsed arguments
+    """
+    parser = argparse.ArgumentParser(prog='na_scratch_paper_headless',
+                                     description='Runs the buttons in Scratch Paper scripts without the UI')
+    commands = parser.add_subparsers(dest='command')
+
+    list_parser = commands.add_parser('list', help='Lists the buttons in a script and their inputs')
+    list_parser.add_argument('script', help='Path to the script')
+
+    run_parser = commands.add_parser('run', help='Runs a button')
+    run_parser.add_argument('script', help='Path to the script')
+    run_parser.add_argument('button', help='"<frame>/<button>", or just the button\'s label if it\'s unique')
+    run_parser.add_argument('-i', '--input', action='append', dest='inputs', default=[],
+                            help='Value for the next input, read the same way the widget reads its text')
+    run_parser.add_argument('-j', '--json', help='A json list of the inputs, or a dictionary keyed on the input '
+                                                 'indices or labels (overrides --input)')
+
+    batch_parser = commands.add_parser('batch', help='Runs a button for every row of a JSONL or CSV file')
+    batch_parser.add_argument('script', help='Path to the script')
+    batch_parser.add_argument('button', help='"<frame>/<button>", or just the button\'s label if it\'s unique')
+    batch_parser.add_argument('rows', help='JSONL file of input lists or dictionaries (see --json), or a CSV file '
+                                           'with a column per input')
+    batch_parser.add_argument('-o', '--output', help='JSONL file for the results. Defaults to <rows>_results.jsonl')
+    batch_parser.add_argument('-c', '--column', action='append', dest='columns', default=[],
+                              help='<column>=<index> Maps a column to an input index, for columns that aren\'t '
+                                   'named after one or after an input\'s label')
+    batch_parser.add_argument('-w', '--workers', type=int, default=batch.WORKERS, help='Rows to run at once')
+    batch_parser.add_argument('-p', '--processes', action='store_true',
+                              help='Runs the rows in worker processes rather than threads (the inputs have to be '
+                                   'picklable)')
+    return parser.parse_args(argv)
+
+
+def run_batch(button, args):
+    """
+    Runs the batch command, writing progress to stderr
+    Args:
+        button (Button): The button to run
+        args (argparse.Namespace): The parsed arguments
+    Returns:
+        code (int): The exit code (1 if any row failed)
+    """
+    process = None
+    if args.processes:
+        path = modules.normalize(args.script)
+        process = path, function_name(path, button.function)
+        execution.PROCESS_POOL.resize(args.workers)
+
+    output = args.output or os.path.splitext(args.rows)[0] + '_results.jsonl'
+    run = batch.BatchRun(button, batch.read_rows(args.rows), output, args.workers, process,
+                         batch.parse_columns(args.columns), batch.Progress(button.path, sys.stderr))
+    try:
+        ok = run.run()
+    finally:
+        execution.PROCESS_POOL.close()
+    sys.stderr.write(run.report())
+    return 0 if ok else 1
+
+
+def main(argv=None):
+    """
+    Runs the command line
+    Args:
+        argv (list): The arguments (defaults to sys.argv)
+    Returns:
+        code (int): The exit code
+    """
+    args = parse_args(argv)
+    try:
+        if args.command == 'list':
+            sys.stdout.write(list_buttons(args.script))
+            return 0
+
+        button = find_button(load_buttons(args.script), args.button)
+        if args.command == 'batch':
+            return run_batch(button, args)
+        values = json.loads(args.json) if args.json else args.inputs
+    except Exception:
+        sys.stderr.write(execution.stack_trace())
+        return 1
+
+    job = button.run(values)
+    if job.error:
+        sys.stderr.write(job.error)
+        return 1
+
+    if job.result is not None:
+        sys.stdout.write('{}\n'.format(format_result(job.result)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
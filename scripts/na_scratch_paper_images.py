@@ -0,0 +1,223 @@
+"""
+Module for caching the icons and background images used in the tabs so each file only gets decoded once
+"""
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from PySide2 import QtCore, QtGui
+
+
+# Pixmaps are pre-scaled for these device pixel ratios (1080p and 4K screens)
+PIXEL_RATIOS = (1.0, 2.0)
+
+# Default size of button icons (at a device pixel ratio of 1)
+ICON_SIZE = 16
+
+
+class ImageCache(object):
+    """
+    Process-wide cache of decoded images, scaled pixmaps and icons keyed on path, mtime and device pixel ratio. Once the
+    cache goes over its memory budget, the least recently used entries get dropped. Decoding images is thread-safe, so
+    it can be done ahead of time on worker threads, but pixmaps and icons can only be made on the main thread.
+    """
+    def __init__(self, budget=64 * 1024 * 1024):
+        """
+        Initial call method
+        Args:
+            budget (int): Memory budget in bytes
+        """
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        self.pool = QtCore.QThreadPool()
+        self.pool.setMaxThreadCount(1)
+
+    def key(self, path, *args):
+        """
+        Gets the cache key for a file, so a changed file never gets its old image
+        Args:
+            path (str): Path to the image
+            *args: Anything else the entry depends on (like the kind of entry, its size and pixel ratio)
+        Returns:
+            key (tuple): The key
+        """
+        path = os.path.normcase(os.path.abspath(path))
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            mtime = None
+        return (path, mtime) + args
+
+    def get(self, key):
+        """
+        Gets an entry and marks it as the most recently used
+        Args:
+            key (tuple): The entry's key
+        Returns:
+            value: The cached value (None if it isn't cached)
+        """
+        with self.lock:
+            if key not in self.entries:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            value, cost = self.entries.pop(key)
+            self.entries[key] = value, cost
+            return value
+
+    def put(self, key, value, cost):
+        """
+        Adds an entry, dropping the least recently used ones if it takes the cache over budget
+        Args:
+            key (tuple): The entry's key
+            value: The value to cache
+            cost (int): Roughly how many bytes the value takes up
+        """
+        with self.lock:
+            if key in self.entries:
+                self.size -= self.entries.pop(key)[1]
+
+            self.entries[key] = value, cost
+            self.size += cost
+            while self.size > self.budget and len(self.entries) > 1:
+                self.size -= self.entries.popitem(last=False)[1][1]
+
+    def image(self, path):
+        """
+        Gets the decoded image for a file. Safe to call from worker threads.
+        Args:
+            path (str): Path to the image
+        Returns:
+            image (QtGui.QImage): The image (null if it couldn't be read)
+        """
+        key = self.key(path, 'image')
+        image = self.get(key)
+        if image is None:
+            image = QtGui.QImage(path)
+            self.put(key, image, image.byteCount())
+        return image
+
+    def pixmap(self, path, size=None, ratio=1.0):
+        """
+        Gets a pixmap of a file, scaled for a device pixel ratio
+        Args:
+            path (str): Path to the image
+            size (int): Size (at a ratio of 1) to fit the image in to. Defaults to the image's own size
+            ratio (float): The device pixel ratio to scale for
+        Returns:
+            pixmap (QtGui.QPixmap): The pixmap
+        """
+        key = self.key(path, 'pixmap', size, ratio)
+        pixmap = self.get(key)
+        if pixmap is None:
+            image = self.image(path)
+            if size and not image.isNull():
+                image = image.scaled(int(size * ratio), int(size * ratio), QtCore.Qt.KeepAspectRatio,
+                                     QtCore.Qt.SmoothTransformation)
+
+            pixmap = QtGui.QPixmap.fromImage(image)
+            self.put(key, pixmap, pixmap.width() * pixmap.height() * pixmap.depth() // 8)
+        return pixmap
+
+    def icon(self, path, size=ICON_SIZE):
+        """
+        Gets an icon of a file with pixmaps for each of the PIXEL_RATIOS, so it looks sharp on both 1080p and 4K
+        Args:
+            path (str): Path to the image
+            size (int): The icon's size (at a ratio of 1)
+        Returns:
+            icon (QtGui.QIcon): The icon
+        """
+        key = self.key(path, 'icon', size)
+        icon = self.get(key)
+        if icon is None:
+            icon = QtGui.QIcon()
+            for ratio in PIXEL_RATIOS:
+                icon.addPixmap(self.pixmap(path, size, ratio))
+
+            # The icon shares its pixmaps with their cache entries so it doesn't cost anything extra
+            self.put(key, icon, 0)
+        return icon
+
+    def prefetch(self, paths=(), scripts=()):
+        """
+        Decodes images on a worker thread so they're ready by the time they're needed
+        Args:
+            paths (list): Paths to the images
+            scripts (list): Paths to scripts to decode the images in the markup of
+        """
+        self.pool.start(ImagePrefetcher(self, paths, scripts))
+
+    def clear(self):
+        """
+        Empties the cache
+        """
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Gets how the cache is doing
+        Returns:
+            stats (dict): {(int) entries, (int) size: Bytes in use, (int) budget, (int) hits, (int) misses}
+        """
+        with self.lock:
+            return {'entries': len(self.entries), 'size': self.size, 'budget': self.budget, 'hits': self.hits,
+                    'misses': self.misses}
+
+
+class ImagePrefetcher(QtCore.QRunnable):
+    """
+    Runnable that decodes images in to the cache on a worker thread
+    """
+    def __init__(self, cache, paths=(), scripts=()):
+        """
+        Initial call method
+        Args:
+            cache (ImageCache): The cache to decode the images in to
+            paths (list): Paths to the images
+            scripts (list): Paths to scripts to decode the images in the markup of
+        """
+        super(ImagePrefetcher, self).__init__()
+        self.cache = cache
+        self.paths = list(paths)
+        self.scripts = list(scripts)
+
+    def run(self):
+        """
+        Decodes the images
+        """
+        paths = list(self.paths)
+        for script in self.scripts:
+            paths.extend(image_paths(script))
+
+        for path in paths:
+            self.cache.image(path)
+
+
+def image_paths(path):
+    """
+    Cheaply scans a script's source for literal "icon" and "image" paths in its markup (for prefetching)
+    Args:
+        path (str): Path to the script
+    Returns:
+        paths (list): Paths to the images that exist
+    """
+    try:
+        with open(path) as f:
+            source = f.read()
+    except (IOError, OSError):
+        return []
+
+    found = re.findall(r'[\'"](?:icon|image)[\'"]\s*:\s*[\'"]([^\'"]+)[\'"]', source)
+    return [image for image in sorted(set(found)) if os.path.isfile(image)]
+
+
+IMAGE_CACHE = ImageCache()
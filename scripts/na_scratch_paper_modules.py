@@ -0,0 +1,648 @@
+"""
+Module containing the classes for importing and caching the scripts loaded in to na_scratch_paper
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import os
+import gc
+import sys
+import imp
+import marshal
+import hashlib
+import inspect
+import weakref
+import multiprocessing
+
+import na_scratch_paper_static as static_analysis
+
+
+CACHE_DIR = os.path.join(os.path.expanduser('~/na_tool_prefs'), 'cache')
+
+# Top level packages that aren't safe to import off of the main thread
+MAIN_THREAD_MODULES = ['maya', 'pymel', 'mtoa', 'PySide2', 'shiboken2', 'PySide', 'shiboken', '__main__']
+
+
+class ScriptModule(object):
+    """
+    An imported (or statically analyzed) source script along with the data the tabs get built from
+    """
+    def __init__(self, path, stat, digest, module=None, static=None, manager=None):
+        """
+        Initial call method
+        Args:
+            path (str): Normalized path to the script
+            stat (tuple): (mtime, size) of the script when it was loaded
+            digest (str): Hash of the script's source when it was loaded
+            module (module): The executed module (None if the script was only statically analyzed)
+            static (tuple): If the script wasn't imported, the (functions, instructions) result of static analysis
+            manager (ModuleManager): The manager that deferred functions import the script through
+        """
+        self.path = path
+        self.stat = stat
+        self.digest = digest
+        self.module = module
+        self.imported = module is not None
+        self.sentinel = None
+        self.homogenized = False
+
+        if self.imported:
+            self.members = inspect.getmembers(module)
+            self.functions = dict((name, member) for name, member in self.members if callable(member))
+            self.instructions = dict(self.members).get('sp_instructions')
+        else:
+            functions, self.instructions = static
+            self.members = []
+            self.functions = dict((name, DeferredFunction(manager, path, name, function.name, function.doc))
+                                  for name, function in functions.items())
+
+
+class DeferredFunction(object):
+    """
+    Stand-in for a callable in a script that was only statically analyzed. The script is imported the first time one
+    of its deferred functions gets called.
+    """
+    def __init__(self, manager, path, name, defined_name, doc):
+        """
+        Initial call method
+        Args:
+            manager (ModuleManager): The manager to import the script through
+            path (str): Path to the script
+            name (str): The name of the callable in the script's namespace
+            defined_name (str): The name the callable was defined with (its __name__)
+            doc (str): The callable's docstring
+        """
+        self.manager = manager
+        self.path = path
+        self.name = name
+        self.__name__ = defined_name
+        self.__doc__ = doc
+
+    def resolve(self):
+        """
+        Imports the script (if it hasn't been already) and looks up the real callable
+        Returns:
+            function (callable): The callable from the imported script
+        """
+        entry = self.manager.load(self.path)
+        if self.name not in entry.functions:
+            raise RuntimeError('{} not found in functions/callables in the script'.format(self.name))
+        return entry.functions[self.name]
+
+    def __call__(self, *args, **kwargs):
+        return self.resolve()(*args, **kwargs)
+
+
+class ModuleManager(object):
+    """
+    Owns the imported script modules. Modules are cached on path, mtime, size and content hash so as long as a script
+    hasn't changed on disk, loading it again reuses the already executed module, its members and its homogenized
+    sp_instructions. When a script does change, the previous version is evicted from sys.modules so refreshing doesn't
+    keep stacking up copies of every script.
+    """
+    def __init__(self):
+        """
+        Initial call method
+        """
+        self.entries = {}
+        self.prepared = {}
+        self.versions = {}
+        self.evicted = []
+        self.hits = 0
+        self.misses = 0
+
+    def is_current(self, entry, stat=None, digest=None, static=False):
+        """
+        Checks if the cached entry is still good to use
+        Args:
+            entry (ScriptModule): The cached entry (or None)
+            stat (tuple): The script's current (mtime, size) to compare against
+            digest (str): The script's current source hash to compare against
+            static (bool): Whether a statically analyzed entry is good enough
+        Returns:
+            current (bool): Whether the entry can be reused
+        """
+        if not entry or not (static or entry.imported):
+            return False
+        return entry.stat == stat or entry.digest == digest
+
+    def prepare(self, path, static=False):
+        """
+        Does all the work of loading a script that doesn't need to happen on the main thread: reading, hashing, static
+        analysis, compiling and importing the modules it depends on. Safe to call from a worker thread, the next load
+        of the script then only has to execute it.
+        Args:
+            path (str): Path to the script
+            static (bool): Whether the script is going to be loaded statically
+        """
+        path = normalize(path)
+        source = ScriptSource(path)
+        if self.is_current(self.entries.get(path), source.stat, static=static):
+            return
+
+        if self.is_current(self.entries.get(path), digest=source.digest, static=static):
+            self.prepared[path] = source
+            return
+
+        if not static or source.analyze() is None:
+            source.compile()
+            source.import_dependencies()
+        self.prepared[path] = source
+
+    def load(self, path, static=False):
+        """
+        Returns the cached module for the script, only importing it if it's new or its contents changed.
+        An unchanged mtime and size costs a single stat, otherwise the source is hashed before deciding to import.
+        Args:
+            path (str): Path to the script
+            static (bool): If True, tries to get the script's callables and markup from its AST instead of importing
+                           it. The returned functions are then DeferredFunctions that import it once called. Falls back
+                           to importing if the script can't be resolved statically.
+        Returns:
+            entry (ScriptModule): The cached script module
+        """
+        path = normalize(path)
+        info = os.stat(path)
+        stat = (info.st_mtime, info.st_size)
+
+        entry = self.entries.get(path)
+        if self.is_current(entry, stat, static=static):
+            self.hits += 1
+            return entry
+
+        # Use the work done by prepare if the script hasn't changed since
+        source = self.prepared.pop(path, None)
+        if not source or source.stat != stat:
+            source = ScriptSource(path, stat)
+
+        if self.is_current(entry, digest=source.digest, static=static):
+            # Touched or re-saved without changes
+            entry.stat = stat
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        result = source.analyze() if static else None
+        if result is not None:
+            new_entry = ScriptModule(path, stat, source.digest, static=result, manager=self)
+        else:
+            self.versions[path] = self.versions.get(path, 0) + 1
+            module = execute('{}_v{}'.format(module_name(path), self.versions[path]), path, source.compile())
+
+            new_entry = ScriptModule(path, stat, source.digest, module)
+            module.__sp_sentinel__ = Sentinel()
+            new_entry.sentinel = weakref.ref(module.__sp_sentinel__)
+
+        if entry:
+            self.evict(entry)
+        self.entries[path] = new_entry
+        return new_entry
+
+    def evict(self, entry):
+        """
+        Removes the module from sys.modules and keeps a weak reference around to tell whether it was actually freed
+        Args:
+            entry (ScriptModule): The script module to evict
+        """
+        if not entry.imported:
+            return
+
+        if sys.modules.get(entry.module.__name__) is entry.module:
+            del sys.modules[entry.module.__name__]
+
+        self.evicted.append(entry.sentinel)
+        entry.module = None
+        entry.members = []
+        entry.functions = {}
+        entry.instructions = None
+
+    def invalidate(self, path=None):
+        """
+        Evicts the module for the script so the next load imports it again. If no path is given, evicts all.
+        Args:
+            path (str): Path to the script you wish to invalidate. If None, invalidates everything.
+        """
+        paths = list(self.entries) if path is None else [normalize(path)]
+        for path in paths:
+            if path in self.entries:
+                self.evict(self.entries.pop(path))
+
+    def prune(self, paths):
+        """
+        Evicts the modules for any scripts that aren't in the given paths (i.e. were removed from the script list)
+        Args:
+            paths (list): Paths to the scripts that are still in use
+        """
+        paths = set(normalize(path) for path in paths)
+        for path in list(self.entries):
+            if path not in paths:
+                self.evict(self.entries.pop(path))
+
+    def stats(self, collect=True):
+        """
+        Counts the module versions the manager has dealt with
+        Args:
+            collect (bool): If True, runs the garbage collector first (modules sit in reference cycles with their
+                            functions, so they're usually only freed by a collection)
+        Returns:
+            stats (dict): {(int) live: Current module versions, (int) evicted: Versions evicted so far,
+                           (int) lingering: Evicted versions still being referenced, (int) hits: Cache hits,
+                           (int) misses: Cache misses}
+        """
+        if collect:
+            gc.collect()
+
+        return {'live': len(self.entries),
+                'evicted': len(self.evicted),
+                'lingering': len([ref for ref in self.evicted if ref() is not None]),
+                'hits': self.hits,
+                'misses': self.misses}
+
+
+class ScriptSource(object):
+    """
+    The source of a script at a point in time, along with whatever has been worked out from it so far
+    """
+    def __init__(self, path, stat=None):
+        """
+        Initial call method
+        Args:
+            path (str): Normalized path to the script
+            stat (tuple): The script's (mtime, size) if it was already looked up
+        """
+        if stat is None:
+            info = os.stat(path)
+            stat = (info.st_mtime, info.st_size)
+
+        self.path = path
+        self.stat = stat
+        self._source = None
+        self._digest = None
+        self._static = False
+        self._code = None
+
+    @property
+    def source(self):
+        """
+        The script's source (only read from disk when first needed)
+        """
+        if self._source is None:
+            with open(self.path, 'rb') as f:
+                self._source = f.read()
+        return self._source
+
+    @property
+    def digest(self):
+        """
+        Hash of the script's source
+        """
+        if self._digest is None:
+            self._digest = hashlib.sha1(self.source).hexdigest()
+        return self._digest
+
+    def analyze(self):
+        """
+        Statically analyzes the script
+        Returns:
+            result (tuple): The result of na_scratch_paper_static.analyze (None if it couldn't be resolved statically)
+        """
+        if self._static is False:
+            self._static = static_analysis.analyze(self.source, self.path)
+        return self._static
+
+    def compile(self):
+        """
+        Compiles the script's source
+        Returns:
+            code (code): The compiled code object
+        """
+        if self._code is None:
+            self._code = BYTECODE_CACHE.load(self.path, self.digest)
+        if self._code is None:
+            self._code = compile(self.source, self.path, 'exec')
+            BYTECODE_CACHE.store(self.path, self.digest, self._code)
+        return self._code
+
+    def import_dependencies(self):
+        """
+        Imports the modules the script imports at the top level so they're already loaded by the time the script
+        itself is executed. Modules that have to be imported on the main thread are skipped, and any failures are
+        ignored since executing the script will raise them properly.
+        """
+        for name in static_analysis.dependencies(self.source, self.path):
+            if name in sys.modules or name.split('.')[0] in MAIN_THREAD_MODULES:
+                continue
+            try:
+                __import__(name)
+            except Exception:
+                pass
+
+
+class BytecodeCache(object):
+    """
+    User level cache of compiled scripts. The scripts live outside of the Python path so they never get .pyc files, this
+    keeps one compiled file per script that's used as long as the script's source hash and the Python version match.
+    """
+    def __init__(self, folder):
+        """
+        Initial call method
+        Args:
+            folder (str): The folder to keep the compiled files in
+        """
+        self.folder = folder
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, path):
+        """
+        Gets the path of the compiled file for a script
+        Args:
+            path (str): Path to the script
+        Returns:
+            cache_path (str): Path to the compiled file
+        """
+        return os.path.join(self.folder, '{}.spc'.format(module_name(path)))
+
+    def load(self, path, digest):
+        """
+        Loads the compiled code for the script if it's in the cache and up to date
+        Args:
+            path (str): Path to the script
+            digest (str): Hash of the script's current source
+        Returns:
+            code (code): The compiled code object or None if it has to be compiled
+        """
+        try:
+            with open(self.cache_path(path), 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+
+        header = self.header(digest)
+        if not data.startswith(header):
+            self.misses += 1
+            return None
+
+        try:
+            code = marshal.loads(data[len(header):])
+        except (EOFError, ValueError, TypeError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return code
+
+    def store(self, path, digest, code):
+        """
+        Writes compiled code for the script to the cache. Failing to write just means it gets compiled next time.
+        Args:
+            path (str): Path to the script
+            digest (str): Hash of the script's source
+            code (code): The compiled code object
+        """
+        cache_path = self.cache_path(path)
+        temp_path = '{}.{}.tmp'.format(cache_path, os.getpid())
+        try:
+            if not os.path.exists(self.folder):
+                os.makedirs(self.folder)
+
+            with open(temp_path, 'wb') as f:
+                f.write(self.header(digest) + marshal.dumps(code))
+
+            # No atomic replace on Windows in Python 2
+            if os.path.exists(cache_path):
+                os.remove(cache_path)
+            os.rename(temp_path, cache_path)
+        except (IOError, OSError):
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def header(self, digest):
+        """
+        Creates the header that has to match for a compiled file to be used
+        Args:
+            digest (str): Hash of the script's source
+        Returns:
+            header (bytes): The Python version's magic number followed by the digest
+        """
+        return imp.get_magic() + digest.encode('ascii')
+
+
+class Sentinel(object):
+    """
+    Placeholder object stashed in each imported module. Modules can't be weak referenced in Python 2, but this lives
+    exactly as long as the module's namespace does, so it's a stand-in for checking if old versions were freed.
+    """
+    pass
+
+
+def normalize(path):
+    """
+    Normalizes a script path for use as a key
+    Args:
+        path (str): Path to the script
+    Returns:
+        path (str): The normalized path
+    """
+    return os.path.normcase(os.path.abspath(path))
+
+
+def local_dependencies(path):
+    """
+    Finds the modules a script imports from its own folder (the ones that are likely to be edited alongside it)
+    Args:
+        path (str): Path to the script
+    Returns:
+        paths (list): Paths to the imported modules' files
+    """
+    try:
+        with open(path, 'rb') as f:
+            source = f.read()
+    except (IOError, OSError):
+        return []
+
+    paths = []
+    folder = os.path.dirname(os.path.abspath(path))
+    for name in static_analysis.dependencies(source, path):
+        base = os.path.join(folder, *name.split('.'))
+        for candidate in (base + '.py', os.path.join(base, '__init__.py')):
+            if os.path.isfile(candidate) and candidate not in paths:
+                paths.append(candidate)
+    return paths
+
+
+def unload_file(path):
+    """
+    Removes any modules loaded from the given file from sys.modules so the next import picks up the file's changes
+    Args:
+        path (str): Path to the module's file
+    """
+    path = os.path.splitext(normalize(path))[0]
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, '__file__', None)
+        if filename and os.path.splitext(normalize(filename))[0] == path:
+            del sys.modules[name]
+
+
+def precompile(paths, processes=None):
+    """
+    Compiles scripts in to the bytecode cache in parallel worker processes so syntax errors show up without importing
+    anything and the first load of each script doesn't have to compile it
+    Args:
+        paths (list): Paths to the scripts
+        processes (int): Number of worker processes. Defaults to the number of CPUs (at most one per script)
+    Returns:
+        errors (dict): {(str) path: (str) error} for each script that couldn't be compiled
+    """
+    paths = [path for path in paths if path]
+    if not paths:
+        return {}
+
+    # In a host application like Maya, sys.executable is the application itself rather than a Python interpreter
+    executable = python_executable()
+    if executable != sys.executable:
+        multiprocessing.set_executable(executable)
+
+    pool = multiprocessing.Pool(min(len(paths), processes or multiprocessing.cpu_count()))
+    try:
+        results = pool.map(precompile_script, paths)
+    finally:
+        pool.close()
+        pool.join()
+
+    return dict((path, error) for path, error in zip(paths, results) if error)
+
+
+def precompile_script(path):
+    """
+    Compiles a single script in to the bytecode cache (what the precompile worker processes run)
+    Args:
+        path (str): Path to the script
+    Returns:
+        error (str): A description of the error if the script couldn't be compiled, otherwise None
+    """
+    try:
+        ScriptSource(normalize(path)).compile()
+    except SyntaxError as err:
+        return '{}: {} (line {}, offset {})\n    {}'.format(err.__class__.__name__, err.msg, err.lineno, err.offset,
+                                                           (err.text or '').strip())
+    except Exception as err:
+        return '{}: {}'.format(err.__class__.__name__, err)
+
+
+def python_executable():
+    """
+    Finds a Python interpreter to run worker processes with. In Maya, that's mayapy next to the Maya executable.
+    Returns:
+        executable (str): Path to the interpreter
+    """
+    name = os.path.basename(sys.executable).lower()
+    if name.startswith('maya'):
+        folder = os.path.dirname(sys.executable)
+        for candidate in ('mayapy.exe', 'mayapy'):
+            if os.path.isfile(os.path.join(folder, candidate)):
+                return os.path.join(folder, candidate)
+    return sys.executable
+
+
+def execute(name, path, code):
+    """
+    Executes compiled script code as a new module
+    Args:
+        name (str): The name to give the module in sys.modules
+        path (str): Path to the script
+        code (code): The script's compiled code
+    Returns:
+        module (module): The executed module
+    """
+    module = imp.new_module(name)
+    module.__file__ = path
+    sys.modules[name] = module
+    try:
+        exec(code, module.__dict__)
+    except:
+        sys.modules.pop(name, None)
+        raise
+    return module
+
+
+def module_name(path):
+    """
+    Creates a module name for importing the script that's unique to the path
+    Args:
+        path (str): Path to the script
+    Returns:
+        name (str): The module name
+    """
+    key = normalize(path)
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+
+    name = 'sp_{}_{}'.format(os.path.splitext(os.path.basename(path))[0], hashlib.sha1(key).hexdigest()[:8])
+    for char in filter(lambda x: not x.isalnum(), name):
+        name = name.replace(char, '_')
+    return name
+
+
+def homogenize_instructions(instructions, functions):
+    """
+    Checks data against fuctions. In order to allow the user to pass in strings or callables in instructions, this
+    will parse it all and turn it in functions.
+    Args:
+        instructions (dict): Instructions for the build such as settings, and widgets
+        functions (dict): The callables to look names up in
+    """
+    for group in instructions['contents']:
+        if group.get('simple'):
+            group['simple'] = str_to_func(group['simple'], functions)
+
+        for button in group.get('buttons', []):
+            button['function'] = str_to_func(button['function'], functions)
+
+        for widget in group.get('inputWidgets', []):
+            if 'buttonCommand' in widget:
+                widget['buttonCommand'] = str_to_func(widget['buttonCommand'], functions)
+
+
+def str_to_func(instruction, functions):
+    """
+    Takes an instruction for a function, and converts it to a function if it's the string name.
+    Args:
+        instruction (str or callable): The name of the function or the function itself
+        functions (dict): The callables to look names up in
+    Returns:
+        function (callable): The function that's called for by the string (returns instruction if it was a callable)
+    """
+    if callable(instruction):
+        return instruction
+    elif instruction in functions:
+        return functions[instruction]
+    else:
+        raise RuntimeError('{} not found in functions/callables in the script'.format(instruction))
+
+
+def simple_names(functions, excluded=()):
+    """
+    Gets the names of the functions that get buttons in a simple tab (skipping any excluded or with a docstring starting
+    with "scratch_exclude")
+    Args:
+        functions (dict): {(str) name: (callable) function} The script's callables
+        excluded (list): Names of functions excluded from the tab
+    Returns:
+        names (list): The sorted names
+    """
+    names = []
+    for name in sorted(functions):
+        if functions[name].__doc__:
+            if functions[name].__doc__.lstrip().startswith('scratch_exclude'):
+                continue
+
+        if name in excluded:
+            continue
+
+        names.append(name)
+    return names
+
+
+MODULE_MANAGER = ModuleManager()
+BYTECODE_CACHE = BytecodeCache(CACHE_DIR)
@@ -0,0 +1,308 @@
+"""
+Module for running pipelines of button functions, where each step can take what the steps before it returned
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import sys
+import time
+from multiprocessing.pool import ThreadPool
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+import na_scratch_paper_execution as execution
+import na_scratch_paper_modules as modules
+
+
+class Pipeline(object):
+    """
+    A named set of steps, each one running a function from a script with the given inputs. Steps run as soon as the
+    steps they depend on are done, so independent branches run at the same time. An input of {"result": "<step id>"}
+    is replaced with what that step returned (which makes it a dependency as well).
+
+    Pipelines are saved as dictionaries of {(str) name, (int) threads: Worker threads for the steps, (list) steps:
+    Dictionaries of {(str) id, (str) script: Path to the script, (str) function: The function's name in the script,
+    (list) inputs: Values to pass in to the function, (list) depends: Ids of steps to wait for, (bool) process: If True,
+    runs in execution.PROCESS_POOL}}
+    """
+    def __init__(self, name, steps, threads=4):
+        """
+        Initial call method
+        Args:
+            name (str): The pipeline's name
+            steps (list): Dictionaries for each step
+            threads (int): Worker threads for the steps that don't run in a process
+        """
+        self.name = name
+        self.steps = [dict(step) for step in steps]
+        self.threads = threads
+        self.dependencies = {}
+
+        ids = [step.get('id') for step in self.steps]
+        for step in self.steps:
+            if not step.get('id') or not step.get('script') or not step.get('function'):
+                raise ValueError('Steps in "{}" need an "id", "script" and "function"'.format(name))
+            if ids.count(step['id']) > 1:
+                raise ValueError('More than one step in "{}" has the id "{}"'.format(name, step['id']))
+
+            depends = set(step.get('depends', [])) | set(result_ids(step.get('inputs', [])))
+            missing = depends - set(ids)
+            if missing:
+                raise ValueError('Step "{}" in "{}" depends on missing step(s): {}'.format(
+                    step['id'], name, ', '.join(sorted(missing))))
+            self.dependencies[step['id']] = depends
+
+        self.order()
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Gets a pipeline from its saved dictionary
+        Args:
+            data (dict): The saved pipeline
+        Returns:
+            pipeline (Pipeline): The pipeline
+        """
+        return cls(data.get('name', 'Pipeline'), data.get('steps', []), data.get('threads', 4))
+
+    def to_dict(self):
+        """
+        Gets the pipeline as a dictionary for saving
+        Returns:
+            data (dict): The pipeline
+        """
+        return {'name': self.name, 'threads': self.threads, 'steps': [dict(step) for step in self.steps]}
+
+    def step(self, step_id):
+        """
+        Gets a step
+        Args:
+            step_id (str): The step's id
+        Returns:
+            step (dict): The step
+        """
+        for step in self.steps:
+            if step['id'] == step_id:
+                return step
+
+    def order(self):
+        """
+        Gets the steps in an order where every step comes after the ones it depends on
+        Returns:
+            ids (list): The ids of the steps
+        """
+        order = []
+        remaining = dict((step_id, set(depends)) for step_id, depends in self.dependencies.items())
+        while remaining:
+            ready = sorted(step_id for step_id, depends in remaining.items() if not depends)
+            if not ready:
+                raise ValueError('The steps in "{}" depend on each other in a loop: {}'.format(
+                    self.name, ', '.join(sorted(remaining))))
+
+            for step_id in ready:
+                del remaining[step_id]
+                for depends in remaining.values():
+                    depends.discard(step_id)
+            order.extend(ready)
+        return order
+
+
+class PipelineRun(object):
+    """
+    A single run of a pipeline. The first step to fail stops the run, cancelling the steps that are still running (see
+    execution.cancelled) and skipping the ones that haven't started.
+    """
+    def __init__(self, pipeline, process_pool=None):
+        """
+        Initial call method
+        Args:
+            pipeline (Pipeline): The pipeline to run
+            process_pool (execution.ProcessPool): Pool for the "process" steps. Defaults to execution.PROCESS_POOL
+        """
+        self.pipeline = pipeline
+        self.process_pool = process_pool or execution.PROCESS_POOL
+        self.functions = None
+        self.jobs = {}
+        self.failed = None
+        self.wall = 0.0
+
+    def prepare(self):
+        """
+        Imports the scripts and finds the functions for the steps (best done on the main thread, as scripts often
+        import modules that need to be)
+        """
+        functions = {}
+        for step in self.pipeline.steps:
+            if step.get('process'):
+                continue
+
+            function = modules.MODULE_MANAGER.load(step['script']).functions.get(step['function'])
+            if function is None:
+                raise RuntimeError('{} not found in functions/callables in {}'.format(step['function'], step['script']))
+            functions[step['id']] = function
+        self.functions = functions
+
+    def run(self):
+        """
+        Runs the steps, waiting for them all to finish
+        Returns:
+            ok (bool): True if every step succeeded
+        """
+        if self.functions is None:
+            self.prepare()
+
+        start = time.time()
+        waiting = dict((step_id, set(depends)) for step_id, depends in self.pipeline.dependencies.items())
+        finished = Queue()
+        pool = ThreadPool(max(self.pipeline.threads, 1))
+        running = 0
+        try:
+            while True:
+                if self.failed is None:
+                    for step_id in sorted(step_id for step_id, depends in waiting.items() if not depends):
+                        del waiting[step_id]
+                        self.submit(step_id, pool, finished)
+                        running += 1
+
+                if not running:
+                    break
+
+                step_id = self.wait(finished)
+                running -= 1
+                if getattr(self.jobs[step_id], 'output', ''):
+                    sys.stdout.write(self.jobs[step_id].output)
+                if self.jobs[step_id].error and self.failed is None:
+                    self.failed = step_id
+                    for job in self.jobs.values():
+                        if not job.finished:
+                            job.cancel()
+
+                for depends in waiting.values():
+                    depends.discard(step_id)
+        finally:
+            pool.close()
+            self.wall = time.time() - start
+
+        return self.failed is None
+
+    def wait(self, finished):
+        """
+        Waits for the next step to finish. A "process" step whose worker process died never calls back, so those are
+        checked for every so often and failed instead (see execution.ProcessJob.lost).
+        Args:
+            finished (Queue): The queue the steps put their ids on once they're done
+        Returns:
+            step_id (str): The id of the step that finished
+        """
+        while True:
+            try:
+                return finished.get(timeout=execution.POLL_INTERVAL)
+            except Empty:
+                pass
+
+            for step_id, job in self.jobs.items():
+                if isinstance(job, execution.ProcessJob) and job.lost():
+                    return step_id
+
+    def submit(self, step_id, pool, finished):
+        """
+        Starts a step
+        Args:
+            step_id (str): The step's id
+            pool (ThreadPool): Pool for the steps that don't run in a process
+            finished (Queue): Gets the step's id once it's done
+        """
+        step = self.pipeline.step(step_id)
+        args = []
+        for value in step.get('inputs', []):
+            if is_result(value):
+                args.append(self.jobs[value['result']].result)
+            else:
+                args.append(value)
+
+        def done(*unused):
+            finished.put(step_id)
+
+        if step.get('process'):
+            job = execution.ProcessJob(modules.normalize(step['script']), step['function'], args)
+            self.jobs[step_id] = job
+            job.submit(self.process_pool, done)
+        else:
+            job = execution.Job(self.functions[step_id], args)
+            self.jobs[step_id] = job
+            pool.apply_async(job.run, callback=done)
+
+    def state(self, step_id):
+        """
+        Gets how a step went
+        Args:
+            step_id (str): The step's id
+        Returns:
+            state (str): "done", "failed", "cancelled" (started but stopped by a failure elsewhere) or "skipped"
+        """
+        job = self.jobs.get(step_id)
+        if job is None or not job.started:
+            return 'skipped'
+        if job.error:
+            return 'failed'
+        if job.cancelled:
+            return 'cancelled'
+        return 'done'
+
+    def report(self):
+        """
+        Gets a summary of the run with each step's timing, and the stack trace of the step that failed
+        Returns:
+            txt (str): The summary
+        """
+        if self.failed is None:
+            txt = '# Pipeline "{}" finished in {:.2f}s\n'.format(self.pipeline.name, self.wall)
+        else:
+            txt = '# Pipeline "{}" failed at "{}" after {:.2f}s\n'.format(self.pipeline.name, self.failed, self.wall)
+
+        width = max(len(step_id) for step_id in self.pipeline.dependencies) if self.pipeline.dependencies else 0
+        for step_id in self.pipeline.order():
+            state = self.state(step_id)
+            timing = '{:.3f}s'.format(self.jobs[step_id].wall) if state != 'skipped' else ''
+            txt += '#    {}  {:<9} {}'.format(step_id.ljust(width), state, timing).rstrip() + '\n'
+
+        if self.failed is not None:
+            txt += self.jobs[self.failed].error
+        return txt
+
+
+def is_result(value):
+    """
+    Checks if an input is the result of another step
+    Args:
+        value: The input
+    Returns:
+        result (bool): True if it's a {"result": "<step id>"} dictionary
+    """
+    return isinstance(value, dict) and list(value) == ['result']
+
+
+def result_ids(inputs):
+    """
+    Gets the steps a step's inputs take the results of
+    Args:
+        inputs (list): The step's inputs
+    Returns:
+        ids (list): The ids of the steps
+    """
+    return [value['result'] for value in inputs if is_result(value)]
+
+
+def step_data(script, function, label=None, inputs=()):
+    """
+    Gets the dictionary for a step (like for copying a button in to a pipeline)
+    Args:
+        script (str): Path to the script
+        function (str): The function's name in the script
+        label (str): The step's id. Defaults to the function's name
+        inputs (list): Values to pass in to the function
+    Returns:
+        step (dict): The step
+    """
+    return {'id': label or function, 'script': script, 'function': function, 'inputs': list(inputs), 'depends': []}
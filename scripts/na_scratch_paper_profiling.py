@@ -0,0 +1,217 @@
+"""
+Module for profiling the functions behind the buttons in na_scratch_paper
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import threading
+
+
+PROFILE_DIR = os.path.join(os.path.expanduser('~/na_tool_prefs'), 'profiles')
+
+# Seconds between samples when sampling
+SAMPLE_INTERVAL = 0.005
+
+# What the profile tables can be sorted by ((str) row key, (str) label)
+SORT_KEYS = (('cumtime', 'Cumulative Time'), ('tottime', 'Total Time'), ('ncalls', 'Calls'), ('callers', 'Callers'))
+
+
+class Profiler(object):
+    """
+    Wraps a function so its next call is profiled, either deterministically with cProfile or by sampling the calling
+    thread's stack (for functions that run too long for cProfile's overhead). The results are saved to a file in
+    PROFILE_DIR, a .pstats file for cProfile and a .json file of the rows for sampling.
+    """
+    def __init__(self, function, name='profile', sampling=False, directory=PROFILE_DIR):
+        """
+        Initial call method
+        Args:
+            function (callable): The function to profile
+            name (str): Name for the saved file (it gets a timestamp added)
+            sampling (bool): If True, samples the stack rather than using cProfile
+            directory (str): Folder to save the results in
+        """
+        self.function = function
+        self.__name__ = getattr(function, '__name__', name)
+        self.__doc__ = getattr(function, '__doc__', None)
+        self.name = name
+        self.sampling = sampling
+        self.directory = directory
+        self.path = None
+
+    def __call__(self, *args):
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+        path = os.path.join(self.directory, '{}_{}'.format(safe_name(self.name), time.strftime('%Y%m%d_%H%M%S')))
+
+        if self.sampling:
+            sampler = Sampler(root=sys._getframe())
+            sampler.start()
+            try:
+                return self.function(*args)
+            finally:
+                sampler.stop()
+                self.path = path + '.json'
+                with open(self.path, 'w') as f:
+                    json.dump(sampler.rows(), f, indent=4)
+
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(self.function, *args)
+        finally:
+            self.path = path + '.pstats'
+            profile.dump_stats(self.path)
+
+
+class Sampler(object):
+    """
+    Samples a thread's stack on a background thread. It only looks at the stack every SAMPLE_INTERVAL, so it adds
+    next to no overhead to the function being profiled, at the cost of timings being estimates.
+    """
+    def __init__(self, thread_id=None, interval=SAMPLE_INTERVAL, root=None):
+        """
+        Initial call method
+        Args:
+            thread_id (int): Ident of the thread to sample. Defaults to the current thread
+            interval (float): Seconds between samples
+            root (frame): Frame to stop walking up the stack at, so whatever called it is left out of the samples
+        """
+        self.thread_id = thread_id or threading.current_thread().ident
+        self.interval = interval
+        self.root = root
+        self.samples = 0
+        self.own = {}
+        self.cumulative = {}
+        self.callers = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Starts sampling
+        """
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stops sampling (waiting for the last sample to be taken)
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def run(self):
+        """
+        Takes samples until stopped (on the sampling thread)
+        """
+        while not self.stop_event.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame)
+            self.stop_event.wait(self.interval)
+
+    def sample(self, frame):
+        """
+        Adds a stack to the counts
+        Args:
+            frame (frame): The frame at the top of the stack
+        """
+        self.samples += 1
+        seen = set()
+        callee = None
+        while frame is not None and frame is not self.root:
+            code = frame.f_code
+            key = code.co_filename, code.co_firstlineno, code.co_name
+            if callee is None:
+                self.own[key] = self.own.get(key, 0) + 1
+            else:
+                self.callers.setdefault(callee, set()).add(key)
+            if key not in seen:
+                seen.add(key)
+                self.cumulative[key] = self.cumulative.get(key, 0) + 1
+            callee = key
+            frame = frame.f_back
+
+    def rows(self):
+        """
+        Gets the samples as profile rows (see stats_rows). Calls are counted in samples.
+        Returns:
+            rows (list): The rows
+        """
+        rows = []
+        for key, count in self.cumulative.items():
+            rows.append({'function': function_label(key), 'ncalls': count,
+                         'tottime': self.own.get(key, 0) * self.interval, 'cumtime': count * self.interval,
+                         'callers': sorted(function_label(caller) for caller in self.callers.get(key, ()))})
+        return rows
+
+
+def stats_rows(path):
+    """
+    Reads the rows of a saved profile
+    Args:
+        path (str): Path to a .pstats file from cProfile or a .json file from sampling
+    Returns:
+        rows (list): Dictionaries of {(str) function: file:line(name), (int) ncalls, (float) tottime: Seconds spent in
+                     the function itself, (float) cumtime: Seconds spent in it and what it called, (list) callers:
+                     Labels of the functions that called it}
+    """
+    if os.path.splitext(path)[1].lower() == '.json':
+        with open(path) as f:
+            return json.load(f)
+
+    rows = []
+    for key, (primitive, ncalls, tottime, cumtime, callers) in pstats.Stats(path).stats.items():
+        rows.append({'function': function_label(key), 'ncalls': ncalls, 'tottime': tottime, 'cumtime': cumtime,
+                     'callers': sorted(function_label(caller) for caller in callers)})
+    return rows
+
+
+def top_rows(rows, sort='cumtime', limit=50):
+    """
+    Gets the top rows of a profile
+    Args:
+        rows (list): Rows from stats_rows
+        sort (str): One of the SORT_KEYS to sort by
+        limit (int): The maximum number of rows (None for all of them)
+    Returns:
+        rows (list): The rows, highest first
+    """
+    if sort == 'callers':
+        ranked = sorted(rows, key=lambda x: len(x['callers']), reverse=True)
+    else:
+        ranked = sorted(rows, key=lambda x: x[sort], reverse=True)
+    return ranked[:limit] if limit else ranked
+
+
+def function_label(key):
+    """
+    Formats a function the way pstats prints them
+    Args:
+        key (tuple): (filename, line number, function name)
+    Returns:
+        label (str): file:line(name) (just the name for builtins)
+    """
+    filename, line, name = key
+    if filename == '~':
+        return name
+    return '{}:{}({})'.format(os.path.basename(filename), line, name)
+
+
+def safe_name(name):
+    """
+    Makes a button's label usable in a file name
+    Args:
+        name (str): The label
+    Returns:
+        name (str): The label with anything but letters, numbers, dashes and underscores replaced
+    """
+    return ''.join(char if char.isalnum() or char in '-_' else '_' for char in name) or 'profile'
+
@@ -0,0 +1,387 @@
+"""
+Module for searching the buttons and groups in the tabs
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import re
+import heapq
+import bisect
+
+# Characters that start a new word in a label
+WORD_SEPARATORS = ' _-./:\n'
+
+# Queries up to this long are matched a tier at a time first (see FuzzyMatcher.tiered_match)
+TIERED_LENGTH = 2
+
+# Extra score for fuzzy matches where every character starts a word, so they rank above weaker fuzzy matches in
+# shorter text
+ACRONYM_BONUS = 20
+
+
+class SearchIndex(object):
+    """
+    Trigram index over the searchable text of a tab's buttons and groups. Keys of three or more characters are looked
+    up in the index rather than checked against every entry, and a query that only narrows the previous one (like when
+    typing another character) only checks what the previous one matched.
+    """
+    def __init__(self, entries=()):
+        """
+        Initial call method
+        Args:
+            entries (list): Searchable text for each entry. Results are given as indices in to this list
+        """
+        self.texts = []
+        self.trigrams = {}
+        self.last_query = None
+        self.last_result = None
+
+        for text in entries:
+            self.add(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        """
+        Adds an entry to the index
+        Args:
+            text (str): The entry's searchable text
+        Returns:
+            index (int): The entry's index
+        """
+        index = len(self.texts)
+        text = to_text(text).lower()
+        self.texts.append(text)
+
+        for trigram in trigrams(text):
+            self.trigrams.setdefault(trigram, set()).add(index)
+
+        self.last_query = None
+        self.last_result = None
+        return index
+
+    def search(self, keys):
+        """
+        Finds the entries that contain every key
+        Args:
+            keys (list): Lowercase search keys. If a key begins with "not " the entries containing the rest are excluded
+        Returns:
+            result (set): Indices of the matching entries
+        """
+        positive, negative = parse_keys(keys)
+        if not positive and not negative:
+            return set(range(len(self.texts)))
+
+        if self.last_query and narrows(self.last_query, (positive, negative)):
+            candidates = self.last_result
+        else:
+            candidates = None
+
+        # Every trigram of a key has to be in an entry for it to contain the key
+        for key in positive:
+            for trigram in sorted(trigrams(key), key=lambda x: len(self.trigrams.get(x, ()))):
+                postings = self.trigrams.get(trigram, set())
+                candidates = postings.copy() if candidates is None else candidates & postings
+                if not candidates:
+                    break
+
+        if candidates is None:
+            candidates = range(len(self.texts))
+
+        texts = self.texts
+        result = set(i for i in candidates if all(key in texts[i] for key in positive) and
+                     not any(key in texts[i] for key in negative))
+
+        self.last_query = (positive, negative)
+        self.last_result = result
+        return result
+
+
+class FuzzyMatcher(object):
+    """
+    Ranks entries by how well a query's characters match them in order (so "mkcb" finds "Make Cube"). The best
+    matches for one or two character queries, which match most entries, are looked for a tier at a time (see
+    tiered_match). Otherwise entries missing any of the query's characters are ruled out with a bitmask check before
+    the rest get scored, and a query that only had characters added to the end only re-checks what the previous one
+    matched.
+    """
+    def __init__(self, entries=()):
+        """
+        Initial call method
+        Args:
+            entries (list): Text for each entry. Results are given as indices in to this list
+        """
+        self.texts = []
+        self.masks = []
+        self.penalties = []
+        self.last_query = None
+        self.last_matches = None
+        self.blob = None
+        self.offsets = []
+
+        for text in entries:
+            self.add(text)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def add(self, text):
+        """
+        Adds an entry to the matcher
+        Args:
+            text (str): The entry's text
+        Returns:
+            index (int): The entry's index
+        """
+        # Null and \x01 characters mark the entries and words in the blob
+        text = to_text(text).lower().replace(u'\x00', u' ').replace(u'\x01', u' ')
+        self.texts.append(text)
+        self.masks.append(char_mask(text))
+        self.penalties.append(min(len(text), 100) // 10)
+
+        self.last_query = None
+        self.last_matches = None
+        self.blob = None
+        return len(self.texts) - 1
+
+    def build_blob(self):
+        """
+        Joins the entries in to one string for tiered_match to search. Each entry starts with a null character and
+        every character that starts a word is marked with a \\x01 in front of it, so the tiers can be found with plain
+        substring searches.
+        """
+        blob = u'\x00' + u'\x00'.join(self.texts)
+        for char in WORD_SEPARATORS + '\x00':
+            blob = blob.replace(char, char + u'\x01')
+        self.blob = blob
+        self.offsets = [found.start() for found in re.finditer(u'\x00', blob)]
+
+    def match(self, query, limit=50, boosts=None):
+        """
+        Finds and ranks the entries matching the query
+        Args:
+            query (str): The query
+            limit (int): The maximum number of results
+            boosts (dict): {(int) index: (int) score} Extra score for entries, like ones that have been used recently
+        Returns:
+            results (list): (score, index) tuples for the best matches, best first
+        """
+        query = to_text(query).lower().strip()
+        boosts = boosts or {}
+        if not query:
+            # Nothing to match, so it's just the boosted entries followed by the rest in order
+            ranked = sorted(range(len(self.texts)), key=lambda x: (-boosts.get(x, 0), x))
+            return [(boosts.get(i, 0), i) for i in ranked[:limit]]
+
+        results = self.tiered_match(query, limit, boosts)
+        if results is not None:
+            return results
+
+        if self.last_query and query.startswith(self.last_query):
+            candidates = self.last_matches
+        else:
+            mask = char_mask(query)
+            candidates = [i for i, entry_mask in enumerate(self.masks) if entry_mask & mask == mask]
+
+        # Contiguous matches are by far the most common, so they're scored in bulk rather than through fuzzy_score
+        texts = self.texts
+        penalties = self.penalties
+        found = [(i, texts[i].find(query)) for i in candidates]
+        base = 100 + 10 * len(query)
+        scores = [(base + (50 if pos == 0 else 25 if texts[i][pos - 1] in WORD_SEPARATORS else 0) - penalties[i] +
+                   boosts.get(i, 0), -i) for i, pos in found if pos != -1]
+        matches = [i for i, pos in found if pos != -1]
+
+        for i, pos in found:
+            if pos == -1:
+                score = fuzzy_score(query, texts[i])
+                if score is not None:
+                    matches.append(i)
+                    scores.append((score + boosts.get(i, 0), -i))
+
+        self.last_query = query
+        self.last_matches = matches
+        return [(score, -i) for score, i in heapq.nlargest(limit, scores)]
+
+    def tiered_match(self, query, limit=50, boosts=None):
+        """
+        Finds the best matches of a short query a tier at a time: the query at the start of an entry, at the start of
+        a word, anywhere, then fuzzy matches where every character starts a word. Every tier scores higher than the
+        ones after it, so once "limit" matches beat what's left the rest of the entries never get looked at. Each
+        tier is a single search over the blob, so only the entries it finds cost anything in Python. Queries that
+        mostly match weakly (like "mk" when few entries have words starting with m and k) don't find enough, and
+        fall back to scoring every candidate.
+        Args:
+            query (str): The lowercase query
+            limit (int): The maximum number of results
+            boosts (dict): {(int) index: (int) score} Extra score for entries (these are always scored)
+        Returns:
+            results (list): (score, index) tuples like match gives, or None if the tiers didn't find enough (or the
+                            query is too long or has word separators in it, which breaks the tiers' order)
+        """
+        if len(query) > TIERED_LENGTH or any(char in WORD_SEPARATORS for char in query):
+            return None
+        if self.blob is None:
+            self.build_blob()
+
+        boosts = boosts or {}
+        escaped = [re.escape(char) for char in query]
+        base = 100 + 10 * len(query)
+        # (pattern, the highest score anything the tier and the ones before it didn't find can have)
+        tiers = [(u'\x00\x01' + ''.join(escaped), base + 25),
+                 (u'\x01' + ''.join(escaped), base),
+                 (''.join(escaped), 9 * len(query) + ACRONYM_BONUS)]
+        if len(query) > 1:
+            tiers.append((u'\x01' + u'[^\x00]*?\x01'.join(escaped), 9 * len(query) - 3))
+
+        texts = self.texts
+        offsets = self.offsets
+        scores = {}
+        for pattern, bound in tiers:
+            for i in set(bisect.bisect(offsets, found.start()) - 1 for found in re.finditer(pattern, self.blob)):
+                if i not in scores and i not in boosts:
+                    scores[i] = fuzzy_score(query, texts[i])
+            if sum(1 for score in scores.values() if score is not None and score > bound) >= limit:
+                break
+        else:
+            if len(query) > 1:
+                # Weak fuzzy matches were never looked for
+                return None
+
+        results = [(score, -i) for i, score in scores.items() if score is not None]
+        for i, boost in boosts.items():
+            score = fuzzy_score(query, texts[i])
+            if score is not None:
+                results.append((score + boost, -i))
+        return [(score, -i) for score, i in heapq.nlargest(limit, results)]
+
+
+def to_text(value):
+    """
+    Converts a label, tooltip or docstring to text so str and unicode values can be searched together
+    Args:
+        value: The value (None gives an empty string)
+    Returns:
+        text (unicode): The text
+    """
+    if value is None:
+        return u''
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return type(u'')(value)
+
+
+def join_text(*values):
+    """
+    Joins values in to one searchable text. They're separated by new lines so keys never match across two values
+    Args:
+        *values: Labels, tooltips, docstrings, etc.
+    Returns:
+        text (unicode): The joined text
+    """
+    return u'\n'.join(to_text(value) for value in values if value)
+
+
+def trigrams(text):
+    """
+    Gets the three character sequences in some text
+    Args:
+        text (str): The text
+    Returns:
+        trigrams (set): The trigrams (empty for text shorter than 3 characters)
+    """
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def parse_keys(keys):
+    """
+    Splits search keys in to the ones that have to be found and the ones that can't be
+    Args:
+        keys (list): Lowercase search keys. If a key begins with "not " the rest of it is excluded
+    Returns:
+        positive, negative (tuple): (tuple) Keys that must be found, (tuple) Keys that must not be found
+    """
+    positive = []
+    negative = []
+    for key in keys:
+        key = to_text(key).strip()
+        if key.startswith('not '):
+            key = key[4:].strip()
+            if key:
+                negative.append(key)
+        elif key:
+            positive.append(key)
+    return tuple(positive), tuple(negative)
+
+
+def narrows(previous, query):
+    """
+    Checks if anything matching a query would also have matched the previous one (so only the previous results need
+    checking)
+    Args:
+        previous (tuple): The previous (positive, negative) keys from parse_keys
+        query (tuple): The new (positive, negative) keys from parse_keys
+    Returns:
+        narrows (bool): True if the query's results are a subset of the previous results
+    """
+    positive, negative = query
+    return all(any(old in key for key in positive) for old in previous[0]) and set(previous[1]) <= set(negative)
+
+
+def char_mask(text):
+    """
+    Gets a bitmask of the characters in some text for quickly ruling out text that's missing characters. Characters
+    can share bits so it can give false positives, but never false negatives.
+    Args:
+        text (str): The text
+    Returns:
+        mask (int): The bitmask
+    """
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def fuzzy_score(query, text):
+    """
+    Scores how well a query matches some text. The query's characters have to appear in the text in order. Matches
+    score higher when they're one contiguous run, at the start of the text or words in it, and in shorter text, and
+    fuzzy matches where every character starts a word get ACRONYM_BONUS.
+    Args:
+        query (str): The lowercase query
+        text (str): The lowercase text
+    Returns:
+        score (int): The score (None if the query doesn't match)
+    """
+    index = text.find(query)
+    if index != -1:
+        score = 100 + 10 * len(query)
+        if index == 0:
+            score += 50
+        elif text[index - 1] in WORD_SEPARATORS:
+            score += 25
+        return score - min(len(text), 100) // 10
+
+    score = 0
+    pos = 0
+    previous = -2
+    acronym = True
+    for char in query:
+        pos = text.find(char, pos)
+        if pos == -1:
+            return None
+
+        score += 1
+        if pos == 0 or text[pos - 1] in WORD_SEPARATORS:
+            score += 8
+        else:
+            acronym = False
+        if pos == previous + 1:
+            score += 5
+        previous = pos
+        pos += 1
+
+    if acronym:
+        score += ACRONYM_BONUS
+    return score - min(len(text), 100) // 10
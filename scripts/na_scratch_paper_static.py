@@ -0,0 +1,459 @@
+"""
+Module for working out a script's buttons and markup from its AST without running any of its module-level code
+
+Anything that can't be worked out with certainty makes analyze return None so the caller falls back to importing
+"""
+import os
+import ast
+import imp
+
+
+# Calls that are safe to evaluate statically since they have no side effects and never return callables
+PURE_CALLS = {
+    'os.path.join': os.path.join,
+    'os.path.dirname': os.path.dirname,
+    'os.path.basename': os.path.basename,
+    'os.path.splitext': os.path.splitext,
+    'os.path.normpath': os.path.normpath,
+    'os.path.expanduser': os.path.expanduser,
+    'range': lambda *args: list(range(*args)),
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'list': list,
+    'tuple': tuple,
+    'dict': dict,
+    'len': len,
+    'sorted': sorted,
+}
+
+# Node types that always evaluate to something that isn't callable, even if the contents can't be worked out
+NON_CALLABLE_NODES = tuple(getattr(ast, name) for name in ['List', 'Tuple', 'Dict', 'Set', 'ListComp', 'SetComp',
+                                                           'DictComp', 'GeneratorExp', 'Str', 'Bytes', 'Num',
+                                                           'JoinedStr', 'Constant', 'Compare'] if hasattr(ast, name))
+
+
+class Unresolved(Exception):
+    """
+    Raised when part of the script can't be resolved statically
+    """
+    pass
+
+
+class StaticFunction(object):
+    """
+    Stand-in for a callable found in the script's AST
+    """
+    def __init__(self, name, doc):
+        """
+        Initial call method
+        Args:
+            name (str): The name the callable is defined with (its __name__ once imported)
+            doc (str): The callable's docstring
+        """
+        self.name = name
+        self.doc = doc
+
+
+class ScriptAnalyzer(object):
+    """
+    Walks the top level of a script and keeps track of what each name is bound to
+    """
+    def __init__(self, path):
+        """
+        Initial call method
+        Args:
+            path (str): Path to the script (used for __file__)
+        """
+        self.path = path
+        self.functions = {}
+        self.values = {'__file__': path}
+        self.unknown = set()
+        self.modules = {}
+        self.instructions = None
+
+    def analyze(self, tree):
+        """
+        Goes through each statement at the top level of the script
+        Args:
+            tree (ast.Module): The parsed script
+        """
+        for node in tree.body:
+            self.statement(node)
+
+    def statement(self, node):
+        """
+        Works out which names a top level statement binds and whether they could be callable
+        Args:
+            node (ast.stmt): The statement
+        """
+        kind = type(node).__name__
+
+        if kind in ('FunctionDef', 'AsyncFunctionDef', 'ClassDef'):
+            if node.decorator_list:
+                raise Unresolved('Decorated callable "{}"'.format(node.name))
+            self.bind(node.name, function=StaticFunction(node.name, ast.get_docstring(node, clean=False)))
+
+        elif kind == 'Import':
+            for alias in node.names:
+                if alias.asname:
+                    self.bind(alias.asname, module=alias.name)
+                else:
+                    base = alias.name.split('.')[0]
+                    self.bind(base, module=base)
+
+        elif kind == 'ImportFrom':
+            if node.module == '__future__':
+                return
+            for alias in node.names:
+                # Only submodules are known not to be callable. Anything else imported could be a function or class
+                name = '{}.{}'.format(node.module, alias.name) if node.module else alias.name
+                if alias.name == '*' or node.level or not is_module(name):
+                    raise Unresolved('Import of "{}" might be callable'.format(alias.name))
+                self.bind(alias.asname or alias.name, module=name)
+
+        elif kind in ('Assign', 'AnnAssign'):
+            targets = node.targets if kind == 'Assign' else [node.target]
+            if node.value is None:
+                return
+
+            for target in targets:
+                if self.is_instructions(target):
+                    self.instructions_assign(node.value)
+                elif isinstance(target, ast.Name):
+                    self.assign(target.id, node.value)
+                elif isinstance(target, ast.Subscript) and self.references_instructions(target):
+                    self.instructions_item_assign(target, node.value)
+                elif isinstance(target, (ast.Subscript, ast.Attribute)) and \
+                        not self.references_instructions(node.value):
+                    # Setting an item/attribute on something else doesn't bind any names in the script, as long as
+                    # it isn't changing (or holding on to) a value that could end up in sp_instructions
+                    self.check_mutation(target, node.value)
+                    continue
+                else:
+                    raise Unresolved('Unsupported assignment on line {}'.format(node.lineno))
+
+        elif kind == 'AugAssign':
+            if not isinstance(node.target, ast.Name) or node.target.id == 'sp_instructions' or \
+                    node.target.id in self.functions:
+                raise Unresolved('Unsupported augmented assignment on line {}'.format(node.lineno))
+            # Lists and the like are changed in place (and might already be in sp_instructions)
+            self.check_mutation(node.target)
+            self.bind(node.target.id)
+
+        elif kind == 'Expr':
+            if isinstance(node.value, ast.Call) and self.is_instructions_call(node.value):
+                self.instructions_call(node.value)
+            elif self.references_instructions(node.value):
+                raise Unresolved('sp_instructions used in an expression on line {}'.format(node.lineno))
+            elif any(isinstance(child, ast.Call) for child in ast.walk(node.value)):
+                # Calls like group['buttons'].append(...) or helper(group) can change the values they're given
+                self.check_mutation(node.value)
+
+        elif kind == 'If' and self.is_main_check(node.test):
+            # Never true when imported by the tool
+            return
+
+        elif kind in ('Pass', 'Print'):
+            return
+
+        else:
+            raise Unresolved('Unsupported top level "{}" statement on line {}'.format(kind, node.lineno))
+
+    def bind(self, name, function=None, value=None, known=False, module=None):
+        """
+        Records what a name is bound to, forgetting anything it was bound to before
+        Args:
+            name (str): The bound name
+            function (StaticFunction): If the name is bound to a callable, its stand-in
+            value (object): The statically evaluated value (if known is True)
+            known (bool): Whether value holds the actual value
+            module (str): If the name is bound to a module, the module's name
+        """
+        for lookup in (self.functions, self.values, self.modules):
+            lookup.pop(name, None)
+        self.unknown.discard(name)
+
+        if function:
+            self.functions[name] = function
+        elif module:
+            self.modules[name] = module
+        elif known:
+            self.values[name] = value
+        else:
+            self.unknown.add(name)
+
+    def assign(self, name, value):
+        """
+        Binds a name to the result of an expression as long as the result definitely isn't callable
+        Args:
+            name (str): The name being assigned
+            value (ast.expr): The expression being assigned
+        """
+        if isinstance(value, ast.Name) and value.id in self.functions:
+            self.bind(name, function=self.functions[value.id])
+            return
+
+        try:
+            self.bind(name, value=self.evaluate(value), known=True)
+        except Unresolved:
+            if not isinstance(value, NON_CALLABLE_NODES):
+                raise
+            self.bind(name)
+
+    def evaluate(self, node):
+        """
+        Statically evaluates an expression made up of literals, known names and pure calls. Names of callables in the
+        script evaluate to the name as a string (the same as the markup allows)
+        Args:
+            node (ast.expr): The expression to evaluate
+        Returns:
+            value (object): The evaluated value
+        """
+        kind = type(node).__name__
+
+        if kind in ('Str', 'Bytes'):
+            return node.s
+        if kind == 'Num':
+            return node.n
+        if kind in ('Constant', 'NameConstant'):
+            return node.value
+        if kind in ('List', 'Tuple', 'Set'):
+            items = [self.evaluate(item) for item in node.elts]
+            return {'List': list, 'Tuple': tuple, 'Set': set}[kind](items)
+        if kind == 'Dict':
+            if None in node.keys:
+                raise Unresolved('Dictionary unpacking')
+            return dict((self.evaluate(key), self.evaluate(val)) for key, val in zip(node.keys, node.values))
+        if kind == 'UnaryOp' and isinstance(node.op, (ast.USub, ast.UAdd)):
+            val = self.evaluate(node.operand)
+            return -val if isinstance(node.op, ast.USub) else val
+        if kind == 'BinOp' and isinstance(node.op, (ast.Add, ast.Sub, ast.Mult)):
+            left, right = self.evaluate(node.left), self.evaluate(node.right)
+            return {ast.Add: lambda: left + right, ast.Sub: lambda: left - right,
+                    ast.Mult: lambda: left * right}[type(node.op)]()
+        if kind == 'Name':
+            if node.id in ('True', 'False', 'None') and node.id not in self.values:
+                return {'True': True, 'False': False, 'None': None}[node.id]
+            if node.id in self.functions:
+                return self.functions[node.id].name
+            if node.id in self.values:
+                return self.values[node.id]
+        if kind == 'Call' and not node.keywords and not getattr(node, 'starargs', None) and \
+                not getattr(node, 'kwargs', None):
+            func = PURE_CALLS.get(self.dotted_name(node.func))
+            if func and not any(type(arg).__name__ == 'Starred' for arg in node.args):
+                try:
+                    return func(*[self.evaluate(arg) for arg in node.args])
+                except (TypeError, ValueError):
+                    pass
+
+        raise Unresolved('Unable to statically evaluate "{}" on line {}'.format(kind, getattr(node, 'lineno', '?')))
+
+    def dotted_name(self, node):
+        """
+        Gets the full dotted name of a called function (i.e. os.path.join), resolving module aliases
+        Args:
+            node (ast.expr): The function being called
+        Returns:
+            name (str): The dotted name or None if it isn't a simple name/attribute chain
+        """
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.insert(0, node.attr)
+            node = node.value
+
+        if not isinstance(node, ast.Name):
+            return None
+
+        if node.id in self.modules:
+            parts.insert(0, self.modules[node.id])
+        elif parts or any(node.id in lookup for lookup in (self.functions, self.values, self.unknown)):
+            return None
+        else:
+            parts.insert(0, node.id)
+        return '.'.join(parts)
+
+    def check_mutation(self, *nodes):
+        """
+        Makes sure nothing that could be changed by a statement is a value being tracked for the markup. Whatever the
+        statement does to it can't be followed statically, so the script has to be imported instead.
+        Args:
+            nodes (ast.AST): The parts of the statement that could change a value
+        """
+        for node in nodes:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and child.id in self.values and is_mutable(self.values[child.id]):
+                    raise Unresolved('"{}" is changed on line {}'.format(child.id, getattr(node, 'lineno', '?')))
+
+    def is_instructions(self, node):
+        """
+        Checks if the node is the sp_instructions name
+        """
+        return isinstance(node, ast.Name) and node.id == 'sp_instructions'
+
+    def references_instructions(self, node):
+        """
+        Checks if sp_instructions is referenced anywhere in the node
+        """
+        return any(self.is_instructions(child) for child in ast.walk(node))
+
+    def is_instructions_call(self, node):
+        """
+        Checks if the call is something like sp_instructions['contents'].append(...)
+        """
+        return isinstance(node.func, ast.Attribute) and node.func.attr in ('append', 'extend') and \
+            isinstance(node.func.value, ast.Subscript) and self.references_instructions(node.func.value)
+
+    def instructions_assign(self, value):
+        """
+        Handles sp_instructions = {...}
+        """
+        self.instructions = self.evaluate(value)
+        if not isinstance(self.instructions, dict) or not isinstance(self.instructions.get('contents'), list):
+            raise Unresolved('sp_instructions needs to be a dictionary with a "contents" list')
+
+    def instructions_item(self, node):
+        """
+        Looks up the part of sp_instructions a chain of subscripts (i.e. sp_instructions['settings']['color']) is
+        pointing at
+        Args:
+            node (ast.Subscript): The outermost subscript
+        Returns:
+            container, key (tuple): The container being subscripted and the key into it
+        """
+        keys = []
+        while isinstance(node, ast.Subscript):
+            subscript = node.slice
+            keys.insert(0, self.evaluate(subscript.value if type(subscript).__name__ == 'Index' else subscript))
+            node = node.value
+
+        if not self.is_instructions(node) or self.instructions is None:
+            raise Unresolved('Unsupported use of sp_instructions')
+
+        container = self.instructions
+        try:
+            for key in keys[:-1]:
+                container = container[key]
+            container[keys[-1]]
+        except (KeyError, IndexError, TypeError):
+            if not isinstance(container, dict):
+                raise Unresolved('Unable to look up {} in sp_instructions'.format(keys))
+        return container, keys[-1]
+
+    def instructions_item_assign(self, target, value):
+        """
+        Handles sp_instructions['settings'] = {...} and the like
+        """
+        container, key = self.instructions_item(target)
+        container[key] = self.evaluate(value)
+
+    def instructions_call(self, node):
+        """
+        Handles sp_instructions['contents'].append(...) and sp_instructions['contents'].extend(...)
+        """
+        if len(node.args) != 1 or node.keywords:
+            raise Unresolved('Unsupported sp_instructions call on line {}'.format(node.lineno))
+
+        container, key = self.instructions_item(node.func.value)
+        if not isinstance(container.get(key) if isinstance(container, dict) else container[key], list):
+            raise Unresolved('sp_instructions item "{}" isn\'t a list'.format(key))
+
+        getattr(container[key], node.func.attr)(self.evaluate(node.args[0]))
+
+    def is_main_check(self, node):
+        """
+        Checks if the node is the "__name__ == '__main__'" check
+        """
+        return isinstance(node, ast.Compare) and isinstance(node.left, ast.Name) and node.left.id == '__name__' \
+            and len(node.comparators) == 1 and self.evaluate(node.comparators[0]) == '__main__' \
+            and isinstance(node.ops[0], ast.Eq)
+
+
+def analyze(source, path):
+    """
+    Works out the callables and sp_instructions of a script without running it
+    Args:
+        source (str): The script's source
+        path (str): Path to the script
+    Returns:
+        result (tuple): ((dict) functions: {name: StaticFunction}, (dict) instructions: sp_instructions or None),
+                        or None if the script couldn't be resolved statically
+    """
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, TypeError, ValueError):
+        # Leave it to the import to report the error
+        return None
+
+    analyzer = ScriptAnalyzer(path)
+    try:
+        analyzer.analyze(tree)
+    except Unresolved:
+        return None
+
+    return analyzer.functions, analyzer.instructions
+
+
+def dependencies(source, path):
+    """
+    Finds the names of the modules a script imports when it's run (anything outside of functions and classes)
+    Args:
+        source (str): The script's source
+        path (str): Path to the script
+    Returns:
+        names (list): Absolute module names in the order they're imported
+    """
+    try:
+        tree = ast.parse(source, path)
+    except (SyntaxError, TypeError, ValueError):
+        return []
+
+    names = []
+    nodes = list(tree.body)
+    while nodes:
+        node = nodes.pop(0)
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module and not node.level and node.module != '__future__':
+                names.append(node.module)
+        elif not isinstance(node, (ast.FunctionDef, ast.ClassDef, ast.Lambda)):
+            nodes.extend(child for child in ast.iter_child_nodes(node) if isinstance(child, ast.stmt))
+
+    return names
+
+
+def is_mutable(value):
+    """
+    Checks if a statically evaluated value could be changed in place
+    Args:
+        value (object): The value
+    Returns:
+        mutable (bool): True if the value is (or contains) a list, dictionary or set
+    """
+    if isinstance(value, (tuple, frozenset)):
+        return any(is_mutable(item) for item in value)
+    return isinstance(value, (list, dict, set))
+
+
+def is_module(name):
+    """
+    Checks if a dotted name refers to a module by finding it on disk (without importing anything)
+    Args:
+        name (str): The dotted module name
+    Returns:
+        is_module (bool): Whether a module by that name was found
+    """
+    path = None
+    for part in name.split('.'):
+        try:
+            handle, filename, description = imp.find_module(part, path)
+        except ImportError:
+            return False
+
+        if handle:
+            handle.close()
+        path = [filename]
+    return True
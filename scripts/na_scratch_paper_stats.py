@@ -0,0 +1,358 @@
+"""
+Module for keeping timing stats on the runs of the buttons in na_scratch_paper
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import threading
+from collections import deque
+
+import na_scratch_paper_modules as modules
+
+
+STATS_DIR = os.path.join(os.path.expanduser('~/na_tool_prefs'), 'stats')
+
+# Number of recent runs kept for each button
+WINDOW = 500
+
+# Timings kept for each run (in seconds)
+TIMINGS = ('wall', 'cpu', 'read')
+
+# Names the timings are shown with
+TIMING_LABELS = {'wall': 'Wall', 'cpu': 'CPU', 'read': 'Input Read'}
+
+
+class ButtonStats(object):
+    """
+    Rolling window of timings for a button's most recent runs, along with totals for every run it's ever had
+    """
+    def __init__(self, size=WINDOW):
+        """
+        Initial call method
+        Args:
+            size (int): Number of recent runs to keep
+        """
+        self.samples = deque(maxlen=size)
+        self.runs = 0
+        self.failures = 0
+
+    def add(self, wall, cpu, read, ok=True):
+        """
+        Adds a run
+        Args:
+            wall (float): Seconds the function took
+            cpu (float): CPU seconds the function used (None if the platform can't tell)
+            read (float): Seconds it took to read the input widgets
+            ok (bool): False if the function raised
+        """
+        self.samples.append((wall, cpu, read, ok))
+        self.runs += 1
+        if not ok:
+            self.failures += 1
+
+    def summary(self):
+        """
+        Gets a summary of the recent runs
+        Returns:
+            summary (dict): {(int) runs, (int) failures: Totals for every run, (int) count: Runs in the window,
+                             (dict) wall, cpu and read: {(float) p50, (float) p95, (float) max}}. The cpu timings are
+                             None if none of the runs could measure it
+        """
+        summary = {'runs': self.runs, 'failures': self.failures, 'count': len(self.samples)}
+        for i, timing in enumerate(TIMINGS):
+            values = sorted(sample[i] for sample in self.samples if sample[i] is not None)
+            if not values and timing == 'cpu':
+                summary[timing] = {'p50': None, 'p95': None, 'max': None}
+                continue
+            summary[timing] = {'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                               'max': values[-1] if values else 0.0}
+        return summary
+
+    def describe(self):
+        """
+        Gets a short description of the recent runs for showing on the button
+        Returns:
+            txt (str): The description (empty if it's never been run)
+        """
+        if not self.samples:
+            return ''
+
+        summary = self.summary()
+        txt = 'Runs: {} ({} failed)'.format(summary['runs'], summary['failures'])
+        for timing in TIMINGS:
+            values = summary[timing]
+            if values['max'] is None:
+                continue
+            txt += '\n{}: p50 {} / p95 {} / max {}'.format(TIMING_LABELS[timing], format_time(values['p50']),
+                                                           format_time(values['p95']), format_time(values['max']))
+        return txt
+
+    def to_dict(self):
+        """
+        Gets the stats as something that can be saved to json
+        Returns:
+            data (dict): {(int) runs, (int) failures, (list) samples}
+        """
+        return {'runs': self.runs, 'failures': self.failures, 'samples': [list(sample) for sample in self.samples]}
+
+    @classmethod
+    def from_dict(cls, data, size=WINDOW):
+        """
+        Gets stats that were saved with to_dict
+        Args:
+            data (dict): The saved stats
+            size (int): Number of recent runs to keep
+        Returns:
+            stats (ButtonStats): The stats
+        """
+        stats = cls(size)
+        stats.samples.extend(tuple(sample) for sample in data.get('samples', []))
+        stats.runs = data.get('runs', len(stats.samples))
+        stats.failures = data.get('failures', 0)
+        return stats
+
+
+class StatsStore(object):
+    """
+    The timing stats of every button, grouped by script. Each script's stats are loaded from their own json file the
+    first time they're needed and saved back to it with save.
+    """
+    def __init__(self, directory=STATS_DIR):
+        """
+        Initial call method
+        Args:
+            directory (str): Folder to keep the json files in
+        """
+        self.directory = directory
+        self.scripts = {}
+        self.changed = set()
+        self.lock = threading.Lock()
+
+    def path(self, script):
+        """
+        Gets the json file for a script's stats
+        Args:
+            script (str): Path to the script
+        Returns:
+            path (str): Path to the json file
+        """
+        return os.path.join(self.directory, '{}.json'.format(modules.module_name(script)))
+
+    def buttons(self, script):
+        """
+        Gets a script's stats, loading them if they haven't been yet
+        Args:
+            script (str): Path to the script
+        Returns:
+            buttons (dict): {(str) label: (ButtonStats) stats}
+        """
+        with self.lock:
+            script = modules.normalize(script)
+            if script not in self.scripts:
+                buttons = {}
+                try:
+                    with open(self.path(script)) as f:
+                        for label, data in json.load(f).items():
+                            buttons[label] = ButtonStats.from_dict(data)
+                except (IOError, OSError, ValueError):
+                    pass
+                self.scripts[script] = buttons
+            return self.scripts[script]
+
+    def get(self, script, label):
+        """
+        Gets a button's stats
+        Args:
+            script (str): Path to the script
+            label (str): The button's label
+        Returns:
+            stats (ButtonStats): The stats (None if the button's never been run)
+        """
+        return self.buttons(script).get(label)
+
+    def record(self, script, label, wall, cpu, read, ok=True):
+        """
+        Adds a run of a button
+        Args:
+            script (str): Path to the script
+            label (str): The button's label
+            wall (float): Seconds the function took
+            cpu (float): CPU seconds the function used (None if the platform can't tell)
+            read (float): Seconds it took to read the input widgets
+            ok (bool): False if the function raised
+        """
+        buttons = self.buttons(script)
+        with self.lock:
+            buttons.setdefault(label, ButtonStats()).add(wall, cpu, read, ok)
+            self.changed.add(modules.normalize(script))
+
+    def save(self):
+        """
+        Saves the stats of every script that's had a run since the last save
+        """
+        with self.lock:
+            if not self.changed:
+                return
+
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+
+            for script in self.changed:
+                data = dict((label, stats.to_dict()) for label, stats in self.scripts[script].items())
+                with open(self.path(script), 'w') as f:
+                    json.dump(data, f)
+            self.changed.clear()
+
+    def rows(self):
+        """
+        Gets a summary of every loaded button's stats
+        Returns:
+            rows (list): Dictionaries of {(str) script, (str) label} and the keys from ButtonStats.summary
+        """
+        with self.lock:
+            rows = []
+            for script in sorted(self.scripts):
+                for label, stats in sorted(self.scripts[script].items()):
+                    row = {'script': script, 'label': label}
+                    row.update(stats.summary())
+                    rows.append(row)
+            return rows
+
+    def export(self, path):
+        """
+        Writes a summary of every loaded button's stats to a file
+        Args:
+            path (str): Path to the file. Ending it with ".csv" writes a csv file, anything else is json
+        """
+        rows = self.rows()
+        if os.path.splitext(path)[1].lower() != '.csv':
+            with open(path, 'w') as f:
+                json.dump(rows, f, indent=4, sort_keys=True)
+            return
+
+        columns = ['script', 'label', 'runs', 'failures', 'count']
+        columns += ['{}_{}'.format(timing, value) for timing in TIMINGS for value in ('p50', 'p95', 'max')]
+        with open(path, 'wb' if str is bytes else 'w') as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            for row in rows:
+                for timing in TIMINGS:
+                    for value, seconds in row.pop(timing).items():
+                        row['{}_{}'.format(timing, value)] = seconds
+                writer.writerow([row[column] for column in columns])
+
+
+def percentile(values, pct):
+    """
+    Gets a percentile of some values (nearest rank)
+    Args:
+        values (list): The values, sorted
+        pct (float): The percentile (0-100)
+    Returns:
+        value (float): The value at the percentile (0 if there aren't any values)
+    """
+    if not values:
+        return 0.0
+    index = int(math.ceil(pct / 100.0 * len(values))) - 1
+    return values[min(max(index, 0), len(values) - 1)]
+
+
+def format_time(seconds):
+    """
+    Formats a timing for showing to the user
+    Args:
+        seconds (float): The timing
+    Returns:
+        txt (str): The timing in ms or s, whichever's more readable
+    """
+    if seconds < 1:
+        return '{:.1f}ms'.format(seconds * 1000)
+    return '{:.2f}s'.format(seconds)
+
+
+def thread_clock():
+    """
+    Finds a clock for the CPU time used by the current thread. Python 3.7 and up have one built in, older versions
+    (like Maya's Python 2) get one through ctypes on Linux and Windows. Process wide CPU time isn't used instead, as
+    buttons run on several threads at once (alongside the host application's own work).
+    Returns:
+        clock (callable): Gets the current thread's CPU seconds (None if there isn't one on this platform)
+    """
+    if hasattr(time, 'thread_time'):
+        return time.thread_time
+
+    try:
+        import ctypes
+        import ctypes.util
+    except ImportError:
+        return None
+
+    if sys.platform.startswith('linux'):
+        class Timespec(ctypes.Structure):
+            _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+        clock_gettime = None
+        # glibc older than 2.17 only has it in librt
+        for library in ('c', 'rt'):
+            try:
+                clock_gettime = ctypes.CDLL(ctypes.util.find_library(library)).clock_gettime
+                break
+            except (OSError, AttributeError, TypeError):
+                pass
+        if clock_gettime is None:
+            return None
+        clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+
+        def clock():
+            spec = Timespec()
+            clock_gettime(CLOCK_THREAD_CPUTIME_ID, ctypes.byref(spec))
+            return spec.tv_sec + spec.tv_nsec * 1e-9
+        return clock
+
+    if sys.platform == 'win32':
+        kernel32 = ctypes.windll.kernel32
+        kernel32.GetCurrentThread.restype = ctypes.c_void_p
+        kernel32.GetThreadTimes.argtypes = [ctypes.c_void_p] + [ctypes.POINTER(ctypes.c_ulonglong)] * 4
+
+        def clock():
+            # Creation, exit, kernel and user times, in 100ns intervals
+            times = [ctypes.c_ulonglong() for _ in range(4)]
+            kernel32.GetThreadTimes(kernel32.GetCurrentThread(), *[ctypes.byref(value) for value in times])
+            return (times[2].value + times[3].value) * 1e-7
+        return clock
+
+    return None
+
+
+def cpu_time():
+    """
+    Gets the CPU time the current thread has used so far
+    Returns:
+        seconds (float): The CPU time (None if the platform can't tell, see thread_clock)
+    """
+    return THREAD_CLOCK() if THREAD_CLOCK is not None else None
+
+
+def cpu_since(start):
+    """
+    Gets the CPU time the current thread has used since an earlier cpu_time
+    Args:
+        start (float): What cpu_time gave at the start
+    Returns:
+        seconds (float): The CPU time (None if the platform can't tell)
+    """
+    return None if start is None else cpu_time() - start
+
+
+# Value of CLOCK_THREAD_CPUTIME_ID in Linux's time.h
+CLOCK_THREAD_CPUTIME_ID = 3
+
+THREAD_CLOCK = thread_clock()
+
+
+STATS = StatsStore()
@@ -2,27 +2,44 @@
 Module containing convenience classes for widgets involved in adding script tabs
 """
 import os
+import re
 import sys
-import imp
+import json
 import time
-import inspect
-import traceback
+import multiprocessing
 from functools import partial
 
 from PySide2 import QtWidgets, QtGui, QtCore
 
+import na_scratch_paper_batch as batch
+import na_scratch_paper_execution as execution
+import na_scratch_paper_expressions as expressions
+import na_scratch_paper_headless as headless
+import na_scratch_paper_images as images
+import na_scratch_paper_modules as modules
+import na_scratch_paper_pipelines as pipelines
+import na_scratch_paper_profiling as profiling
+import na_scratch_paper_search as search
+import na_scratch_paper_stats as stats
+import na_scratch_paper_theme as theme
+
 
 class ScriptWidget(QtWidgets.QWidget):
     """
     Custom Widget for each source script that's loaded in to the tool
     """
-    def __init__(self, parent, data):
+    loading_changed = QtCore.Signal()
+    profile_saved = QtCore.Signal(str)
+
+    def __init__(self, parent, data, prefs=None, lazy=False):
         """
         Initial call method
         Args:
             parent (QtWidgets.QTabWidget): The parent tab widget
             data (dict): Data being passed in to the widget {(str) name: Tab Label, (str) path: Path to the script,
                                                              (list) excluded: Buttons to Exclude from the UI}
+            prefs (dict): The main window's preferences (for options that affect how the script is loaded)
+            lazy (bool): If True, the script isn't imported or laid out until build is called (on tab activation)
         """
         super(ScriptWidget, self).__init__(parent)
 
@@ -40,54 +57,245 @@ class ScriptWidget(QtWidgets.QWidget):
 
         self.filter_keys = []
         self.functions = {}
+        self.groups = []
+        self.spec_errors = []
+        self.spec_report = ''
         self.simple = True
+        self.built = False
+        self.loading = False
+        self.loader = None
+        self.load_id = 0
+        self.scan_index = None
+        self.command_cache = None
+        self.search_index = None
+        self.search_widgets = []
+        self.visible = set()
+        self.button_view = None
+        self.entry = None
+        self.theme = theme.Theme()
+        self.running = {}
+        self.runners = {}
+        self.profile_next = {}
         self.data = data
-
-        self.process_script()
+        self.prefs = prefs if prefs is not None else {}
+        self.result_cache = execution.ResultCache(self.prefs.get('result_cache_size', 128))
+        self.cache_keys = {}
+
+        # Saves in quick succession (or editors writing files in chunks) only trigger one rebuild
+        self.scroll_value = None
+        self.refresh_timer = QtCore.QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(300)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        # A worker process that dies never calls back, so the tab's process jobs get checked on while they're running
+        self.job_timer = QtCore.QTimer(self)
+        self.job_timer.setInterval(int(execution.POLL_INTERVAL * 1000))
+        self.job_timer.timeout.connect(self.check_jobs)
+
+        if not lazy:
+            self.load_script()
         self.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
         self.customContextMenuRequested.connect(self.tab_menu)
         parent.addTab(self, self.data.get('name', 'Default'))
 
+    def build(self):
+        """
+        Imports the script and lays out the tab if that hasn't happened yet (for tabs created lazily)
+        """
+        if not self.built:
+            self.load_script()
+
+    def load_script(self):
+        """
+        Loads the script and lays out the tab. With background loading, the tab shows a placeholder while the script
+        is read, compiled and has its dependencies imported on a worker thread, then gets built once that's done.
+        Tabs that already have groups keep them (disabled) instead, so process_script can reuse the unchanged ones.
+        """
+        if 'script' not in self.data or not self.prefs.get('async_loading', True):
+            self.process_script()
+            return
+
+        self.built = True
+        if self.groups:
+            self.scroll.widget().setEnabled(False)
+        else:
+            self.clear_body()
+            lbl = QtWidgets.QLabel(u'Loading {}\u2026'.format(os.path.basename(self.data['script'])))
+            lbl.setAlignment(QtCore.Qt.AlignCenter)
+            self.body_lwt.addWidget(lbl)
+
+        # Results from an earlier load that's still running get ignored
+        self.load_id += 1
+        self.loader = ScriptLoader(self.data['script'], self.prefs.get('static_tabs', False))
+        self.loader.signals.finished.connect(partial(self.script_prepared, self.load_id))
+
+        self.loading = True
+        self.loading_changed.emit()
+        LOAD_POOL.start(self.loader)
+
+    def schedule_refresh(self):
+        """
+        Starts (or restarts) the debounce timer for rebuilding the tab
+        """
+        self.refresh_timer.start()
+
+    def refresh(self):
+        """
+        Rebuilds just this tab in place, keeping saved values and the scroll position
+        """
+        if not self.built:
+            # Nothing to rebuild yet, but the source scan used for searching might be out of date
+            self.scan_index = None
+            return
+
+        self.save_vals()
+        self.scroll_value = self.scroll.verticalScrollBar().value()
+        self.load_script()
+
+    def watched_files(self, imports=False):
+        """
+        Gets the files that should trigger a rebuild of the tab when changed
+        Args:
+            imports (bool): If True, includes modules the script imports from its own folder
+        Returns:
+            paths (list): Paths to the files
+        """
+        if 'script' not in self.data:
+            return []
+
+        paths = [self.data['script']]
+        if imports:
+            paths.extend(modules.local_dependencies(self.data['script']))
+        return paths
+
+    def script_prepared(self, load_id):
+        """
+        Builds the tab once the worker thread is done with the script
+        Args:
+            load_id (int): The load the worker was started for
+        """
+        if load_id == self.load_id:
+            self.loader = None
+            self.process_script()
+
+    def clear_body(self):
+        """
+        Removes everything from the body of the tab
+        """
+        self.simple = True
+        self.groups = []
+        self.spec_errors = []
+        self.command_cache = None
+        self.search_index = None
+        self.search_widgets = []
+        self.visible = set()
+        self.release_widgets()
+        self.button_view = None
+        self.scroll.widget().setProperty('spStyle', None)
+        # The widgets are gone, but the spacings and stretches they were laid out with are still in the layout
+        clear_layout(self.body_lwt)
+
     def process_script(self):
         """
         Attempts to import the script and lay out the tab accordingly
         """
-        for child in self.scroll.widget().children()[1:]:
-            child.setParent(None)
-        # Next bit is strange, I know, but it's the only I know of to get rid of the damn spacer if refreshing without
-        # crashing. If there's a clean way to just clear everything that I just don't know, feel free to let me know :)
-        for i in range(self.body_lwt.count()):
-            self.body_lwt.itemAt(i).changeSize(0, 0, QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.Fixed)
+        self.built = True
+        self.load_id += 1
+        self.scroll.widget().setEnabled(True)
 
         if 'script' not in self.data:
+            self.clear_body()
             lbl = QtWidgets.QLabel('No scripts in list.\nTo add source scripts, go to File>Edit Script List')
             lbl.setAlignment(QtCore.Qt.AlignCenter)
             self.body_lwt.addWidget(lbl)
             return
 
         self.functions.clear()
-        # Everything needs to have a unique name or else things appear to stack. Not a huge imp guru, so might be wrong
-        name = '{}_{}'.format(os.path.basename(self.data['script']), time.ctime())
-        for char in filter(lambda x: not x.isalnum(), name):
-            name = name.replace(char, '_')
-
         try:
-            module = imp.load_source(name, self.data['script'])
-            source = inspect.getmembers(module)
-            for name, member in source:
-                if callable(member):
-                    self.functions[name] = member
-
-            instructions = filter(lambda x: x[0] == 'sp_instructions', source)
-            if instructions:
-                self.homogenize_function_instructions(instructions[0][1])
-                self.build_body_advanced(instructions[0][1])
+            # Unchanged scripts reuse the already imported module, members and homogenized instructions. With static
+            # tabs, the script is only read through its AST and isn't imported until a button gets clicked
+            entry = modules.MODULE_MANAGER.load(self.data['script'], static=self.prefs.get('static_tabs', False))
+            self.functions.update(entry.functions)
+            self.result_cache.bind(entry)
+            self.entry = entry
+
+            if entry.instructions is not None:
+                if not entry.homogenized:
+                    self.homogenize_function_instructions(entry.instructions)
+                    entry.homogenized = True
+
+                # Groups that haven't changed keep their widgets (and whatever's been typed in to them)
+                kept = self.detach_unchanged(entry.instructions)
+                self.clear_body()
+                self.build_body_advanced(entry.instructions, kept)
             else:
+                self.clear_body()
                 self.build_body_simple()
         except:
+            self.clear_body()
             self.build_stack_trace()
 
+        # Any markup issues are reported once per build
+        self.spec_report = ''
+        if self.spec_errors:
+            self.spec_report = '# Markup issues in {}:\n'.format(self.data['script'])
+            self.spec_report += ''.join('#    {}\n'.format(error) for error in self.spec_errors)
+            sys.stderr.write(self.spec_report)
+
+        # All the colors and images go on in one go. Only the rules something in the tab still uses are kept, so the
+        # stylesheet doesn't keep growing as the script's colors change
+        body = self.scroll.widget()
+        self.theme.prune(widget.property('spStyle') for widget in [body] + body.findChildren(QtWidgets.QFrame))
+        body.setStyleSheet(self.theme.stylesheet())
+
+        self.build_search_index()
         self.filter(self.filter_keys)
+        if self.scroll_value is not None:
+            # The scroll bar's range isn't updated until the new layout has been processed
+            QtCore.QTimer.singleShot(0, partial(self.scroll.verticalScrollBar().setValue, self.scroll_value))
+            self.scroll_value = None
+
+        if self.loading:
+            self.loading = False
+            self.loading_changed.emit()
+
+    def release_widgets(self):
+        """
+        Disconnects and deletes (or pools) everything in the body so old buttons' partials (and the functions and
+        module versions they hold on to) don't outlive a refresh
+        """
+        for btn in self.scroll.widget().findChildren(QtWidgets.QPushButton):
+            for signal in (btn.clicked, btn.customContextMenuRequested):
+                try:
+                    signal.disconnect()
+                except (RuntimeError, TypeError):
+                    pass
+
+        reusable = self.scroll.widget().findChildren(InputBase) + self.scroll.widget().findChildren(FuncButton)
+        for widget in reusable:
+            widget.release()
+
+        if self.button_view is not None:
+            self.button_view.model().sourceModel().release()
+
+        # Buttons and common input widgets get reused by the next build instead of being deleted
+        for widget in reusable:
+            WIDGET_POOL.release(widget)
+
+        for child in self.scroll.widget().children()[1:]:
+            if hasattr(child, 'data'):
+                child.data = {}
+            child.setParent(None)
+            child.deleteLater()
+
+    def release(self):
+        """
+        Lets go of everything referencing the script before the tab gets deleted
+        """
+        self.release_widgets()
+        self.functions.clear()
+        self.entry = None
 
     def get_saved_vals(self, widgets, frame_label, saved):
         """
@@ -118,64 +326,184 @@ class ScriptWidget(QtWidgets.QWidget):
         function in the script unless the docstring starts with "scratch_exclude"
         Args:
         """
-        for name in sorted(self.functions):
-            if self.functions[name].__doc__:
-                if self.functions[name].__doc__.lstrip().startswith('scratch_exclude'):
-                    continue
-
-            if name in self.data.get('excluded', []):
-                continue
+        names = self.simple_names(self.functions)
+        if len(names) > self.prefs.get('virtual_threshold', 300):
+            self.build_body_virtual(names)
+            return
 
-            self.func_button({'label': self.functions[name].__name__}, self.functions[name])
+        for name in names:
+            btn = self.func_button({'label': self.functions[name].__name__}, self.functions[name])
+            self.search_widgets.append((btn, search.join_text(btn.text(), self.functions[name].__doc__)))
         self.body_lwt.addStretch()
 
-    def build_body_advanced(self, instructions):
+    def build_body_virtual(self, names):
+        """
+        Lays out a simple tab as a list view instead of real buttons, so only the rows in view ever get painted (for
+        scripts with more callables than the "virtual_threshold" preference)
+        Args:
+            names (list): The names of the functions to list
+        """
+        buttons = [(self.functions[name].__name__, self.functions[name]) for name in names]
+
+        self.button_view = QtWidgets.QListView()
+        self.button_view.setUniformItemSizes(True)
+        self.button_view.setMouseTracking(True)
+        self.button_view.setItemDelegate(ButtonDelegate(self.button_view))
+
+        proxy = SearchProxyModel(self.button_view)
+        proxy.setSourceModel(ButtonListModel(self.button_view, buttons))
+        self.button_view.setModel(proxy)
+
+        self.button_view.clicked.connect(self.view_clicked)
+        self.button_view.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.button_view.customContextMenuRequested.connect(self.view_menu)
+        self.body_lwt.addWidget(self.button_view)
+
+        self.search_widgets = [(i, search.join_text(label, function.__doc__))
+                               for i, (label, function) in enumerate(buttons)]
+
+    def view_clicked(self, index):
+        """
+        Runs the function for a row in the list view like clicking its button would
+        Args:
+            index (QtCore.QModelIndex): The clicked row
+        """
+        self.func_button_clicked(index.data(ButtonListModel.function_role), [])
+
+    def view_menu(self, pos):
+        """
+        Shows the button menu for the row under the cursor in the list view
+        Args:
+            pos (QtCore.QPoint): The position of the cursor in the view
+        """
+        index = self.button_view.indexAt(pos)
+        if index.isValid():
+            self.button_menu(index.data(), index.data(ButtonListModel.function_role))
+
+    def simple_names(self, functions):
+        """
+        Gets the names of the functions that get buttons in a simple tab (skipping any excluded from the tab or with a
+        docstring starting with "scratch_exclude")
+        Args:
+            functions (dict): {(str) name: (callable) function} The script's callables
+        Returns:
+            names (list): The sorted names
+        """
+        return modules.simple_names(functions, self.data.get('excluded', []))
+
+    def detach_unchanged(self, instructions):
+        """
+        Compares the groups currently built in the tab against the new instructions and takes the widgets of any that
+        are unchanged out of the body (so clearing it doesn't delete them)
+        Args:
+            instructions (dict): The new instructions for the tab
+        Returns:
+            kept (dict): {(str) signature: (list) widgets} of the detached widgets for build_body_advanced to reuse
+        """
+        new = set(group_signature(group) for group in instructions['contents'])
+        kept = {}
+        for signature, widget in self.groups:
+            if signature in new:
+                widget.setParent(None)
+                kept.setdefault(signature, []).append(widget)
+        return kept
+
+    def build_body_advanced(self, instructions, kept=None):
         """
         Builds a more custom tab according to instructions in the file
         Args:
             instructions (dict): Instructions for the build such as settings, and widgets
+            kept (dict): Widgets from a previous build to reuse for unchanged groups (from detach_unchanged)
         """
         self.simple = False
         settings = instructions.get('settings', {})
         saved = self.data.get('saved', {})
+        kept = kept or {}
 
         self.setToolTip(settings.get('toolTip'))
-        self.set_palette(self.scroll.widget(), QtGui.QPalette.Background, rgb=settings.get('color'),
-                         image=settings.get('image'))
+        self.style_widget(self.scroll.widget(), rgb=settings.get('color'), image=settings.get('image'))
 
         for group in instructions['contents']:
-            if 'simple' in group:
+            signature = group_signature(group)
+            # Building modifies the markup, so work from a copy to keep the cached instructions comparable
+            group = copy_markup(group)
+
+            if kept.get(signature):
+                widget = kept[signature].pop(0)
+                self.patch_group(widget, group)
+            elif 'simple' in group:
                 if 'label' not in group:
                     group['label'] = group['simple'].__name__
-                self.func_button(group, group['simple'])
-                continue
+                widget = self.func_button(group, group['simple'])
+            else:
+                widget = self.build_frame(group, saved)
 
-            frame = QtWidgets.QFrame(self)
-            frame.data = group
-            lwt = QtWidgets.QVBoxLayout()
+            self.groups.append((signature, widget))
+            self.search_widgets.append((widget, group_search_text(group)))
+            self.body_lwt.addWidget(widget)
+            widget.show()
+            if 'simple' not in group:
+                self.body_lwt.addSpacing(10)
 
-            frame.setLayout(lwt)
-            frame.setFrameShape(QtWidgets.QFrame.WinPanel)
-            frame.setFrameShadow(QtWidgets.QFrame.Raised)
+        self.body_lwt.addStretch()
 
-            lwt.addWidget(QtWidgets.QLabel(group.get('label', 'Default')))
-            frame.children()[-1].setAlignment(QtCore.Qt.AlignHCenter)
+    def build_frame(self, group, saved):
+        """
+        Builds the frame with the label, input widgets and buttons for a group in the instructions
+        Args:
+            group (dict): The group's instructions
+            saved (dict): Saved value data from preferences
+        Returns:
+            frame (QtWidgets.QFrame): The newly created frame
+        """
+        frame = QtWidgets.QFrame(self)
+        frame.data = group
+        lwt = QtWidgets.QVBoxLayout()
 
-            self.set_palette(frame, QtGui.QPalette.Background, rgb=group.get('color'), image=group.get('image'))
+        frame.setLayout(lwt)
+        frame.setFrameShape(QtWidgets.QFrame.WinPanel)
+        frame.setFrameShadow(QtWidgets.QFrame.Raised)
 
-            widgets = self.create_input_widgets(frame, group.get('inputWidgets', []), saved)
-            previous_layout = None
-            for btn in group.get('buttons', []):
-                btn_lwt = previous_layout if previous_layout else QtWidgets.QHBoxLayout()
-                previous_layout = btn_lwt if btn.get('share') else None
+        lwt.addWidget(QtWidgets.QLabel(group.get('label', 'Default')))
+        frame.children()[-1].setAlignment(QtCore.Qt.AlignHCenter)
 
-                lwt.addLayout(btn_lwt)
-                self.func_button(data=btn, function=btn['function'], layout=btn_lwt, input_widgets=widgets)
+        self.style_widget(frame, rgb=group.get('color'), image=group.get('image'))
 
-            self.body_lwt.addWidget(frame)
-            self.body_lwt.addSpacing(10)
+        frame.input_widgets = self.create_input_widgets(frame, group.get('inputWidgets', []), saved)
+        frame.buttons = []
+        previous_layout = None
+        for btn in group.get('buttons', []):
+            btn_lwt = previous_layout if previous_layout else QtWidgets.QHBoxLayout()
+            previous_layout = btn_lwt if btn.get('share') else None
 
-        self.body_lwt.addStretch()
+            lwt.addLayout(btn_lwt)
+            frame.buttons.append(self.func_button(data=btn, function=btn['function'], layout=btn_lwt,
+                                                  input_widgets=frame.input_widgets))
+        return frame
+
+    def patch_group(self, widget, group):
+        """
+        Points a reused frame or button at the new group's data and functions (the script may have been re-imported,
+        so the functions can be new objects even though nothing about the group changed)
+        Args:
+            widget (QtWidgets.QWidget): The reused frame or button
+            group (dict): The new group's instructions
+        """
+        if 'simple' in group:
+            if 'label' not in group:
+                group['label'] = group['simple'].__name__
+            self.bind_button(widget, group, group['simple'])
+            return
+
+        widget.data = group
+        for input_widget, data in zip(widget.input_widgets, group.get('inputWidgets', [])):
+            compile_spec(type(input_widget), data)
+            input_widget.data = data
+            if 'buttonCommand' in data:
+                input_widget.button_command = data['buttonCommand']
+
+        for btn, data in zip(widget.buttons, group.get('buttons', [])):
+            self.bind_button(btn, data, data['function'], widget.input_widgets)
 
     def create_input_widgets(self, parent, inputs, saved):
         """
@@ -201,106 +529,402 @@ class ScriptWidget(QtWidgets.QWidget):
                     txt += '{}\n'.format(j)
                 raise RuntimeError(txt)
 
-            widget = CLASSES[i['type']](parent, i, previous_layout if previous_layout else parent.layout())
+            # Validated once here rather than every time the widget is shown
+            errors, color = compile_spec(CLASSES[i['type']], i)
+            self.spec_errors.extend('{} > {}: {}'.format(parent.data.get('label', 'Default'),
+                                                         i.get('label', i['type']), error) for error in errors)
+
+            layout = previous_layout if previous_layout else parent.layout()
+            widget = WIDGET_POOL.acquire(CLASSES[i['type']])
+            if widget is None:
+                widget = CLASSES[i['type']](parent, i, layout)
+            else:
+                widget.setParent(parent)
+                layout.addWidget(widget)
+                widget.configure(i)
+                widget.show()
+
+            widget.set_color(color)
+            widget.namespace = self.script_namespace
             previous_layout = widget.lwt if i.get('share') else None
             widgets.append(widget)
 
         self.get_saved_vals(widgets, parent.findChildren(QtWidgets.QLabel)[0].text(), saved)
         return tuple(widgets)
 
-    def homogenize_function_instructions(self, instructions):
+    def script_namespace(self):
+        """
+        Gets the globals "eval" fields are evaluated with, which are the script module's (the same as the headless
+        runner's, see headless.load_buttons). Static tabs import the script for it, like clicking a button does.
+        Returns:
+            namespace (dict): The script module's globals
+        """
+        if self.entry is None or self.entry.module is None:
+            self.entry = modules.MODULE_MANAGER.load(self.data['script'])
+        return self.entry.module.__dict__
+
+    def homogenize_function_instructions(self, instructions, functions=None):
         """
         Checks data against fuctions. In order to allow the user to pass in strings or callables in instructions, this
-        will parse it all and turn it in functions.
+        will parse it all and turn it in functions (see modules.homogenize_instructions, which the headless runner
+        shares).
         Args:
             instructions (dict): Instructions for the build such as settings, and widgets
+            functions (dict): The callables to look names up in. Defaults to the tab's functions
         """
-        not_found = None
-        for i, group in enumerate(instructions['contents']):
-            if group.get('simple'):
-                instructions['contents'][i]['simple'] = self.str_to_func(instructions['contents'][i]['simple'])
-
-            for j in range(len(group.get('buttons', []))):
-                instruction = instructions['contents'][i]['buttons'][j]['function']
-                instructions['contents'][i]['buttons'][j]['function'] = self.str_to_func(instruction)
+        modules.homogenize_instructions(instructions, self.functions if functions is None else functions)
 
-            for j in range(len(group.get('inputWidgets', []))):
-                if 'buttonCommand' in instructions['contents'][i]['inputWidgets'][j]:
-                    instruction = instructions['contents'][i]['inputWidgets'][j]['buttonCommand']
-                    instructions['contents'][i]['inputWidgets'][j]['buttonCommand'] = self.str_to_func(instruction)
-
-        if not_found:
-            raise RuntimeError('{} not found in functions/callables in the script'.format(not_found))
-        
-    def str_to_func(self, instruction):
+    def str_to_func(self, instruction, functions=None):
         """
         Takes an instruction for a function, and converts it to a function if it's the string name.
         Args:
-            instruction: 
+            instruction (str or callable): The name of the function or the function itself
+            functions (dict): The callables to look names up in. Defaults to the tab's functions
         Returns:
             function (callable): The function that's called for by the string (returns instruction if it was a callable)
         """
-        if callable(instruction):
-            return instruction
-        else:
-            if instruction in self.functions:
-                return self.functions[instruction]
-            else:
-                raise RuntimeError('{} not found in functions/callables in the script'.format(instruction))
+        return modules.str_to_func(instruction, self.functions if functions is None else functions)
 
     def func_button(self, data, function, layout=None, input_widgets=()):
         """
-        Creates a command button.
+        Creates a command button (or reuses one from WIDGET_POOL).
         Args:
             data (dict): Dictionary of data from the markup
             function (callable): Function to call when the button is pressed
             layout (QtWidgets.QLayout): Optional parent layout for the button. Defaults to self.body_lwt
             input_widgets (tuple): list of input widgets from na_scratch_paper_tab_widgets to read on execution
+        Returns:
+            btn (QtWidgets.QPushButton): The newly created button
         """
-        inputs = [input_widgets[i] for i in data.get('inputs', [])]
         if not layout:
             layout = self.body_lwt
 
-        btn = QtWidgets.QPushButton(data['label'])
-        btn.setToolTip(data.get('toolTip'))
-        if 'icon' in data:
-            btn.setIcon(QtGui.QIcon(data['icon']))
+        btn = WIDGET_POOL.acquire(FuncButton)
+        pooled = btn is not None
+        if not pooled:
+            btn = FuncButton()
+            btn.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+
+        btn.configure(data)
         if 'color' in data:
-            self.set_palette(btn, QtGui.QPalette.Button, rgb=data['color'])
+            set_palette_color(btn, [QtGui.QPalette.Button], QtGui.QColor(*data['color']))
 
-        btn.clicked.connect(partial(self.func_button_clicked, function, inputs))
-        btn.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
-        btn.customContextMenuRequested.connect(partial(self.button_menu, data['label'], function))
+        self.bind_button(btn, data, function, input_widgets)
         layout.addWidget(btn)
+        if pooled:
+            btn.show()
+        return btn
 
-    def func_button_clicked(self, function, inputs):
+    def bind_button(self, btn, data, function, input_widgets=()):
+        """
+        Connects (or reconnects) a button's click and context menu to the function
+        Args:
+            btn (QtWidgets.QPushButton): The button
+            data (dict): Dictionary of data from the markup
+            function (callable): Function to call when the button is pressed
+            input_widgets (tuple): list of input widgets from na_scratch_paper_tab_widgets to read on execution
         """
-        Reads input widgets if supplied to pass in to the function. Otherwise simply runs the function.
+        for signal in (btn.clicked, btn.customContextMenuRequested):
+            try:
+                signal.disconnect()
+            except (RuntimeError, TypeError):
+                pass
+
+        inputs = [input_widgets[i] for i in data.get('inputs', [])]
+        btn.clicked.connect(partial(self.func_button_clicked, function, inputs, data))
+        btn.customContextMenuRequested.connect(partial(self.button_menu, data['label'], function, data, inputs))
+        if isinstance(btn, FuncButton):
+            btn.set_busy(len(self.running.get(data['label'], [])))
+
+    def func_button_clicked(self, function, inputs, data=None):
+        """
+        Reads input widgets if supplied to pass in to the function. Otherwise simply runs the function. Buttons marked
+        up with "async" (or "thread") run the function on a worker thread once the inputs have been read, and ones
+        marked up with "process" run it in a worker process. Every run is timed for the button's stats, and if the
+        button's next run was set to be profiled, this is the run that gets profiled. Buttons marked up with "cache"
+        skip running the function when it's already returned something for the same inputs (within "cache_ttl"
+        seconds if it's given).
         Args:
             function (callable): Function to connect to the click event
             inputs (tuple): list of input widgets from na_scratch_paper_tab_widgets to read on execution
+            data (dict): Dictionary of data from the markup for the button
         """
+        data = data or {}
         try:
-            if inputs:
-                args = [widget.read() for widget in inputs]
-                function(*args)
+            start = time.time()
+            args = [widget.read() for widget in inputs]
+            read = time.time() - start
+            key = data.get('label', function.__name__)
+            cache_key = None
+            if key in self.profile_next:
+                function = profiling.Profiler(function, '{}_{}'.format(self.data.get('name', 'Default'), key),
+                                              self.profile_next.pop(key))
+            elif data.get('cache'):
+                cache_key = self.result_cache.key(key, args)
+                if cache_key is not None:
+                    found, result = self.result_cache.get(cache_key, data.get('cache_ttl'))
+                    if found:
+                        sys.stdout.write('# "{}" returned (cached): {!r}\n'.format(key, result))
+                        return
+
+            if data.get('async') or data.get('thread') or data.get('process'):
+                self.start_job(function, args, data, read, cache_key)
             else:
-                function()
+                job = execution.Job(function, args)
+                job.read = read
+                job.run()
+                self.record_job(key, job)
+                self.cache_result(cache_key, job)
+                if job.error:
+                    sys.stderr.write(job.error)
+                self.report_profile(job)
         except:
             sys.stderr.write(self.stack_trace())
 
+    def start_job(self, function, args, data, read=0.0, cache_key=None):
+        """
+        Runs a button's function on EXEC_POOL (or execution.PROCESS_POOL for "process" buttons), showing the button as
+        busy until it's done. Each button can only have its "concurrency" (defaults to 1) runs going at once. Profiled
+        runs always stay in this process.
+        Args:
+            function (callable): The button's function
+            args (list): The values read from the input widgets
+            data (dict): Dictionary of data from the markup for the button
+            read (float): Seconds it took to read the input widgets (for the button's stats)
+            cache_key (tuple): Key to cache the result under (see execution.ResultCache.key)
+        """
+        key = data.get('label', function.__name__)
+        running = self.running.setdefault(key, [])
+        if len(running) >= data.get('concurrency', 1):
+            sys.stderr.write('# "{}" is already running. Cancel it from its menu to run it again.\n'.format(key))
+            return
+
+        process = data.get('process') and not isinstance(function, profiling.Profiler)
+        if process and execution.picklable(args):
+            job = execution.ProcessJob(self.data['script'], self.function_name(function), args)
+            signals = JobSignals()
+            signals.finished.connect(partial(self.job_finished, key, job))
+            self.runners[job] = signals
+        else:
+            if process:
+                sys.stderr.write('# The inputs for "{}" can\'t be sent to another process, so it\'s running in this '
+                                 'one instead.\n'.format(key))
+            job = execution.Job(function, args)
+            runner = JobRunner(job)
+            runner.signals.finished.connect(partial(self.job_finished, key, job))
+            self.runners[job] = runner
+
+        job.read = read
+        if cache_key is not None:
+            self.cache_keys[job] = cache_key
+        running.append(job)
+        self.update_busy(key)
+        if isinstance(job, execution.ProcessJob):
+            job.submit(execution.PROCESS_POOL, self.runners[job].finished.emit)
+            self.job_timer.start()
+        else:
+            EXEC_POOL.start(self.runners[job])
+
+    def check_jobs(self):
+        """
+        Finishes the tab's process jobs whose worker process died (or was terminated by cancelling the job or closing
+        the pool), as their callbacks never come (see execution.ProcessJob.lost)
+        """
+        jobs = [(key, job) for key, running in self.running.items() for job in running
+                if isinstance(job, execution.ProcessJob)]
+        for key, job in jobs:
+            if job.lost():
+                self.job_finished(key, job)
+
+        if all(job.finished for key, job in jobs):
+            self.job_timer.stop()
+
+    def job_finished(self, key, job):
+        """
+        Reports back on a job once its function is done (on the main thread)
+        Args:
+            key (str): The button the job was for
+            job (execution.Job): The finished job
+        """
+        self.runners.pop(job, None)
+        if job in self.running.get(key, []):
+            self.running[key].remove(job)
+
+        self.record_job(key, job)
+        self.cache_result(self.cache_keys.pop(job, None), job)
+        if getattr(job, 'output', ''):
+            sys.stdout.write(job.output)
+        if job.error:
+            sys.stderr.write(job.error)
+        elif job.cancelled:
+            sys.stdout.write('# "{}" was cancelled\n'.format(key))
+        self.update_busy(key)
+        self.report_profile(job)
+
+    def record_job(self, key, job):
+        """
+        Adds a finished job's timings to its button's stats (cancelled jobs and profiled runs aren't counted)
+        Args:
+            key (str): The button the job was for
+            job (execution.Job): The finished job
+        """
+        if (job.started and not job.cancelled and 'script' in self.data and
+                not isinstance(job.function, profiling.Profiler)):
+            stats.STATS.record(self.data['script'], key, job.wall, job.cpu, job.read, job.error is None)
+
+    def cache_result(self, cache_key, job):
+        """
+        Caches what a finished job's function returned (if it ran without raising)
+        Args:
+            cache_key (tuple): Key to cache the result under (None to not cache it)
+            job (execution.Job): The finished job
+        """
+        if cache_key is not None and job.started and job.error is None:
+            self.result_cache.put(cache_key, job.result)
+
+    def report_profile(self, job):
+        """
+        Lets the main window know a job's function was profiled so it can show the results
+        Args:
+            job (execution.Job): The finished job
+        """
+        if isinstance(job.function, profiling.Profiler) and job.function.path:
+            sys.stdout.write('# Saved profile to {}\n'.format(job.function.path))
+            self.profile_saved.emit(job.function.path)
+
+    def set_profile_next(self, key, sampling=False):
+        """
+        Sets a button's next run to be profiled
+        Args:
+            key (str): The button's label
+            sampling (bool): If True, samples the stack rather than using cProfile (for long running functions)
+        """
+        self.profile_next[key] = sampling
+        sys.stdout.write('# The next run of "{}" will be {}\n'.format(key, 'sampled' if sampling else 'profiled'))
+
+    def function_name(self, function):
+        """
+        Finds the name a function has in the script (for looking it up in a worker process' copy of the script)
+        Args:
+            function (callable): The function
+        Returns:
+            name (str): The name
+        """
+        for name, func in self.functions.items():
+            if func is function:
+                return name
+        return getattr(function, 'name', function.__name__)
+
+    def cancel_jobs(self, key):
+        """
+        Cancels a button's runs. Queued ones never start, ones running in a process get their worker terminated and
+        ones running on a thread stop if they check execution.cancelled().
+        Args:
+            key (str): The button's label
+        """
+        jobs = list(self.running.get(key, []))
+        for job in jobs:
+            job.cancel()
+
+        if any(not isinstance(job, execution.ProcessJob) and job.started for job in jobs):
+            sys.stdout.write('# Asked "{}" to stop. Runs on a thread stop once they check '
+                             'execution.cancelled()\n'.format(key))
+        self.check_jobs()
+
+    def update_busy(self, key):
+        """
+        Shows whether a button's function is running on the button
+        Args:
+            key (str): The button's label
+        """
+        for btn in self.scroll.widget().findChildren(FuncButton):
+            if btn.label == key:
+                btn.set_busy(len(self.running.get(key, [])))
+
+    def commands(self):
+        """
+        Gets everything the script has a button for without building the tab (for the command palette). Tabs that
+        haven't been built yet only have their script statically analyzed if possible.
+        Returns:
+            commands (list): Dictionaries of {(str) id: Unique id for the command, (str) label: The button's label,
+                                              (str) detail: The frame the button is in, (str) text: Text to match,
+                                              (str) toolTip: The button's tooltip, (callable) function: The button's
+                                              function, (list) inputs: Indices of the frame's input widgets to pass
+                                              in, (dict) markup: The button's markup, (dict) group: The frame's group}
+        """
+        if 'script' not in self.data:
+            return []
+
+        try:
+            static = not self.built or self.loading or self.prefs.get('static_tabs', False)
+            entry = modules.MODULE_MANAGER.load(self.data['script'], static=static)
+        except:
+            return []
+
+        if self.command_cache and self.command_cache[0] is entry:
+            return self.command_cache[1]
+
+        commands = []
+        tab_name = self.data.get('name', 'Default')
+        if entry.instructions is not None:
+            try:
+                if not entry.homogenized:
+                    self.homogenize_function_instructions(entry.instructions, entry.functions)
+                    entry.homogenized = True
+            except RuntimeError:
+                return []
+
+            for group in entry.instructions['contents']:
+                if 'simple' in group:
+                    commands.append(command_data(tab_name, '', group, group['simple']))
+
+                for btn in group.get('buttons', []):
+                    commands.append(command_data(tab_name, group.get('label', 'Default'), btn, btn['function'], group))
+        else:
+            for name in self.simple_names(entry.functions):
+                function = entry.functions[name]
+                commands.append(command_data(tab_name, '', {'label': function.__name__}, function))
+
+        self.command_cache = entry, commands
+        return commands
+
+    def run_command(self, command):
+        """
+        Runs a command from the command palette the same way clicking its button would. If the button reads input
+        widgets, the built frame's widgets are used, otherwise just that frame gets built (off screen) to read from.
+        Args:
+            command (dict): The command (from commands)
+        """
+        if not command['inputs']:
+            self.func_button_clicked(command['function'], [], command['markup'])
+            return
+
+        signature = group_signature(command['group'])
+        frames = [widget for sig, widget in self.groups if sig == signature and hasattr(widget, 'input_widgets')]
+        if frames:
+            inputs = [frames[0].input_widgets[i] for i in command['inputs']]
+            self.func_button_clicked(command['function'], inputs, command['markup'])
+            return
+
+        frame = self.build_frame(copy_markup(command['group']), self.data.get('saved', {}))
+        frame.hide()
+        try:
+            inputs = [frame.input_widgets[i] for i in command['inputs']]
+            self.func_button_clicked(command['function'], inputs, command['markup'])
+        finally:
+            for widget in list(frame.input_widgets) + frame.buttons:
+                widget.release()
+                WIDGET_POOL.release(widget)
+            frame.setParent(None)
+            frame.deleteLater()
+
     def stack_trace(self):
         """
         Looks up and returns a formatted stack trace
         Returns:
             txt (str): The formatted stack trace
         """
-        typ, err, tb = sys.exc_info()
-        txt = '# {}\n# Traceback (most recent call last):\n'.format(err)
-        for fl, num, func, line in traceback.extract_tb(tb):
-            txt += '#    File "{}", line {}, in {}\n#      {}\n'.format(fl, num, func, line)
-        txt += '# {}\n'.format(err)
-        return txt
+        return execution.stack_trace()
 
     def build_stack_trace(self):
         """
@@ -316,56 +940,82 @@ class ScriptWidget(QtWidgets.QWidget):
         self.body_lwt.addWidget(QtWidgets.QLabel(txt))
         self.body_lwt.addStretch()
 
-    def set_palette(self, widget, role, rgb=(), image=''):
+    def style_widget(self, widget, rgb=None, image=None):
         """
-        Convenience function for setting a color or image in one line (since it's an overly long process with Qt)
+        Gives a frame (or the scroll widget) a background color or image through the tab's theme. Nothing changes until
+        the tab's stylesheet gets applied at the end of the build. Buttons and input widgets get their color through
+        their palette instead, as styling their background would drop their native look.
         Args:
             widget (QtWidgets.QWidget): The widget you wish to edit
-            role (QtGui.QPalette.ColorRole): Color role to set
             rgb (list): Values to pass in to QColor
             image (str): In the case of an image, the path to an image
         """
-        if not rgb and not image:
-            return
+        declarations = theme.background(rgb, image)
+        if declarations:
+            widget.setProperty('spStyle', self.theme.style(widget.metaObject().className(), declarations))
 
-        widget.setAutoFillBackground(True)
-        pal = widget.palette()
+    def scan_search_names(self):
+        """
+        Cheaply scans the script's source (without importing it) for function/class names and markup labels so tabs
+        that haven't been built yet can still be searched.
+        Returns:
+            index (search.SearchIndex): Index of the names found in the script
+        """
+        if self.scan_index is None:
+            try:
+                with open(self.data['script']) as f:
+                    source = f.read()
+            except (KeyError, IOError, OSError):
+                source = ''
 
-        if image:
-            brush = pal.brush(role)
-            brush.setTextureImage(QtGui.QImage(image))
-            pal.setBrush(role, brush)
-        else:
-            pal.setColor(role, QtGui.QColor(*rgb))
+            names = re.findall(r'^(?:def|class)\s+(\w+)', source, re.MULTILINE)
+            names += re.findall(r'[\'"]label[\'"]\s*:\s*[\'"]([^\'"]+)[\'"]', source)
+            self.scan_index = search.SearchIndex(names)
 
-        widget.setPalette(pal)
+        return self.scan_index
+
+    def build_search_index(self):
+        """
+        Indexes the labels, tooltips and docstrings of the buttons and groups that were just built
+        """
+        self.search_index = search.SearchIndex(text for widget, text in self.search_widgets)
+        self.visible = set(range(len(self.search_widgets)))
 
     def filter(self, keys):
         """
         Filters out buttons or groups depending on filter keys
         Args:
             keys (list): Filter keys. If any key begins with "not," it will filter if it isn't found
+        Returns:
+            matches (int): The number of buttons/groups that passed the filter
         """
-        if self.simple:
-            children = self.findChildren(QtWidgets.QPushButton)
-        else:
-            children = filter(lambda x: type(x) is QtWidgets.QFrame or type(x) is QtWidgets.QPushButton,
-                              self.scroll.widget().children())
+        self.filter_keys = keys
+        if not self.built or self.loading:
+            # Nothing to hide yet. The keys get applied once the tab is built, the source scan just reports matches
+            return len(self.scan_search_names().search(keys))
 
-        widgets = zip([wid.text() if type(wid) is QtWidgets.QPushButton else wid.children()[1].text()
-                       for wid in children], children)
+        if self.search_index is None:
+            return 0
 
-        passed = list(widgets)
-        for key in keys:
-            if key.startswith('not '):
-                passed = filter(lambda x: key.lstrip('not ').strip() not in x[0].lower(), passed)
-            else:
-                passed = filter(lambda x: key in x[0].lower(), passed)
+        passed = self.search_index.search(keys)
+        if self.button_view is not None:
+            self.button_view.model().set_passed(passed)
+            return len(passed)
 
-        for widget in widgets:
-            widget[1].setVisible(widget in passed)
+        # Only widgets that are changing get touched
+        for i in self.visible ^ passed:
+            self.search_widgets[i][0].setVisible(i in passed)
+        self.visible = passed
 
-        self.filter_keys = keys
+        return len(passed)
+
+    def reimport(self):
+        """
+        Drops the cached module for the script and refreshes, forcing a fresh import (for when only a module the script
+        imports has changed)
+        """
+        modules.MODULE_MANAGER.invalidate(self.data['script'])
+        self.load_script()
 
     def add_exclude(self, name):
         """
@@ -398,9 +1048,15 @@ class ScriptWidget(QtWidgets.QWidget):
             return
 
         menu = QtWidgets.QMenu()
-        menu.addAction('Refresh Tab', self.process_script)
+        menu.addAction('Refresh Tab', self.load_script)
+        menu.addAction('Reimport Script', self.reimport)
         menu.addAction('Copy Script Path to Clipboard', lambda: QtGui.QClipboard().setText(self.data.get('script')))
         menu.addAction('Open Script in Default Editor', lambda: os.system('start {}'.format(self.data.get('script'))))
+        if self.spec_report:
+            menu.addAction('Print Markup Report', lambda: sys.stderr.write(self.spec_report))
+        if self.result_cache.entries:
+            menu.addAction('Clear Result Cache ({rate:.0%} Hit Rate)'.format(**self.result_cache.stats()),
+                           self.result_cache.clear)
         if self.data.get('excluded'):
             menu.addSeparator()
             hidden_menu = menu.addMenu('Include Excluded Button(s)')
@@ -410,15 +1066,37 @@ class ScriptWidget(QtWidgets.QWidget):
 
         menu.exec_(QtGui.QCursor.pos())
 
-    def button_menu(self, name, func, *args):
+    def button_menu(self, name, func, data=None, inputs=(), *args):
         """
         Menu for the buttons in the tab
         Args:
             name (str): The name of the function (for excluding)
             func (callable): The function instance (for looking up the docstring)
+            data (dict): Dictionary of data from the markup for the button
+            inputs (tuple): list of input widgets from na_scratch_paper_tab_widgets the button reads (for batches)
         """
         menu = QtWidgets.QMenu()
+        button_stats = stats.STATS.get(self.data['script'], name) if 'script' in self.data else None
+        if button_stats and button_stats.samples:
+            for line in button_stats.describe().split('\n'):
+                menu.addAction(line).setEnabled(False)
+            menu.addSeparator()
+        if self.running.get(name):
+            menu.addAction('Cancel Running', lambda: self.cancel_jobs(name))
+            menu.addSeparator()
+        if data and data.get('cache'):
+            cache_stats = self.result_cache.stats(name)
+            action = menu.addAction('Cached Results: {entries}, Hit Rate: {rate:.0%} ({hits} of {lookups} '
+                                    'Clicks)'.format(**cache_stats))
+            action.setEnabled(False)
+            menu.addAction('Clear Cached Results', lambda: self.result_cache.clear(name))
+            menu.addSeparator()
+        menu.addAction('Profile Next Run', lambda: self.set_profile_next(name))
+        menu.addAction('Sample Next Run', lambda: self.set_profile_next(name, sampling=True))
+        menu.addAction('Run Batch...', lambda: self.run_batch(name, func, data or {}, inputs))
+        menu.addSeparator()
         menu.addAction('Copy Script Path to Clipboard', lambda: QtGui.QClipboard().setText(self.data.get('script')))
+        menu.addAction('Copy as Pipeline Step', lambda: self.copy_pipeline_step(name, func))
         menu.addAction('Open Script in Default Editor', lambda: os.system('start {}'.format(self.data.get('script'))))
         menu.addSeparator()
         menu.addAction('Exclude Button', lambda: self.add_exclude(name))
@@ -426,6 +1104,84 @@ class ScriptWidget(QtWidgets.QWidget):
 
         menu.exec_(QtGui.QCursor.pos())
 
+    def copy_pipeline_step(self, name, func):
+        """
+        Copies a button to the clipboard as a step to paste in to a pipeline (see Pipelines>Edit Pipelines...)
+        Args:
+            name (str): The button's label (used as the step's id)
+            func (callable): The button's function
+        """
+        step = pipelines.step_data(self.data.get('script'), self.function_name(func), name)
+        QtGui.QClipboard().setText(json.dumps(step, sort_keys=True, indent=4, separators=(',', ': ')))
+
+    def run_batch(self, name, func, data, inputs=()):
+        """
+        Runs a button for every row of a JSONL or CSV file on EXEC_POOL (see na_scratch_paper_batch), writing the
+        results to a JSONL file. Rows are read the same way the input widgets read their text (and the same way the
+        headless batch command reads them, with the script module's globals for "eval" fields), and "process" buttons
+        run their rows in execution.PROCESS_POOL. Cancelling the button's runs stops the batch.
+        Args:
+            name (str): The button's label
+            func (callable): The button's function
+            data (dict): Dictionary of data from the markup for the button
+            inputs (tuple): list of input widgets from na_scratch_paper_tab_widgets the button reads
+        """
+        running = self.running.setdefault(name, [])
+        if len(running) >= data.get('concurrency', 1):
+            sys.stderr.write('# "{}" is already running. Cancel it from its menu to run it again.\n'.format(name))
+            return
+
+        path, selected = QtWidgets.QFileDialog.getOpenFileName(self, 'Batch Rows', '',
+                                                               'Rows (*.jsonl *.csv);;All Files (*)')
+        if not path:
+            return
+        output, selected = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Batch Results', os.path.splitext(path)[0] + '_results.jsonl', 'JSON Lines (*.jsonl)')
+        if not output:
+            return
+
+        process = None
+        if data.get('process'):
+            process = self.data['script'], self.function_name(func)
+            workers = execution.PROCESS_POOL.size or max(multiprocessing.cpu_count() - 1, 1)
+        else:
+            workers, ok = QtWidgets.QInputDialog.getInt(self, 'Batch Workers', 'Rows to run at once:', batch.WORKERS,
+                                                        1, 64)
+            if not ok:
+                return
+
+        widgets = [widget.data for widget in inputs]
+        button = headless.Button(name, '', func, {'inputs': range(len(widgets))}, widgets, self.script_namespace())
+        run = batch.BatchRun(button, batch.read_rows(path), output, workers, process)
+        job = execution.Job(run.run)
+        runner = JobRunner(job)
+        # The batch runs on a worker thread, so its progress gets written on the main thread through the signals
+        run.progress = batch.Progress(name, runner.signals)
+        runner.signals.output.connect(lambda txt: sys.stdout.write(txt))
+        runner.signals.finished.connect(partial(self.batch_finished, name, run, job))
+        self.runners[job] = runner
+        running.append(job)
+        self.update_busy(name)
+        EXEC_POOL.start(runner)
+
+    def batch_finished(self, name, run, job):
+        """
+        Reports back on a batch once every row is done (on the main thread)
+        Args:
+            name (str): The button's label
+            run (batch.BatchRun): The batch
+            job (execution.Job): The job the batch ran in
+        """
+        self.runners.pop(job, None)
+        if job in self.running.get(name, []):
+            self.running[name].remove(job)
+
+        if job.error:
+            sys.stderr.write(job.error)
+        elif job.started:
+            sys.stdout.write(run.report())
+        self.update_busy(name)
+
     def save_vals(self):
         """
         Saves desired values to preferences
@@ -450,10 +1206,282 @@ class ScriptWidget(QtWidgets.QWidget):
                         self.data['saved'][frame_label].append(widget_data)
 
 
+class ButtonListModel(QtCore.QAbstractListModel):
+    """
+    Model of a simple tab's buttons for showing in a list view
+    """
+    function_role = QtCore.Qt.UserRole
+
+    def __init__(self, parent, buttons):
+        """
+        Initial call method
+        Args:
+            parent (QtCore.QObject): Parent object
+            buttons (list): (label, function) tuples for each button
+        """
+        super(ButtonListModel, self).__init__(parent)
+        self.buttons = buttons
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.buttons)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        label, function = self.buttons[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return label
+        elif role == self.function_role:
+            return function
+        return None
+
+    def release(self):
+        """
+        Lets go of the functions so they don't outlive a refresh
+        """
+        self.beginResetModel()
+        self.buttons = []
+        self.endResetModel()
+
+
+class SearchProxyModel(QtCore.QSortFilterProxyModel):
+    """
+    Proxy model that hides the rows that didn't pass the tab's search
+    """
+    def __init__(self, parent):
+        """
+        Initial call method
+        Args:
+            parent (QtCore.QObject): Parent object
+        """
+        super(SearchProxyModel, self).__init__(parent)
+        self.passed = None
+
+    def set_passed(self, passed):
+        """
+        Sets which rows are shown
+        Args:
+            passed (set): Source model rows that passed the search (None shows everything)
+        """
+        self.passed = passed
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, row, parent):
+        return self.passed is None or row in self.passed
+
+
+class ButtonDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Paints list view rows as push buttons
+    """
+    def __init__(self, parent):
+        """
+        Initial call method
+        Args:
+            parent (QtWidgets.QAbstractItemView): The view the delegate is for
+        """
+        super(ButtonDelegate, self).__init__(parent)
+        self.row_height = QtWidgets.QPushButton('Button').sizeHint().height()
+
+    def paint(self, painter, option, index):
+        opt = QtWidgets.QStyleOptionButton()
+        opt.rect = option.rect.adjusted(1, 1, -1, -1)
+        opt.text = index.data()
+        opt.palette = option.palette
+        opt.state = QtWidgets.QStyle.State_Enabled | QtWidgets.QStyle.State_Raised
+        if option.state & QtWidgets.QStyle.State_MouseOver:
+            opt.state |= QtWidgets.QStyle.State_MouseOver
+            if QtWidgets.QApplication.mouseButtons() & QtCore.Qt.LeftButton:
+                opt.state |= QtWidgets.QStyle.State_Sunken
+
+        QtWidgets.QApplication.style().drawControl(QtWidgets.QStyle.CE_PushButton, opt, painter)
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(option.rect.width(), self.row_height)
+
+
+class FuncButton(QtWidgets.QPushButton):
+    """
+    Command button for the tabs. These get pooled between builds, so everything about them comes from configure.
+    """
+    def configure(self, data):
+        """
+        Sets the button up from the markup
+        Args:
+            data (dict): Dictionary of data from the markup
+        """
+        self.label = data['label']
+        self.setText(self.label)
+        self.setToolTip(data.get('toolTip'))
+        self.setIcon(images.IMAGE_CACHE.icon(data['icon']) if 'icon' in data else QtGui.QIcon())
+        self.setAutoFillBackground(False)
+        self.setPalette(QtGui.QPalette())
+
+    def set_busy(self, count):
+        """
+        Shows that the button's function is running (for buttons that run it on another thread)
+        Args:
+            count (int): How many runs are going
+        """
+        if not count:
+            self.setText(self.label)
+        else:
+            self.setText(u'{} (Running{})\u2026'.format(self.label, ' x{}'.format(count) if count > 1 else ''))
+
+    def release(self):
+        """
+        Disconnects the button so it doesn't keep the function (and its module) alive while it's pooled
+        """
+        for signal in (self.clicked, self.customContextMenuRequested):
+            try:
+                signal.disconnect()
+            except (RuntimeError, TypeError):
+                pass
+
+
+class JobSignals(QtCore.QObject):
+    """
+    Signals for JobRunner (QRunnables can't have signals of their own)
+    """
+    finished = QtCore.Signal()
+    output = QtCore.Signal(str)
+
+    def write(self, txt):
+        """
+        Sends text to be written on the main thread, so the signals can stand in for a stream on a worker thread
+        Args:
+            txt (str): The text
+        """
+        self.output.emit(txt)
+
+
+class JobRunner(QtCore.QRunnable):
+    """
+    Runnable that runs a button's function on a worker thread. The result or stack trace is kept on the job, and
+    finished gets emitted so the tab can pick it up on the main thread.
+    """
+    def __init__(self, job):
+        """
+        Initial call method
+        Args:
+            job (execution.Job): The job to run
+        """
+        super(JobRunner, self).__init__()
+        self.setAutoDelete(False)
+        self.job = job
+        self.signals = JobSignals()
+
+    def run(self):
+        """
+        Runs the job
+        """
+        self.job.run()
+        self.signals.finished.emit()
+
+
+class WidgetPool(object):
+    """
+    Keeps buttons and common input widgets from a torn down tab around so the next build can reconfigure them instead
+    of creating new ones. Only POOLED_TYPES get pooled, and only up to "cap" of each.
+    """
+    def __init__(self, cap=200):
+        """
+        Initial call method
+        Args:
+            cap (int): The most idle widgets of each type to keep
+        """
+        self.cap = cap
+        self.widgets = {}
+        self.reused = 0
+        self.created = 0
+
+    def acquire(self, cls):
+        """
+        Takes an idle widget out of the pool
+        Args:
+            cls (type): The exact type of widget wanted
+        Returns:
+            widget (QtWidgets.QWidget): The widget, or None if there aren't any idle ones (the caller creates one)
+        """
+        if self.widgets.get(cls):
+            self.reused += 1
+            return self.widgets[cls].pop()
+
+        self.created += 1
+        return None
+
+    def release(self, widget):
+        """
+        Puts a widget in the pool (the widget is taken out of its parent), or deletes it if it can't be pooled
+        Args:
+            widget (QtWidgets.QWidget): The widget
+        """
+        widgets = self.widgets.setdefault(type(widget), [])
+        widget.setParent(None)
+        if type(widget) in POOLED_TYPES and len(widgets) < self.cap:
+            widgets.append(widget)
+        else:
+            widget.deleteLater()
+
+    def clear(self):
+        """
+        Deletes all the idle widgets
+        """
+        for widgets in self.widgets.values():
+            for widget in widgets:
+                widget.deleteLater()
+        self.widgets = {}
+
+
+class LoaderSignals(QtCore.QObject):
+    """
+    Signals for ScriptLoader (QRunnables can't have signals of their own)
+    """
+    finished = QtCore.Signal()
+
+
+class ScriptLoader(QtCore.QRunnable):
+    """
+    Runnable that prepares a script on a worker thread so the main thread only has to execute it and build the tab
+    """
+    def __init__(self, path, static=False):
+        """
+        Initial call method
+        Args:
+            path (str): Path to the script
+            static (bool): Whether the script is going to be loaded statically
+        """
+        super(ScriptLoader, self).__init__()
+        self.setAutoDelete(False)
+        self.path = path
+        self.static = static
+        self.signals = LoaderSignals()
+
+    def run(self):
+        """
+        Prepares the script (and its images) and lets the tab know it's ready to be built
+        """
+        try:
+            modules.MODULE_MANAGER.prepare(self.path, self.static)
+
+            # Decoding the icons and images now saves doing it while building the tab
+            for path in images.image_paths(self.path):
+                images.IMAGE_CACHE.image(path)
+        except:
+            # Anything that went wrong here happens again (with a proper stack trace) when the tab gets built
+            pass
+        self.signals.finished.emit()
+
+
 class InputBase(QtWidgets.QWidget):
     """
     Baseline widget for setting up standard things like a main layout and reading methods
     """
+    # The keys each class accepts in its "inputWidgets" data, and whether it can take a "color"
+    allowed_data = frozenset(['type', 'label', 'toolTip', 'color', 'share', 'save'])
+    colorable = False
+
     def __init__(self, parent, data, layout=None):
         """
         Initial Call Method
@@ -470,39 +1498,63 @@ class InputBase(QtWidgets.QWidget):
         self.setLayout(self.lwt)
 
         self.setToolTip(data.get('toolTip'))
+        self.label = None
         if 'label' in data:
-            self.lwt.addWidget(QtWidgets.QLabel(data['label']))
+            self.label = QtWidgets.QLabel(data['label'])
+            self.lwt.addWidget(self.label)
 
-        self.allowed_data = ['type', 'label', 'toolTip', 'color', 'share', 'save']
         self.save_read = False
         self.data = data
+        # Gets the globals "eval" fields are evaluated with (set by the tab, see ScriptWidget.script_namespace)
+        self.namespace = None
 
-    def set_color(self):
+    def configure(self, data):
         """
-        Convenience function for setting a color role in one line (since it's an overly long process with Qt)
+        Sets a pooled widget back up from new data, as if it had just been created with it
+        Args:
+            data (dict): Dictonary containing applicable data for the widget
         """
-        if 'color' not in self.data:
-            return
+        self.setToolTip(data.get('toolTip'))
+        if 'label' in data:
+            if self.label is None:
+                self.label = QtWidgets.QLabel()
+                self.lwt.insertWidget(0, self.label)
+            self.label.setText(data['label'])
+            self.label.show()
+        elif self.label is not None:
+            self.label.hide()
+
+        for widget in unique(widget for widget, role in getattr(self, 'widget_color_info', [])):
+            widget.setAutoFillBackground(False)
+            widget.setPalette(QtGui.QPalette())
 
-        if not hasattr(self, 'widget_color_info'):
-            raise NotImplementedError('The "{}" widget is not eligible for the "color" '
-                                      'argument.'.format(self.__class__.__name__))
+        self.save_read = False
+        self.data = data
 
-        for widget, role in self.widget_color_info:
-            widget.setAutoFillBackground(True)
-            pal = widget.palette()
-            pal.setColor(role, QtGui.QColor(*self.data['color']))
-            widget.setPalette(pal)
+    def release(self):
+        """
+        Drops references to the markup data (and any functions in it) before the widget is deleted or pooled
+        """
+        self.data = {}
+        self.namespace = None
 
-    def data_key_check(self):
+    def set_color(self, color=None):
         """
-        Function for checking keys in the data argument to make sure incorrect keys weren't passed in as a safety check.
+        Convenience function for setting the color roles in one go (see set_palette_color)
+        Args:
+            color (QtGui.QColor): The color to set. Defaults to the "color" in the data
         """
-        extra_keys = filter(lambda x: x not in self.allowed_data, self.data.keys())
-        [self.data.pop(key) for key in extra_keys]
-        if extra_keys:
-            sys.stderr.write('The following data argument(s) are ineligible for the {} class:\n{}\nEligible keys:\n{}\n'
-                             '\n\n'.format(self.__class__.__name__, extra_keys, self.allowed_data))
+        if color is None:
+            if 'color' not in self.data or not self.colorable:
+                return
+            color = QtGui.QColor(*self.data['color'])
+
+        roles = {}
+        for widget, role in self.widget_color_info:
+            roles.setdefault(widget, []).append(role)
+
+        for widget, widget_roles in roles.items():
+            set_palette_color(widget, widget_roles, color)
 
     def set_val(self, val):
         """
@@ -518,19 +1570,13 @@ class InputBase(QtWidgets.QWidget):
         """
         raise NotImplementedError('The "{}" widget does not have read functionality'.format(self.__class__.__name__))
 
-    def showEvent(self, *args, **kwargs):
-        """
-        Overridden show event to set colors, check arguments, and load saved values
-        """
-        super(InputBase, self).showEvent(*args, **kwargs)
-        self.data_key_check()
-        self.set_color()
-
 
 class Spacer(InputBase):
     """
     Fixed size QSpacerItem convenience function
     """
+    allowed_data = frozenset(['type', 'toolTip', 'share', 'size'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -540,8 +1586,6 @@ class Spacer(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(Spacer, self).__init__(parent, data, layout)
-        self.allowed_data.append('size')
-        [self.allowed_data.remove(key) for key in ['label', 'color', 'save']]
 
         if 'size' not in data:
             raise RuntimeError('Size data not provided for Spacer Widget')
@@ -553,6 +1597,8 @@ class Stretch(InputBase):
     """
     Stretchy QSpacerItem convenience function
     """
+    allowed_data = frozenset(['type', 'toolTip', 'share'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -562,7 +1608,6 @@ class Stretch(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(Stretch, self).__init__(parent, data, layout)
-        [self.allowed_data.remove(key) for key in ['label', 'color', 'save']]
         self.lwt.addStretch()
 
 
@@ -570,6 +1615,8 @@ class Separator(InputBase):
     """
     An empty frame to serve as a separator
     """
+    allowed_data = frozenset(['type', 'toolTip', 'share', 'vertical'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -579,8 +1626,6 @@ class Separator(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(Separator, self).__init__(parent, data, layout)
-        [self.allowed_data.remove(key) for key in ['label', 'color', 'save']]
-        self.allowed_data.append('vertical')
 
         sep = QtWidgets.QFrame(parent)
         sep.setFrameShadow(QtWidgets.QFrame.Sunken)
@@ -594,6 +1639,9 @@ class LineEdit(InputBase):
     """
     Simply a QLineEdit with built-in label
     """
+    allowed_data = InputBase.allowed_data | frozenset(['text', 'placeholderText', 'eval', 'errorIfEmpty'])
+    colorable = True
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -603,7 +1651,6 @@ class LineEdit(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(LineEdit, self).__init__(parent, data, layout)
-        self.allowed_data.extend(['text', 'placeholderText', 'eval', 'errorIfEmpty'])
 
         self.le = QtWidgets.QLineEdit()
         self.le.setPlaceholderText(data.get('placeholderText', ''))
@@ -613,6 +1660,16 @@ class LineEdit(InputBase):
         self.set_val(data.get('text', ''))
         self.widget_color_info = [(self.le, QtGui.QPalette.Base)]
 
+    def configure(self, data):
+        """
+        Sets a pooled widget back up from new data, as if it had just been created with it
+        Args:
+            data (dict): Dictonary containing applicable data for the widget
+        """
+        super(LineEdit, self).configure(data)
+        self.le.setPlaceholderText(data.get('placeholderText', ''))
+        self.set_val(data.get('text', ''))
+
     def validate_text(self, txt):
         """
         Validates text data and returns the text if valid, returns an empty string otherwise
@@ -626,7 +1683,9 @@ class LineEdit(InputBase):
     def safe_eval(self, text):
         """
         Checks whether the user has enabled eval (to run eval on the lineEdit and return the result)
-        Gives more information than is normal in the case of an error
+        Gives more information than is normal in the case of an error. The text is only parsed the first time it's seen
+        (see expressions.EXPRESSIONS), and literals don't get run through eval at all. It's evaluated with the script
+        module's globals, the same as in the headless runner.
         Args:
             text (str): The text from the field
         Returns:
@@ -637,7 +1696,8 @@ class LineEdit(InputBase):
 
         else:
             try:
-                return eval(text) if text else ''
+                namespace = self.namespace() if self.namespace is not None else None
+                return expressions.EXPRESSIONS.evaluate(text, namespace) if text else ''
             except:
                 info = sys.exc_info()
                 err_txt = 'Error Occured when reading the "{}" Text Field\n'.format(self.data.get('label', ''))
@@ -672,6 +1732,8 @@ class CmdLineEdit(LineEdit):
     """
     LineEdit with a button to run a command and write out the return value to the lineEdit
     """
+    allowed_data = LineEdit.allowed_data | frozenset(['buttonCommand', 'buttonLabel', 'buttonToolTip'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -681,7 +1743,6 @@ class CmdLineEdit(LineEdit):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(CmdLineEdit, self).__init__(parent, data, layout)
-        self.allowed_data.extend(['buttonCommand', 'buttonLabel', 'buttonToolTip'])
 
         self.button = QtWidgets.QPushButton(data.get('buttonLabel', ' > '))
         self.button.setToolTip(data.get('buttonToolTip', ''))
@@ -695,6 +1756,17 @@ class CmdLineEdit(LineEdit):
         self.lwt.insertWidget(self.lwt.indexOf(self.le), self.button)
         self.widget_color_info.append((self.button, QtGui.QPalette.Button))
 
+    def release(self):
+        """
+        Drops references to the markup data and the button command before the widget is deleted
+        """
+        super(CmdLineEdit, self).release()
+        try:
+            self.button.clicked.disconnect()
+        except (RuntimeError, TypeError):
+            pass
+        self.__dict__.pop('button_command', None)
+
     def button_command_validate(self):
         """
         Command to run "button_command" and set the lineEdit text if a value was returned
@@ -717,6 +1789,9 @@ class Browse(CmdLineEdit):
     """
     CmdLineEdit with the command set to get a bring up a browser window and assign the result
     """
+    allowed_data = (CmdLineEdit.allowed_data | frozenset(['caption', 'filter', 'fileMode', 'directory'])) - \
+        frozenset(['eval', 'buttonCommand'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -727,8 +1802,6 @@ class Browse(CmdLineEdit):
         """
         data['buttonLabel'] = ' Browse: '
         super(Browse, self).__init__(parent, data, layout)
-        self.allowed_data.extend(['caption', 'filter', 'fileMode', 'directory'])
-        [self.allowed_data.remove(i) for i in ['eval', 'buttonCommand']]
 
     def button_command(self):
         """
@@ -760,6 +1833,8 @@ class Selection(CmdLineEdit):
     """
     CmdLineEdit with the command set to get a single Maya selection and fill in the lineEdit
     """
+    allowed_data = (CmdLineEdit.allowed_data | frozenset(['checkExisting'])) - frozenset(['eval', 'buttonCommand'])
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -771,8 +1846,6 @@ class Selection(CmdLineEdit):
         super(Selection, self).__init__(parent, data, layout)
         self.button.setFixedSize(self.button.width(), self.button.width())
         self.button.setToolTip('Get Selection')
-        self.allowed_data.append('checkExisting')
-        [self.allowed_data.remove(i) for i in ['eval', 'buttonCommand']]
 
     def button_command(self):
         """
@@ -955,6 +2028,9 @@ class PyNodeMulti(SelectionMulti):
 
 
 class IntSpinner(InputBase):
+    allowed_data = InputBase.allowed_data | frozenset(['max', 'min', 'value', 'step'])
+    colorable = True
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -964,7 +2040,6 @@ class IntSpinner(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(IntSpinner, self).__init__(parent, data, layout)
-        self.allowed_data.extend(['max', 'min', 'value', 'step'])
 
         self.spin = self.create_spinner()
         self.spin.setValue(data.get('value', 0))
@@ -975,6 +2050,18 @@ class IntSpinner(InputBase):
         self.lwt.addWidget(self.spin)
         self.widget_color_info = [(self.spin, QtGui.QPalette.Base), (self.spin, QtGui.QPalette.Button)]
 
+    def configure(self, data):
+        """
+        Sets a pooled widget back up from new data, as if it had just been created with it
+        Args:
+            data (dict): Dictonary containing applicable data for the widget
+        """
+        super(IntSpinner, self).configure(data)
+        self.spin.setMinimum(data.get('min', 0))
+        self.spin.setMaximum(data.get('max', 99))
+        self.spin.setSingleStep(data.get('step', 1))
+        self.spin.setValue(data.get('value', 0))
+
     def create_spinner(self):
         """
         Creates and returns a spinBox
@@ -1021,6 +2108,9 @@ class FloatSpinner(IntSpinner):
 
 
 class CheckBox(InputBase):
+    allowed_data = InputBase.allowed_data | frozenset(['value'])
+    colorable = True
+
     def __init__(self, parent, data, layout):
         """
         Initial Call Method
@@ -1030,18 +2120,27 @@ class CheckBox(InputBase):
             layout (QtWidgets.QLayout): Parent layout
         """
         super(CheckBox, self).__init__(parent, data, layout)
-        self.allowed_data.append('value')
 
         self.check = QtWidgets.QCheckBox()
         self.check.setChecked(data.get('value', False))
 
         if data.get('label'):
-            lbl = self.findChildren(QtWidgets.QLabel)[0]
-            lbl.mousePressEvent = self.label_click
+            self.label.mousePressEvent = self.label_click
 
         self.lwt.addWidget(self.check)
         self.widget_color_info = [(self.check, QtGui.QPalette.Base)]
 
+    def configure(self, data):
+        """
+        Sets a pooled widget back up from new data, as if it had just been created with it
+        Args:
+            data (dict): Dictonary containing applicable data for the widget
+        """
+        super(CheckBox, self).configure(data)
+        if self.label is not None:
+            self.label.mousePressEvent = self.label_click
+        self.check.setChecked(data.get('value', False))
+
     def label_click(self, *args):
         """
         Toggles the checkbox to have the same behavior as checkbox labels
@@ -1065,6 +2164,194 @@ class CheckBox(InputBase):
         return self.check.isChecked()
 
 
+def compile_spec(cls, data):
+    """
+    Validates an "inputWidgets" entry against the widget class' allowed keys, removing any that aren't allowed, and
+    works out its color. The result for each distinct class, set of keys and color is cached so the checks only ever
+    run once.
+    Args:
+        cls (type): The InputBase subclass the entry is for
+        data (dict): The entry's data (ineligible keys are removed in place)
+    Returns:
+        errors, color (tuple): (list) Descriptions of anything wrong with the entry,
+                               (QtGui.QColor) The color to apply to the widget or None
+    """
+    key = (cls, frozenset(data.keys()), repr(data.get('color')))
+    if key not in SPEC_CACHE:
+        extra_keys = sorted(name for name in data if name not in cls.allowed_data)
+        errors = []
+        if extra_keys:
+            errors.append('The following data argument(s) are ineligible for the {} class: {}. Eligible keys: '
+                          '{}'.format(cls.__name__, extra_keys, sorted(cls.allowed_data)))
+
+        color = None
+        if 'color' in data and 'color' not in extra_keys:
+            if not cls.colorable:
+                errors.append('The "{}" widget is not eligible for the "color" argument.'.format(cls.__name__))
+                extra_keys.append('color')
+            else:
+                try:
+                    color = QtGui.QColor(*data['color'])
+                except TypeError:
+                    errors.append('Invalid color: {}'.format(data['color']))
+                    extra_keys.append('color')
+
+        SPEC_CACHE[key] = extra_keys, errors, color
+
+    extra_keys, errors, color = SPEC_CACHE[key]
+    for extra_key in extra_keys:
+        data.pop(extra_key)
+    return errors, color
+
+
+def group_search_text(group):
+    """
+    Gets the searchable text for a group in the instructions: its label and tooltip, the labels and tooltips of
+    everything in it and the docstrings of its functions
+    Args:
+        group (dict): The group's instructions
+    Returns:
+        text (unicode): The text to search
+    """
+    values = [group.get('label'), group.get('toolTip')]
+    if 'simple' in group:
+        values.append(getattr(group['simple'], '__doc__', None))
+
+    for data in group.get('inputWidgets', []):
+        values.extend([data.get('label'), data.get('toolTip'), data.get('buttonToolTip')])
+
+    for data in group.get('buttons', []):
+        values.extend([data.get('label'), data.get('toolTip'), getattr(data.get('function'), '__doc__', None)])
+
+    return search.join_text(*values)
+
+
+def command_data(tab_name, detail, data, function, group=None):
+    """
+    Creates the data for a command in the command palette
+    Args:
+        tab_name (str): The name of the tab the command's from
+        detail (str): Where in the tab the command is (the frame label)
+        data (dict): Dictionary of data from the markup for the button
+        function (callable): The button's function
+        group (dict): The frame's group in the instructions
+    Returns:
+        command (dict): The command data (see ScriptWidget.commands)
+    """
+    label = data.get('label', function.__name__)
+    return {'id': '/'.join([tab_name, detail, label]),
+            'label': label,
+            'detail': detail,
+            'text': search.join_text(label, detail, tab_name),
+            'toolTip': data.get('toolTip') or getattr(function, '__doc__', None),
+            'function': function,
+            'inputs': list(data.get('inputs', [])),
+            'markup': data,
+            'group': group}
+
+
+def clear_layout(layout):
+    """
+    Takes every item out of a layout and deletes it, including the widgets and nested layouts
+    Args:
+        layout (QtWidgets.QLayout): The layout to clear
+    """
+    while layout.count():
+        item = layout.takeAt(0)
+        if item.widget() is not None:
+            widget = item.widget()
+            widget.setParent(None)
+            widget.deleteLater()
+        elif item.layout() is not None:
+            clear_layout(item.layout())
+            item.layout().deleteLater()
+
+
+def set_palette_color(widget, roles, color):
+    """
+    Colors a widget through its palette, which keeps its native look. Palettes are cached per widget type, role and
+    color so widgets sharing a color share a palette instead of each copying and editing their own.
+    Args:
+        widget (QtWidgets.QWidget): The widget
+        roles (list): The QtGui.QPalette.ColorRoles to set
+        color (QtGui.QColor): The color
+    """
+    key = (type(widget).__name__, tuple(roles), color.rgba())
+    if key not in PALETTE_CACHE:
+        pal = widget.palette()
+        for role in roles:
+            pal.setColor(role, color)
+        PALETTE_CACHE[key] = pal
+
+    widget.setAutoFillBackground(True)
+    widget.setPalette(PALETTE_CACHE[key])
+
+
+def unique(items):
+    """
+    Removes duplicates while keeping the order
+    Args:
+        items (iterable): The items
+    Returns:
+        unique (list): The items without duplicates
+    """
+    found = []
+    for item in items:
+        if item not in found:
+            found.append(item)
+    return found
+
+
+def copy_markup(value):
+    """
+    Copies the dictionaries and lists of a group in the instructions, leaving everything else (functions) as is
+    Args:
+        value (object): The group (or a value within it)
+    Returns:
+        copied (object): The copy
+    """
+    if isinstance(value, dict):
+        return dict((key, copy_markup(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [copy_markup(item) for item in value]
+    return value
+
+
+def group_signature(value):
+    """
+    Creates a comparable signature of a group in the instructions. Callables are compared by name, since re-importing
+    a script creates new function objects even if nothing changed.
+    Args:
+        value (object): The group (or a value within it)
+    Returns:
+        signature (str): The signature
+    """
+    def normalize(val):
+        if isinstance(val, dict):
+            return sorted((key, normalize(item)) for key, item in val.items())
+        if isinstance(val, (list, tuple)):
+            return [normalize(item) for item in val]
+        if callable(val):
+            return '<callable {}>'.format(getattr(val, '__name__', val.__class__.__name__))
+        return val
+
+    return repr(normalize(value))
+
+
+# Validation results per distinct widget spec and shared palettes per widget type/role/color
+SPEC_CACHE = {}
+PALETTE_CACHE = {}
+
+# Scripts are loaded on their own threads so one slow script doesn't hold up the rest
+LOAD_POOL = QtCore.QThreadPool()
+
+# Button functions marked up with "async" or "thread" run here
+EXEC_POOL = QtCore.QThreadPool()
+
+# Widgets that can be reconfigured from new data, so they're reused across tab rebuilds
+POOLED_TYPES = (FuncButton, LineEdit, IntSpinner, FloatSpinner, CheckBox)
+WIDGET_POOL = WidgetPool()
+
 CLASSES = {
     'stretch': Stretch,
     'spacer': Spacer,
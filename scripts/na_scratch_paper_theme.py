@@ -0,0 +1,94 @@
+"""
+Module for turning the color and image markup in the scripts in to stylesheets
+
+Nothing in here relies on Qt so it can be used outside of the UI as well
+"""
+import hashlib
+from collections import OrderedDict
+
+
+class Theme(object):
+    """
+    Collects style rules for a tab's widgets so they can all be applied with a single stylesheet. Widgets are matched by
+    an "spStyle" dynamic property, with one rule per distinct style shared by every widget that uses it. Rule names
+    come from their contents so they stay valid for widgets that get reused from an earlier build.
+    """
+    def __init__(self):
+        """
+        Initial call method
+        """
+        self.rules = OrderedDict()
+        self.cached = None
+
+    def style(self, selector, declarations):
+        """
+        Adds a rule (if it isn't already there) and gets its name
+        Args:
+            selector (str): The Qt class name the rule is for
+            declarations (list): (property, value) tuples for the rule
+        Returns:
+            name (str): The value to set the widget's "spStyle" property to
+        """
+        body = '; '.join('{}: {}'.format(prop, value) for prop, value in declarations)
+        key = '{} {{{}}}'.format(selector, body)
+        if not isinstance(key, bytes):
+            key = key.encode('utf-8')
+
+        name = 'sp_{}'.format(hashlib.md5(key).hexdigest()[:10])
+        if name not in self.rules:
+            self.rules[name] = selector, body
+            self.cached = None
+        return name
+
+    def prune(self, names):
+        """
+        Drops the rules that aren't in use anymore
+        Args:
+            names (iterable): The "spStyle" values of the widgets still around (anything else is ignored)
+        """
+        names = set(names)
+        for name in [name for name in self.rules if name not in names]:
+            del self.rules[name]
+            self.cached = None
+
+    def stylesheet(self):
+        """
+        Gets the stylesheet with all the rules
+        Returns:
+            stylesheet (str): The stylesheet
+        """
+        if self.cached is None:
+            self.cached = '\n'.join('{}[spStyle="{}"] {{ {}; }}'.format(selector, name, body)
+                                    for name, (selector, body) in self.rules.items())
+        return self.cached
+
+
+def color(rgb):
+    """
+    Converts color markup to a stylesheet color
+    Args:
+        rgb (list): Values as they'd be passed in to QColor (red, green, blue and optionally alpha from 0-255)
+    Returns:
+        color (str): The stylesheet color
+    """
+    values = [int(value) for value in rgb]
+    if len(values) == 4:
+        return 'rgba({}, {}, {}, {})'.format(*values)
+    return 'rgb({}, {}, {})'.format(*values[:3])
+
+
+def background(rgb=None, image=None):
+    """
+    Gets the declarations for a background the same way palettes treated the "color" and "image" keys (an image is
+    tiled from the top left and takes priority over the color)
+    Args:
+        rgb (list): Color markup
+        image (str): Path to an image
+    Returns:
+        declarations (list): (property, value) tuples (empty if there's no color or image)
+    """
+    if image:
+        return [('background-image', 'url("{}")'.format(image.replace('\\', '/').replace('"', '\\"')))]
+    elif rgb:
+        return [('background-color', color(rgb))]
+    return []
@@ -0,0 +1,143 @@
+"""
+Refreshes a tab over and over under the offscreen Qt platform and checks that the body layout's item count, the number
+of widgets and the process' memory stay flat. Run from the root of the repo with
+
+    QT_QPA_PLATFORM=offscreen python tests/refresh_leak.py [refreshes]
+
+Every other refresh changes one of the script's groups, so both the reused and the rebuilt paths get torn down.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+# The compiled script cache goes in the home folder, which shouldn't fill up with a thousand versions of the script
+HOME = tempfile.mkdtemp()
+os.environ['HOME'] = os.environ['USERPROFILE'] = HOME
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from PySide2 import QtWidgets, QtCore
+
+import na_scratch_paper_tab_widgets as tab_widgets
+
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+# Refreshes before the baseline is taken (pools and caches fill up over the first few)
+WARM_UP = 50
+
+# Memory the process can grow by after warming up before it counts as a leak
+RSS_TOLERANCE = 8 * 1024 * 1024
+
+SCRIPT = '''
+sp_instructions = {{'contents': [{{'simple': 'hello', 'color': [40, 40, 60]}}]}}
+sp_instructions['contents'].append({{'label': '{label}', 'color': [100, 20, 20],
+                                    'inputWidgets': [{{'type': 'lineEdit', 'label': 'Text:'}},
+                                                     {{'type': 'intSpinner', 'label': 'Count:', 'share': True}},
+                                                     {{'type': 'check', 'label': 'Check'}}],
+                                    'buttons': [{{'label': 'Print', 'function': 'print_text', 'inputs': [0, 1]}},
+                                                {{'label': 'Print Again', 'function': 'print_text', 'inputs': [0, 1],
+                                                  'share': True}}]}})
+sp_instructions['contents'].append({{'label': 'Unchanged', 'inputWidgets': [{{'type': 'lineEdit', 'label': 'Text:'}}],
+                                    'buttons': [{{'label': 'Hello', 'function': 'hello'}}]}})
+
+
+def hello():
+    return 'hello'
+
+
+def print_text(text, count):
+    return text * count
+'''
+
+
+def rss():
+    """
+    Gets the resident memory of the process
+    Returns:
+        rss (int): Bytes in memory (None if it can't be found on this platform)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (IOError, OSError):
+        pass
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+def flush():
+    """
+    Deletes everything that's had deleteLater called on it
+    """
+    APP.processEvents()
+    APP.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+
+
+def measure(tab):
+    """
+    Gets the numbers that should stay flat
+    Args:
+        tab (tab_widgets.ScriptWidget): The tab being refreshed
+    Returns:
+        counts (dict): {(str) name: (int) count}
+    """
+    flush()
+    return {'layout items': tab.body_lwt.count(), 'widgets': len(QtWidgets.QApplication.allWidgets()), 'rss': rss()}
+
+
+def main(refreshes=1000):
+    """
+    Runs the refreshes and compares the counts after warming up with the counts at the end
+    Args:
+        refreshes (int): Number of refreshes
+    Returns:
+        code (int): The exit code (1 if anything grew)
+    """
+    folder = tempfile.mkdtemp()
+    script = os.path.join(folder, 'leak_script.py')
+    tab_widget = QtWidgets.QTabWidget()
+    try:
+        with open(script, 'w') as f:
+            f.write(SCRIPT.format(label='Changing'))
+        tab = tab_widgets.ScriptWidget(tab_widget, {'name': 'Leak', 'script': script}, {'async_loading': False})
+
+        baseline = None
+        for i in range(refreshes):
+            if i == WARM_UP:
+                baseline = measure(tab)
+
+            with open(script, 'w') as f:
+                f.write(SCRIPT.format(label='Changing' if i % 2 else 'Changed'))
+            tab.refresh()
+            flush()
+
+        final = measure(tab)
+        tab.release()
+    finally:
+        tab_widget.deleteLater()
+        flush()
+        shutil.rmtree(folder)
+        shutil.rmtree(HOME)
+
+    baseline = baseline or final
+    failed = False
+    for name in ('layout items', 'widgets', 'rss'):
+        if baseline[name] is None:
+            sys.stdout.write('{}: not available on this platform\n'.format(name))
+            continue
+
+        grown = final[name] - baseline[name]
+        ok = grown <= (RSS_TOLERANCE if name == 'rss' else 0)
+        failed = failed or not ok
+        sys.stdout.write('{}: {} -> {} ({})\n'.format(name, baseline[name], final[name], 'ok' if ok else 'LEAKING'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
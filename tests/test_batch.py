@@ -0,0 +1,58 @@
+"""
+Tests for batch runs. Run from the root of the repo with
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import na_scratch_paper_batch as batch
+import na_scratch_paper_headless as headless
+import na_scratch_paper_execution as execution
+
+
+SCRIPT = '''
+import os
+
+
+def scale(value):
+    if value == 3:
+        os._exit(1)
+    return value * 10
+'''
+
+
+class BatchRunTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.script = os.path.join(self.folder, 'batch_script.py')
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT)
+        self.output = os.path.join(self.folder, 'results.jsonl')
+        self.button = headless.Button('Scale', '', 'scale', {'inputs': [0]}, [{'type': 'intSpinner', 'label': 'Value'}], {})
+        execution.PROCESS_POOL.resize(2)
+
+    def tearDown(self):
+        execution.PROCESS_POOL.close()
+        shutil.rmtree(self.folder)
+
+    def test_lost_worker_fails_row(self):
+        rows = (([value], None) for value in range(8))
+        run = batch.BatchRun(self.button, rows, self.output, 2, (self.script, 'scale'))
+        self.assertFalse(run.run())
+        self.assertEqual((run.done, run.failed), (8, 1))
+
+        with open(self.output) as f:
+            records = dict((record['row'], record) for record in map(json.loads, f))
+        self.assertTrue(records[3]['error'])
+        self.assertEqual(records[5]['result'], 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Tests for running pipelines. Run from the root of the repo with
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import na_scratch_paper_execution as execution
+import na_scratch_paper_pipelines as pipelines
+
+
+SCRIPT = '''
+import os
+
+
+def double(value):
+    return value * 2
+
+
+def crash():
+    os._exit(3)
+'''
+
+
+class PipelineRunTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.script = os.path.join(self.folder, 'pipeline_script.py')
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT)
+        self.pool = execution.ProcessPool(2)
+
+    def tearDown(self):
+        self.pool.close()
+        shutil.rmtree(self.folder)
+
+    def test_results_passed_on(self):
+        pipeline = pipelines.Pipeline('Double', [
+            {'id': 'a', 'script': self.script, 'function': 'double', 'inputs': [2], 'process': True},
+            {'id': 'b', 'script': self.script, 'function': 'double', 'inputs': [{'result': 'a'}], 'process': True}])
+        run = pipelines.PipelineRun(pipeline, self.pool)
+        self.assertTrue(run.run())
+        self.assertEqual(run.jobs['b'].result, 8)
+
+    def test_lost_worker_fails_step(self):
+        pipeline = pipelines.Pipeline('Crash', [
+            {'id': 'crash', 'script': self.script, 'function': 'crash', 'process': True},
+            {'id': 'after', 'script': self.script, 'function': 'double', 'inputs': [1], 'depends': ['crash'],
+             'process': True}])
+        run = pipelines.PipelineRun(pipeline, self.pool)
+        self.assertFalse(run.run())
+        self.assertEqual(run.failed, 'crash')
+        self.assertEqual(run.state('after'), 'skipped')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Tests for the fuzzy matcher. Run from the root of the repo with
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import na_scratch_paper_search as search
+
+
+WORDS = ('make cube sphere rig joint skin weight export import mesh curve control locator mirror reset select bake anim '
+         'key frame shot asset publish render light camera').split()
+
+
+class FuzzyMatcherTest(unittest.TestCase):
+    def setUp(self):
+        rand = random.Random(1)
+        self.texts = [search.join_text(*[' '.join(rand.choice(WORDS).title() for _ in range(rand.randint(1, 3)))
+                                         for _ in range(2)]) for _ in range(2000)]
+        self.boosts = dict((rand.randrange(len(self.texts)), 20 * i) for i in range(1, 6))
+
+    def test_acronym_first(self):
+        matcher = search.FuzzyMatcher(['Mkc Bake', 'Mirror Key Cup Bake ' + 'x' * 60])
+        self.assertEqual(matcher.match('mkcb')[0][1], 1)
+
+    def test_tiers_match_full_search(self):
+        tiered = search.FuzzyMatcher(self.texts)
+        full = search.FuzzyMatcher(self.texts)
+        full.tiered_match = lambda *args: None
+        for query in ('m', 'e', 'q', 'mk', 'sk', 'rc', 'xq', 'r-'):
+            for limit in (5, 50):
+                for boosts in (None, self.boosts):
+                    full.last_query = None
+                    self.assertEqual(tiered.match(query, limit, boosts), full.match(query, limit, boosts),
+                                     '{} (limit {})'.format(query, limit))
+
+
+if __name__ == '__main__':
+    unittest.main()
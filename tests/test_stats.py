@@ -0,0 +1,43 @@
+"""
+Tests for the button timing stats. Run from the root of the repo with
+
+    python -m unittest discover tests
+"""
+import os
+import sys
+import time
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+import na_scratch_paper_stats as stats
+
+
+class CpuTimeTest(unittest.TestCase):
+    @unittest.skipIf(stats.THREAD_CLOCK is None, 'No per-thread CPU clock on this platform')
+    def test_other_threads_not_counted(self):
+        def busy():
+            start = time.time()
+            while time.time() - start < 0.5:
+                pass
+
+        thread = threading.Thread(target=busy)
+        cpu = stats.cpu_time()
+        thread.start()
+        thread.join()
+        self.assertLess(stats.cpu_since(cpu), 0.25)
+
+    def test_unknown_cpu_left_out(self):
+        button_stats = stats.ButtonStats()
+        button_stats.add(1.0, None, 0.1)
+        self.assertIsNone(button_stats.summary()['cpu']['p50'])
+        self.assertNotIn('CPU', button_stats.describe())
+
+        button_stats.add(2.0, 0.5, 0.1)
+        self.assertEqual(button_stats.summary()['cpu']['max'], 0.5)
+        self.assertIn('CPU', button_stats.describe())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+"""
+Offscreen smoke tests for building tabs. Run from the root of the repo with
+
+    QT_QPA_PLATFORM=offscreen python -m unittest discover tests
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from PySide2 import QtWidgets, QtGui
+
+import na_scratch_paper_tab_widgets as tab_widgets
+import na_scratch_paper_execution as execution
+import na_scratch_paper_headless as headless
+
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+SCRIPT = '''
+sp_instructions = {'contents': [{'simple': 'hello'}]}
+sp_instructions['contents'].append({'label': 'Add', 'inputWidgets': [{'type': 'intSpinner', 'label': 'A'},
+                                                                    {'type': 'lineEdit', 'label': 'B'}],
+                                    'buttons': [{'label': 'Add', 'function': 'add', 'inputs': [0, 1]}]})
+
+
+def hello():
+    return 'hello'
+
+
+def add(a, b):
+    return a + len(b)
+'''
+
+PROCESS_SCRIPT = '''
+import os
+import time
+
+sp_instructions = {'contents': [{'label': 'Process', 'buttons': [{'label': 'Crash', 'function': 'crash', 'process': True},
+                                                                 {'label': 'Wait', 'function': 'wait', 'process': True}]}]}
+
+
+def crash():
+    os._exit(1)
+
+
+def wait():
+    time.sleep(60)
+'''
+
+EVAL_SCRIPT = '''
+SCALE = 3
+
+sp_instructions = {'contents': [{'label': 'Eval', 'inputWidgets': [{'type': 'lineEdit', 'label': 'Value', 'eval': True,
+                                                                    'text': 'SCALE * 2'}],
+                                 'buttons': [{'label': 'Show', 'function': 'show', 'inputs': [0]}]}]}
+
+
+def show(value):
+    return value
+'''
+
+
+def wait_for_load(tab):
+    """
+    Waits for a tab's background load to finish and get built
+    Args:
+        tab (tab_widgets.ScriptWidget): The tab
+    """
+    tab_widgets.LOAD_POOL.waitForDone()
+    while tab.loading:
+        APP.processEvents()
+
+
+def wait_for_jobs(tab, key, timeout=10.0):
+    """
+    Waits for a button's runs to finish
+    Args:
+        tab (tab_widgets.ScriptWidget): The tab
+        key (str): The button's label
+        timeout (float): Seconds to wait before giving up
+    """
+    start = time.time()
+    while tab.running.get(key) and time.time() - start < timeout:
+        APP.processEvents()
+        time.sleep(0.01)
+
+
+class ScriptWidgetTest(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.script = os.path.join(self.folder, 'smoke_script.py')
+        with open(self.script, 'w') as f:
+            f.write(SCRIPT)
+        self.tab_widget = QtWidgets.QTabWidget()
+
+    def tearDown(self):
+        for i in range(self.tab_widget.count()):
+            self.tab_widget.widget(i).release()
+        self.tab_widget.deleteLater()
+        APP.processEvents()
+        shutil.rmtree(self.folder)
+
+    def test_build(self):
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script},
+                                       {'async_loading': False})
+        self.assertEqual(self.tab_widget.count(), 1)
+        self.assertEqual(len(tab.groups), 2)
+        self.assertFalse(tab.simple)
+        self.assertIn('add', tab.functions)
+        self.assertIn('hello', tab.functions)
+
+    def test_build_in_background(self):
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script}, {})
+        wait_for_load(tab)
+        self.assertEqual(len(tab.groups), 2)
+
+    def test_reload_keeps_unchanged_groups(self):
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script}, {})
+        wait_for_load(tab)
+        frame = tab.groups[1][1]
+        frame.input_widgets[1].set_val('typed')
+
+        # The groups stay up (disabled) while the script loads in the background
+        tab.load_script()
+        self.assertIs(tab.groups[1][1], frame)
+        self.assertFalse(tab.scroll.widget().isEnabled())
+        wait_for_load(tab)
+        self.assertTrue(tab.scroll.widget().isEnabled())
+        self.assertIs(tab.groups[1][1], frame)
+        self.assertEqual(frame.input_widgets[1].read(), 'typed')
+
+        # Changing another group in the script still keeps this one
+        with open(self.script, 'a') as f:
+            f.write("\nsp_instructions['contents'].append({'simple': 'hello', 'label': 'Hello Again'})\n")
+        tab.refresh()
+        wait_for_load(tab)
+        self.assertEqual(len(tab.groups), 3)
+        self.assertIs(tab.groups[1][1], frame)
+        self.assertEqual(frame.input_widgets[1].read(), 'typed')
+
+    def test_colors(self):
+        colored = ("sp_instructions = {{'contents': [{{'label': 'Colored', 'color': {0}, "
+                   "'buttons': [{{'label': 'Hello', 'function': 'hello', 'color': {0}}}]}}]}}\n\n\n"
+                   "def hello():\n    return 'hello'\n")
+        with open(self.script, 'w') as f:
+            f.write(colored.format([200, 10, 10]))
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script},
+                                       {'async_loading': False})
+
+        # Frames are styled by the tab's stylesheet, buttons keep their native look and get tinted through the palette
+        frame = tab.groups[0][1]
+        self.assertTrue(frame.property('spStyle'))
+        button = frame.buttons[0]
+        self.assertFalse(button.property('spStyle'))
+        self.assertEqual(button.palette().color(QtGui.QPalette.Button), QtGui.QColor(200, 10, 10))
+
+        # Changing the colors replaces the old rules instead of adding to them (the scripts' sizes differ so they're
+        # reloaded even within the same second)
+        for rgb in ([9, 9, 9], [99, 99, 99], [199, 199, 199]):
+            with open(self.script, 'w') as f:
+                f.write(colored.format(rgb))
+            tab.refresh()
+        self.assertEqual(list(tab.theme.rules), [tab.groups[0][1].property('spStyle')])
+        self.assertEqual(tab.scroll.widget().styleSheet().count('spStyle'), 1)
+
+    def test_lost_process_job(self):
+        with open(self.script, 'w') as f:
+            f.write(PROCESS_SCRIPT)
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script},
+                                       {'async_loading': False})
+        crash, wait = tab.groups[0][1].buttons
+        try:
+            # The worker dies without calling back, so the button only frees up once the tab notices
+            crash.click()
+            self.assertEqual(len(tab.running['Crash']), 1)
+            wait_for_jobs(tab, 'Crash')
+            self.assertFalse(tab.running['Crash'])
+            self.assertEqual(crash.text(), 'Crash')
+
+            # Cancelling terminates the worker running the job
+            wait.click()
+            job = tab.running['Wait'][0]
+            tab.cancel_jobs('Wait')
+            wait_for_jobs(tab, 'Wait')
+            self.assertFalse(tab.running['Wait'])
+            self.assertTrue(job.cancelled)
+            self.assertIsNone(job.error)
+        finally:
+            execution.PROCESS_POOL.close()
+
+    def test_eval_namespace(self):
+        with open(self.script, 'w') as f:
+            f.write(EVAL_SCRIPT)
+
+        # Eval fields see the script's globals, in static tabs and on the command line as well
+        button = headless.find_button(headless.load_buttons(self.script), 'Show')
+        self.assertEqual(button.args(), [6])
+        for prefs in ({'async_loading': False}, {'async_loading': False, 'static_tabs': True}):
+            tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script}, prefs)
+            self.assertEqual(tab.groups[0][1].input_widgets[0].read(), 6)
+
+    def test_batch_eval_namespace(self):
+        with open(self.script, 'w') as f:
+            f.write(EVAL_SCRIPT)
+        rows = os.path.join(self.folder, 'rows.jsonl')
+        with open(rows, 'w') as f:
+            f.write('["SCALE * 2"]\n')
+        output = os.path.join(self.folder, 'results.jsonl')
+
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {'name': 'Smoke', 'script': self.script},
+                                       {'async_loading': False})
+        frame = tab.groups[0][1]
+        dialogs = (QtWidgets.QFileDialog.getOpenFileName, QtWidgets.QFileDialog.getSaveFileName,
+                   QtWidgets.QInputDialog.getInt)
+        QtWidgets.QFileDialog.getOpenFileName = staticmethod(lambda *args: (rows, ''))
+        QtWidgets.QFileDialog.getSaveFileName = staticmethod(lambda *args: (output, ''))
+        QtWidgets.QInputDialog.getInt = staticmethod(lambda *args: (2, True))
+        try:
+            tab.run_batch('Show', tab.functions['show'], frame.data['buttons'][0], frame.input_widgets)
+            wait_for_jobs(tab, 'Show')
+        finally:
+            (QtWidgets.QFileDialog.getOpenFileName, QtWidgets.QFileDialog.getSaveFileName,
+             QtWidgets.QInputDialog.getInt) = [staticmethod(dialog) for dialog in dialogs]
+
+        # Rows are evaluated with the script's globals, like the headless batch command does
+        with open(output) as f:
+            self.assertEqual(json.loads(f.readline())['result'], 6)
+
+    def test_no_script(self):
+        tab = tab_widgets.ScriptWidget(self.tab_widget, {}, {})
+        self.assertEqual(tab.groups, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
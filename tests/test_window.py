@@ -0,0 +1,45 @@
+"""
+Offscreen smoke test for the main window. Run from the root of the repo with
+
+    QT_QPA_PLATFORM=offscreen python -m unittest discover tests
+"""
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from PySide2 import QtWidgets
+
+import na_scratch_paper
+
+
+APP = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+class ScratchPaperWidgetTest(unittest.TestCase):
+    def setUp(self):
+        # Keeps the window away from the real preferences
+        self.home = tempfile.mkdtemp()
+        self.environ = dict(os.environ)
+        os.environ['HOME'] = os.environ['USERPROFILE'] = self.home
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self.environ)
+        shutil.rmtree(self.home)
+
+    def test_create(self):
+        window = na_scratch_paper.ScratchPaperWidget()
+        window.prefs['watch_scripts'] = True
+        window.update_watcher()
+        self.assertEqual(window.tab_widget.count(), 1)
+        window.deleteLater()
+        APP.processEvents()
+
+
+if __name__ == '__main__':
+    unittest.main()